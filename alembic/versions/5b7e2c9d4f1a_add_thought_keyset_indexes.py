@@ -0,0 +1,34 @@
+"""Add keyset pagination indexes to thought
+
+Revision ID: 5b7e2c9d4f1a
+Revises: d671e1a68c42
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2c9d4f1a"
+down_revision: Union[str, None] = "d671e1a68c42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_thought_created_at_id", "thought", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_thought_persona_id_created_at_id",
+        "thought",
+        ["persona_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_thought_persona_id_created_at_id", table_name="thought")
+    op.drop_index("ix_thought_created_at_id", table_name="thought")
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.routers import thought_router, persona_router, conversation_router, processor_router, dataset_router
+from backend.routers.dataset_routes import dataset_use_cases
 from libs.events.handlers import register_handlers
+from libs.llm_service.instrumentation import metrics_asgi_app
 
 app = FastAPI(title="Thought Aggregator API")
 
@@ -17,6 +19,13 @@ app.add_middleware(
 @app.on_event("startup")
 def startup():
     register_handlers()
+    # Load the movie corpus cache (when enabled) before the first search arrives
+    cache_stats = dataset_use_cases.warm_cache()
+    if cache_stats.loaded:
+        print(
+            f"Movie corpus cache loaded in {cache_stats.load_time_ms}ms "
+            f"({cache_stats.memory_bytes} bytes)"
+        )
 
 @app.get("/")
 def read_root():
@@ -27,3 +36,8 @@ app.include_router(persona_router)
 app.include_router(conversation_router)
 app.include_router(processor_router)
 app.include_router(dataset_router)
+
+# Prometheus metrics (LLM token usage and latency), when prometheus_client is installed
+metrics_app = metrics_asgi_app()
+if metrics_app is not None:
+    app.mount("/metrics", metrics_app)
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import os
+import time
 from typing import List
-from libs.db_service import ConversationService, ConversationDomain
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from rq import Queue
-import os
+
+from libs.db_service import ConversationDomain, ConversationService
+from libs.events.streams import (
+    EVENT_END,
+    AsyncGenerationStream,
+    GenerationStream,
+    conversation_stream_key,
+    format_sse,
+)
 
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 redis_conn = Redis(host=REDIS_HOST, port=REDIS_PORT)
+async_redis_conn = AsyncRedis(host=REDIS_HOST, port=REDIS_PORT)
+# How long one stream read waits before sending a keepalive
+STREAM_BLOCK_MS = 15000
+# A stream with no new entries for this long is closed; clients reconnect with
+# Last-Event-ID
+STREAM_IDLE_TIMEOUT_SECONDS = int(os.getenv("CONVERSATION_STREAM_IDLE_SECONDS", 600))
 
 class ConversationCreate(BaseModel):
     title: str
@@ -70,6 +88,48 @@ def generate_sequence(conversation_id: int, request: GenerateSequenceRequest):
     
     return {"message": "Message sequence generation passed to worker"}
 
+async def _conversation_events(conversation_id: int, last_id: str, request: Request):
+    stream = AsyncGenerationStream(
+        conversation_stream_key(conversation_id), async_redis_conn
+    )
+    if last_id == "$":
+        last_id = await stream.latest_id()
+    idle_deadline = time.monotonic() + STREAM_IDLE_TIMEOUT_SECONDS
+    while not await request.is_disconnected():
+        entries = await stream.read(last_id, block_ms=STREAM_BLOCK_MS)
+        for entry_id, event, data in entries:
+            last_id = entry_id
+            yield format_sse(entry_id, event, data)
+            if event == EVENT_END:
+                return
+        if entries:
+            idle_deadline = time.monotonic() + STREAM_IDLE_TIMEOUT_SECONDS
+            continue
+        if time.monotonic() >= idle_deadline:
+            return
+        yield ": keepalive\n\n"
+
+@router.get("/{conversation_id}/stream")
+def stream_conversation(conversation_id: int, request: Request):
+    """Server-Sent Events with messages of the conversation as they are generated.
+
+    Each generation emits `chunk` events with the raw model output and a
+    `done` event with the parsed messages, all tagged with `persona_id`.
+    Open the stream before posting to /generate to see the whole message;
+    reconnecting clients resume after their Last-Event-ID. The stream closes
+    with an `end` event when the conversation ends, or after
+    STREAM_IDLE_TIMEOUT_SECONDS without new entries.
+    """
+    conversation = ConversationService.get_conversation(conversation_id)
+    if not conversation:
+         raise HTTPException(status_code=404, detail="Conversation not found")
+
+    last_id = request.headers.get("last-event-id", "$")
+    return StreamingResponse(
+        _conversation_events(conversation_id, last_id, request),
+        media_type="text/event-stream",
+    )
+
 
 @router.post("/{conversation_id}/personas")
 def add_persona_to_conversation(conversation_id: int, request: AddPersonaToConversationRequest):
@@ -83,4 +143,5 @@ def end_conversation(conversation_id: int):
     success = ConversationService.end_conversation(conversation_id)
     if not success:
          raise HTTPException(status_code=400, detail="Could not end conversation.")
+    GenerationStream(conversation_stream_key(conversation_id), redis_conn).end()
     return {"message": "Conversation ended and thoughts created"}
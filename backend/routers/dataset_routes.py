@@ -2,7 +2,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Query
 
-from libs.dtos.dataset_dto import MovieSearchResponse
+from libs.dtos.dataset_dto import CorpusCacheStatsResponse, MovieSearchResponse
 from libs.use_cases.dataset_use_cases import DatasetUseCases
 
 router = APIRouter(
@@ -20,13 +20,23 @@ def search_characters(
     genre: Optional[str] = Query(None, description="Movie genre filter"),
     min_rating: Optional[float] = Query(None, description="Minimum IMDB rating filter"),
     year: Optional[str] = Query(None, description="Release year filter"),
-    character_name: Optional[str] = Query(None, description="Wildcard search on character name"),
+    character_name: Optional[str] = Query(
+        None, description="Wildcard search on character name"
+    ),
+    facets: bool = Query(
+        False, description="Include per-genre and per-decade match counts"
+    ),
 ):
     """
     Search for movie characters by movie details.
     """
     return dataset_use_cases.search_movie_characters(
-        title_query=title, genre=genre, min_imdb_rating=min_rating, release_year=year, character_name=character_name
+        title_query=title,
+        genre=genre,
+        min_imdb_rating=min_rating,
+        release_year=year,
+        character_name=character_name,
+        include_facets=facets,
     )
 
 
@@ -39,3 +49,12 @@ def get_random_characters(
     Get random movie characters, optionally seeded by a timestamp.
     """
     return dataset_use_cases.get_random_movie_characters(limit=limit, seed=seed)
+
+
+@router.get("/cache/stats", response_model=CorpusCacheStatsResponse)
+def get_cache_stats():
+    """
+    Report whether the in-memory corpus cache is loaded, its load time and memory
+    footprint.
+    """
+    return dataset_use_cases.get_cache_stats()
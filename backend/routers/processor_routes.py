@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import os
 from typing import List
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from rq import Queue
-import os
+from starlette.concurrency import run_in_threadpool
+
+from libs.events.streams import (
+    EVENT_DONE,
+    EVENT_ERROR,
+    AsyncGenerationStream,
+    essay_stream_key,
+    format_sse,
+)
 
 router = APIRouter(tags=["Processor"])
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 redis_conn = Redis(host=REDIS_HOST, port=REDIS_PORT)
+async_redis_conn = AsyncRedis(host=REDIS_HOST, port=REDIS_PORT)
+# How long one stream read waits before checking on the job and sending a keepalive
+STREAM_BLOCK_MS = 5000
 
 class GenerateThoughtsRequest(BaseModel):
     urls: List[str]
@@ -48,3 +63,51 @@ def get_essay_status(job_id: str):
         "result": job.result,
         "error": str(job.exc_info) if job.exc_info else None
     }
+
+def _job_outcome(job):
+    status = job.get_status()
+    if status == "finished":
+        return status, job.result
+    if status in ("failed", "stopped", "canceled"):
+        return status, str(job.exc_info) if job.exc_info else status
+    return status, None
+
+async def _essay_events(job, last_id: str, request: Request):
+    stream = AsyncGenerationStream(essay_stream_key(job.id), async_redis_conn)
+    while not await request.is_disconnected():
+        entries = await stream.read(last_id, block_ms=STREAM_BLOCK_MS)
+        for entry_id, event, data in entries:
+            last_id = entry_id
+            yield format_sse(entry_id, event, data)
+            if event in (EVENT_DONE, EVENT_ERROR):
+                return
+        if entries:
+            continue
+        # Nothing new: the job may have ended before streaming (or its stream
+        # expired), in which case its stored result closes the stream.
+        status, outcome = await run_in_threadpool(_job_outcome, job)
+        if status == "finished":
+            yield format_sse(None, EVENT_DONE, {"result": outcome})
+            return
+        if outcome is not None:
+            yield format_sse(None, EVENT_ERROR, {"error": outcome})
+            return
+        yield ": keepalive\n\n"
+
+@router.get("/essay/stream/{job_id}")
+def stream_essay(job_id: str, request: Request):
+    """Server-Sent Events with the essay text as it is generated.
+
+    Emits `chunk` events with partial text, then one `done` event with the
+    full essay (or `error`). Reconnecting clients resume after the id in
+    their Last-Event-ID header.
+    """
+    q_essay = Queue('essay', connection=redis_conn)
+    job = q_essay.fetch_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    last_id = request.headers.get("last-event-id", "0")
+    return StreamingResponse(
+        _essay_events(job, last_id, request), media_type="text/event-stream"
+    )
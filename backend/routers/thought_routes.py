@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import os
 from typing import List, Optional
-from libs.db_service import ThoughtService
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
 from redis import Redis
-from rq import Queue
-import os
+
+from libs.db_service import ThoughtService
+from libs.events.jobs import enqueue_analysis, enqueue_bulk_analysis
+from libs.processor_service import (
+    ANALYSIS_MODE_BATCH,
+    ANALYSIS_MODE_FUSED,
+    get_analysis_mode,
+)
 
 router = APIRouter(prefix="/thoughts", tags=["Thoughts"])
 
@@ -20,6 +27,15 @@ class ThoughtCreate(BaseModel):
     action_orientation: Optional[str] = None
     thought_type: Optional[str] = None
 
+# Upper bound on thoughts per bulk request, to keep one transaction reasonably sized
+MAX_BULK_THOUGHTS = 1000
+MAX_PAGE_SIZE = 200
+
+class ThoughtBulkCreate(BaseModel):
+    thoughts: List[ThoughtCreate] = Field(
+        ..., min_length=1, max_length=MAX_BULK_THOUGHTS
+    )
+
 class ThoughtUpdate(BaseModel):
     status: Optional[str] = None
     emotions: Optional[List[str]] = None
@@ -41,34 +57,50 @@ def create_thought(thought_data: ThoughtCreate):
         thought_type=thought_data.thought_type
     )
     
-    q_distortions = Queue('distortions', connection=redis_conn)
-    q_sentiment = Queue('sentiment', connection=redis_conn)
-    
-    q_distortions.enqueue("workers.tasks.analyze_cognitive_distortions", thought.id)
-    q_sentiment.enqueue("workers.tasks.analyze_sentiment", thought.id)
-    
-    q_action = Queue('action_orientation', connection=redis_conn)
-    q_type = Queue('thought_type', connection=redis_conn)
-    q_action.enqueue("workers.tasks.analyze_action_orientation", thought.id)
-    q_type.enqueue("workers.tasks.analyze_thought_type", thought.id)
-
+    # A single thought has nothing to batch with, so batch mode runs it fused too
+    mode = get_analysis_mode()
+    enqueue_analysis(
+        [thought.id],
+        redis_conn,
+        mode=ANALYSIS_MODE_FUSED if mode == ANALYSIS_MODE_BATCH else mode,
+    )
     return thought.dict()
 
+@router.post("/bulk")
+def bulk_create_thoughts(bulk_data: ThoughtBulkCreate):
+    ids = ThoughtService.bulk_create_thoughts(
+        [t.model_dump() for t in bulk_data.thoughts]
+    )
+
+    # One job analyzes the whole set, concurrently or in batched prompts
+    enqueue_bulk_analysis(ids, redis_conn)
+    return {"ids": ids, "count": len(ids)}
+
 @router.get("/")
 def list_thoughts(
     tag: Optional[str] = None, 
     emotion: Optional[str] = None, 
     persona_id: Optional[int] = None,
-    page: int = 1, 
-    limit: int = 10
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = True
 ):
-    result = ThoughtService.list_thoughts(tag=tag, emotion=emotion, persona_id=persona_id, page=page, limit=limit)
+    """Pass the returned `next_cursor` as `cursor` to get the following page."""
+    try:
+        result = ThoughtService.list_thoughts(
+            tag=tag, emotion=emotion, persona_id=persona_id, page=page, limit=limit,
+            cursor=cursor, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "total": result["total"],
         "page": page,
         "limit": limit,
-        "items": [t.dict() for t in result["items"]]
+        "items": [t.dict() for t in result["items"]],
+        "next_cursor": result["next_cursor"]
     }
 
 @router.post("/{thought_id}/links")
@@ -1,5 +1,6 @@
+import { useEffect, useState } from 'react';
 import { useQuery, useMutation } from '@tanstack/react-query';
-import { api } from '../api';
+import { api, API_BASE_URL } from '../api';
 
 export function useEssayStatus(jobId: string | null) {
     return useQuery({
@@ -19,6 +20,33 @@ export function useEssayStatus(jobId: string | null) {
     });
 }
 
+// Partial essay text streamed over Server-Sent Events while the job runs.
+export function useEssayStream(jobId: string | null) {
+    const [text, setText] = useState('');
+
+    useEffect(() => {
+        setText('');
+        if (!jobId || typeof EventSource === 'undefined') return;
+
+        const source = new EventSource(`${API_BASE_URL}/essay/stream/${jobId}`);
+        source.addEventListener('chunk', (event) => {
+            const { text: chunk } = JSON.parse((event as MessageEvent).data);
+            setText((previous) => previous + chunk);
+        });
+        const close = () => source.close();
+        source.addEventListener('done', close);
+        // A native 'error' (dropped connection) carries no data; EventSource
+        // reconnects on its own, so only the server's named error event ends
+        // the stream.
+        source.addEventListener('error', (event) => {
+            if ((event as MessageEvent).data) close();
+        });
+        return close;
+    }, [jobId]);
+
+    return text;
+}
+
 interface GenerateEssayPayload {
     starting_text: string;
     persona_id: number;
@@ -14,7 +14,7 @@ export function useMovieCharacters(params: SearchMovieCharactersParams) {
     return useQuery<MovieSearchResponse>({
         queryKey: ['movieCharacters', params],
         queryFn: async () => {
-            const { data } = await api.get('/dataset/characters', { params });
+            const { data } = await api.get('/dataset/characters', { params: { ...params, facets: true } });
             return data;
         },
         // We might not want to automatically refetch or fetch when empty, 
@@ -1,17 +1,20 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { api } from '../api';
-import type { Thought } from '../types';
+import type { PaginatedResponse } from '../types';
 
-export function useThoughts(params: { page: number; limit?: number; tag?: string; emotion?: string; persona_id?: string }) {
+export function useThoughts(params: { page: number; cursor?: string; limit?: number; tag?: string; emotion?: string; persona_id?: string }) {
     return useQuery({
         queryKey: ['thoughts', params],
         queryFn: async () => {
-            const queryParams: Record<string, any> = { page: params.page, limit: params.limit || 50 };
+            // A cursor reads the page by keyset; the page number is only used for jumps without one
+            const queryParams: Record<string, any> = params.cursor
+                ? { cursor: params.cursor, limit: params.limit || 50 }
+                : { page: params.page, limit: params.limit || 50 };
             if (params.tag) queryParams.tag = params.tag;
             if (params.emotion) queryParams.emotion = params.emotion;
             if (params.persona_id) queryParams.persona_id = params.persona_id;
 
-            const { data } = await api.get<{ items: Thought[], total: number, page: number, limit: number }>('/thoughts/', { params: queryParams });
+            const { data } = await api.get<PaginatedResponse>('/thoughts/', { params: queryParams });
             return data;
         },
         placeholderData: (previousData) => previousData,
@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import { Box, Typography, TextField, Button, MenuItem, Select, FormControl, InputLabel, Alert, Stack, CircularProgress, Paper } from '@mui/material';
 import { usePersonas } from '../../hooks/usePersonas';
-import { useEssayStatus, useGenerateEssay } from '../../hooks/useEssay';
+import { useEssayStatus, useEssayStream, useGenerateEssay } from '../../hooks/useEssay';
 
 export default function EssayGenerator() {
     const { data: personas = [] } = usePersonas();
@@ -11,10 +11,11 @@ export default function EssayGenerator() {
 
     const { mutate, isPending: isStartingGeneration, error: generationError } = useGenerateEssay();
     const { data: essayStatus, isError: isStatusError } = useEssayStatus(jobId);
+    const streamedEssay = useEssayStream(jobId);
 
     const isGenerating = isStartingGeneration || (jobId && essayStatus?.status !== 'finished' && essayStatus?.status !== 'failed');
     const hasFailed = essayStatus?.status === 'failed' || isStatusError || generationError;
-    const generatedEssay = essayStatus?.status === 'finished' ? essayStatus.result : null;
+    const generatedEssay = essayStatus?.status === 'finished' ? essayStatus.result : streamedEssay || null;
 
     const handleGenerate = () => {
         if (!selectedPersona || !startingText.trim()) return;
@@ -14,7 +14,9 @@ import {
     IconButton,
     Divider,
     CircularProgress,
-    Alert
+    Alert,
+    Chip,
+    Stack
 } from '@mui/material';
 import DeleteIcon from '@mui/icons-material/Delete';
 import AddIcon from '@mui/icons-material/Add';
@@ -85,6 +87,12 @@ const MovieCharacterSearch: React.FC = () => {
         });
     };
 
+    const handleGenreFacetClick = (facetGenre: string) => {
+        setRandomSeed(null);
+        setGenre(facetGenre);
+        setQueryParams({ ...queryParams, genre: facetGenre });
+    };
+
     const handleAddCharacter = (character: MovieCharacter) => {
         if (!selectedCharacters.find(c => c.character_id === character.character_id)) {
             setSelectedCharacters([...selectedCharacters, character]);
@@ -264,6 +272,24 @@ const MovieCharacterSearch: React.FC = () => {
                         <Typography variant="h6" gutterBottom fontWeight="bold">
                             Results {randomSeed && randomData?.results ? `(${randomData.results.length} random)` : searchData?.results ? `(${searchData.results.length})` : ''}
                         </Typography>
+
+                        {!randomSeed && searchData?.facets && (
+                            <Stack direction="row" spacing={1} useFlexGap flexWrap="wrap" sx={{ mb: 2 }}>
+                                {Object.entries(searchData.facets.genres).map(([facetGenre, count]) => (
+                                    <Chip
+                                        key={facetGenre}
+                                        label={`${facetGenre} (${count})`}
+                                        size="small"
+                                        color="primary"
+                                        variant={queryParams.genre.toLowerCase() === facetGenre ? 'filled' : 'outlined'}
+                                        onClick={() => handleGenreFacetClick(facetGenre)}
+                                    />
+                                ))}
+                                {Object.entries(searchData.facets.decades).map(([decade, count]) => (
+                                    <Chip key={decade} label={`${decade} (${count})`} size="small" variant="outlined" />
+                                ))}
+                            </Stack>
+                        )}
                         
                         {(isSearchLoading || isRandomLoading) && (
                             <Box sx={{ display: 'flex', justifyContent: 'center', p: 5 }}>
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Box, Pagination, Typography, CircularProgress, FormControl, InputLabel, MenuItem, Select } from '@mui/material';
 import ThoughtTable from './components/ThoughtTable';
 import FilterBar from './components/FilterBar';
@@ -10,19 +10,33 @@ export default function Thoughts() {
     const [selectedEmotion, setSelectedEmotion] = useState<string>('');
     const [selectedPersona, setSelectedPersona] = useState<string>('');
     const [page, setPage] = useState(1);
+    // Cursor of every page reached so far, so paging forward or back skips the OFFSET scan
+    const [cursors, setCursors] = useState<Record<number, string>>({});
 
     const { data: personas = [] } = usePersonas();
-    const { data, isLoading: loading } = useThoughts({ 
+    const { data, isLoading: loading, isPlaceholderData } = useThoughts({ 
         page, 
+        cursor: cursors[page],
         tag: selectedTag, 
         emotion: selectedEmotion, 
         persona_id: selectedPersona 
     });
 
+    useEffect(() => {
+        const nextCursor = data?.next_cursor;
+        if (!nextCursor || isPlaceholderData) return;
+        setCursors(prev => prev[page + 1] === nextCursor ? prev : { ...prev, [page + 1]: nextCursor });
+    }, [data, isPlaceholderData, page]);
+
+    const resetPaging = () => {
+        setPage(1);
+        setCursors({});
+    };
+
     const deleteMutation = useDeleteThought();
 
     const thoughts = data?.items || [];
-    const totalPages = data ? Math.ceil(data.total / data.limit) : 1;
+    const totalPages = data?.total != null ? Math.ceil(data.total / data.limit) : page + (data?.next_cursor ? 1 : 0);
 
     // Expanded Rows State
     const [expandedThoughtIds, setExpandedThoughtIds] = useState<Set<number>>(new Set());
@@ -48,9 +62,9 @@ export default function Thoughts() {
                 <Typography variant="h4" sx={{ color: 'primary.main', fontWeight: 'bold' }}>THOUGHTS</Typography>
                 <FilterBar
                     searchTag={selectedTag}
-                    setSearchTag={setSelectedTag}
+                    setSearchTag={(value) => { setSelectedTag(value); resetPaging(); }}
                     searchEmotion={selectedEmotion}
-                    setSearchEmotion={setSelectedEmotion}
+                    setSearchEmotion={(value) => { setSelectedEmotion(value); resetPaging(); }}
                 />
             </Box>
 
@@ -62,7 +76,7 @@ export default function Thoughts() {
                         label="Filter by Persona"
                         onChange={(e) => {
                             setSelectedPersona(e.target.value);
-                            setPage(1);
+                            resetPaging();
                         }}
                     >
                         <MenuItem value=""><em>All Personas</em></MenuItem>
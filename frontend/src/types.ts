@@ -49,10 +49,11 @@ export interface Thought {
 }
 
 export interface PaginatedResponse {
-    total: number;
+    total: number | null;
     page: number;
     limit: number;
     items: Thought[];
+    next_cursor: string | null;
 }
 
 export interface Message {
@@ -84,6 +85,12 @@ export interface MovieCharacter {
     character_name: string;
 }
 
+export interface MovieSearchFacets {
+    genres: Record<string, number>;
+    decades: Record<string, number>;
+}
+
 export interface MovieSearchResponse {
     results: MovieCharacter[];
+    facets?: MovieSearchFacets | null;
 }
@@ -0,0 +1,340 @@
+import ast
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+SOURCE_ENCODING = "iso-8859-1"
+FIELD_SEPARATOR = "+++$+++"
+# movie_lines.txt has five fields; the separator may appear in the text itself
+LINE_FIELDS = 5
+
+
+def parse_line(line: str, maxsplit: int = -1) -> List[str]:
+    return [part.strip() for part in line.split(FIELD_SEPARATOR, maxsplit)]
+
+
+def parse_literal_list(value: str) -> Optional[list]:
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+    return parsed if isinstance(parsed, list) else None
+
+
+class DialogueCorpus(ABC):
+    """A dialogue dataset that can be streamed into a MovieDatasetIndex.
+
+    Every corpus is described as movies, characters, conversations and
+    lines; the index builder only ever sees these iterators, so indexing,
+    sampling and dialogue lookup are shared by all formats.
+    """
+
+    name: str = ""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    @property
+    @abstractmethod
+    def source_files(self) -> Tuple[str, ...]:
+        """File names under `data_dir` that the corpus is read from."""
+
+    def exists(self) -> bool:
+        return any(
+            os.path.exists(os.path.join(self.data_dir, name))
+            for name in self.source_files
+        )
+
+    def source_signature(self) -> Dict[str, List[int]]:
+        """Size and mtime of every source file, used to detect a stale index."""
+        signature = {}
+        for name in self.source_files:
+            path = os.path.join(self.data_dir, name)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                signature[name] = [stat.st_size, stat.st_mtime_ns]
+        return signature
+
+    @abstractmethod
+    def iter_movies(self) -> Iterator[Tuple[str, str, str, str, list]]:
+        """(movie_id, title, year, imdb_rating, genres) per movie."""
+
+    @abstractmethod
+    def iter_characters(self) -> Iterator[Tuple[str, str, str]]:
+        """(character_id, name, movie_id) per character, in corpus order."""
+
+    @abstractmethod
+    def iter_conversations(self) -> Iterator[Tuple[List[str], List[str]]]:
+        """(participant character ids, line ids) per conversation."""
+
+    @abstractmethod
+    def iter_lines(self) -> Iterator[Tuple[str, str]]:
+        """(line_id, text) per line."""
+
+    def lines_file(self) -> Optional[Tuple[str, str]]:
+        """Path and encoding of a source file the line texts can be read from in place.
+
+        Corpora returning None have their lines copied into a file next to
+        the index instead; those returning a path are indexed from
+        `iter_line_offsets`.
+        """
+        return None
+
+    @abstractmethod
+    def iter_line_offsets(self) -> Iterator[Tuple[str, int, int]]:
+        """(line_id, offset, length) in bytes of each line's text in `lines_file()`.
+
+        Only read when `lines_file()` returns a path; it should stream the
+        file so the index build never holds the line texts in memory.
+        """
+
+
+class CornellCorpus(DialogueCorpus):
+    """The Cornell Movie-Dialogs Corpus, `+++$+++`-separated text files."""
+
+    name = "cornell"
+
+    TITLES_FILE = "movie_titles_metadata.txt"
+    CHARACTERS_FILE = "movie_characters_metadata.txt"
+    CONVERSATIONS_FILE = "movie_conversations.txt"
+    LINES_FILE = "movie_lines.txt"
+
+    @property
+    def source_files(self) -> Tuple[str, ...]:
+        return (
+            self.TITLES_FILE,
+            self.CHARACTERS_FILE,
+            self.CONVERSATIONS_FILE,
+            self.LINES_FILE,
+        )
+
+    def _read_source(self, name: str, maxsplit: int = -1) -> Iterator[List[str]]:
+        path = os.path.join(self.data_dir, name)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding=SOURCE_ENCODING) as f:
+            for line in f:
+                yield parse_line(line, maxsplit)
+
+    def iter_movies(self) -> Iterator[Tuple[str, str, str, str, list]]:
+        for parts in self._read_source(self.TITLES_FILE):
+            if len(parts) < 6:
+                continue
+            movie_id, title, year, rating, _votes, genres = parts[:6]
+            yield movie_id, title, year, rating, parse_literal_list(genres) or []
+
+    def iter_characters(self) -> Iterator[Tuple[str, str, str]]:
+        for parts in self._read_source(self.CHARACTERS_FILE):
+            if len(parts) >= 4:
+                yield parts[0], parts[1], parts[2]
+
+    def iter_conversations(self) -> Iterator[Tuple[List[str], List[str]]]:
+        for parts in self._read_source(self.CONVERSATIONS_FILE):
+            if len(parts) < 4:
+                continue
+            line_ids = parse_literal_list(parts[3])
+            if line_ids is not None:
+                yield [parts[0], parts[1]], line_ids
+
+    def iter_lines(self) -> Iterator[Tuple[str, str]]:
+        for parts in self._read_source(self.LINES_FILE, LINE_FIELDS - 1):
+            if len(parts) == LINE_FIELDS:
+                yield parts[0], parts[-1]
+
+    def lines_file(self) -> Optional[Tuple[str, str]]:
+        path = os.path.abspath(os.path.join(self.data_dir, self.LINES_FILE))
+        return path, SOURCE_ENCODING
+
+    def iter_line_offsets(self) -> Iterator[Tuple[str, int, int]]:
+        """Offsets straight into movie_lines.txt, so the text is never copied.
+
+        The corpus encoding is single-byte, so character positions in the
+        decoded text are byte offsets in the file. `newline=""` keeps line
+        endings untranslated for the same reason. Lines are split like
+        `iter_lines` does, so a separator inside the text stays part of it.
+        """
+        path = os.path.join(self.data_dir, self.LINES_FILE)
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, "r", encoding=SOURCE_ENCODING, newline="") as f:
+            for line in f:
+                parts = line.split(FIELD_SEPARATOR, LINE_FIELDS - 1)
+                if len(parts) == LINE_FIELDS:
+                    field = parts[-1]
+                    text_start = len(line) - len(field)
+                    leading = len(field) - len(field.lstrip())
+                    text = field.strip()
+                    yield parts[0].strip(), offset + text_start + leading, len(text)
+                offset += len(line)
+
+
+class UtteranceCorpus(DialogueCorpus):
+    """One row per utterance, e.g. a screenplay dump exported as CSV or JSONL.
+
+    Required fields are `conversation_id`, `speaker_id` and `text`. Optional
+    fields fill in the rest: `line_id` (defaults to `<conversation_id>-<n>`),
+    `speaker_name`, `movie_id`, `movie_title`, `movie_year`,
+    `movie_imdb_rating` and `movie_genres`. Rows of one conversation must be
+    contiguous and in speaking order. Each pass streams the file, so only
+    the distinct movies and characters are ever held in memory.
+    """
+
+    DEFAULT_MOVIE_ID = "default"
+
+    @property
+    @abstractmethod
+    def source_file(self) -> str:
+        """The single file under `data_dir` holding every utterance."""
+
+    @property
+    def source_files(self) -> Tuple[str, ...]:
+        return (self.source_file,)
+
+    @abstractmethod
+    def _iter_rows(self) -> Iterator[dict]:
+        """Raw rows of the source file as dicts."""
+
+    def _parse_genres(self, value) -> list:
+        if isinstance(value, list):
+            return value
+        return [genre.strip() for genre in str(value or "").split("|") if genre.strip()]
+
+    def _iter_utterances(self) -> Iterator[dict]:
+        # Rows missing a required field are skipped, like malformed Cornell lines.
+        for row in self._iter_rows():
+            if not row.get("conversation_id") or not row.get("speaker_id"):
+                continue
+            if row.get("text") is None:
+                continue
+            yield row
+
+    def iter_movies(self) -> Iterator[Tuple[str, str, str, str, list]]:
+        seen = set()
+        for row in self._iter_utterances():
+            movie_id = str(row.get("movie_id") or self.DEFAULT_MOVIE_ID)
+            if movie_id in seen:
+                continue
+            seen.add(movie_id)
+            yield (
+                movie_id,
+                str(row.get("movie_title") or movie_id),
+                str(row.get("movie_year") or ""),
+                str(row.get("movie_imdb_rating") or ""),
+                self._parse_genres(row.get("movie_genres")),
+            )
+
+    def iter_characters(self) -> Iterator[Tuple[str, str, str]]:
+        seen = set()
+        for row in self._iter_utterances():
+            character_id = str(row["speaker_id"])
+            if character_id in seen:
+                continue
+            seen.add(character_id)
+            yield (
+                character_id,
+                str(row.get("speaker_name") or character_id),
+                str(row.get("movie_id") or self.DEFAULT_MOVIE_ID),
+            )
+
+    def _iter_line_rows(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(conversation_id, line_id, speaker_id, text) per utterance."""
+        current = None
+        n = 0
+        for row in self._iter_utterances():
+            conversation_id = str(row["conversation_id"])
+            n = n + 1 if conversation_id == current else 0
+            current = conversation_id
+            line_id = str(row.get("line_id") or f"{conversation_id}-{n}")
+            yield conversation_id, line_id, str(row["speaker_id"]), str(row["text"])
+
+    def iter_conversations(self) -> Iterator[Tuple[List[str], List[str]]]:
+        current = None
+        participants: List[str] = []
+        line_ids: List[str] = []
+        for conversation_id, line_id, speaker_id, _text in self._iter_line_rows():
+            if conversation_id != current:
+                if line_ids:
+                    yield participants, line_ids
+                current = conversation_id
+                participants, line_ids = [], []
+            if speaker_id not in participants:
+                participants.append(speaker_id)
+            line_ids.append(line_id)
+        if line_ids:
+            yield participants, line_ids
+
+    def iter_lines(self) -> Iterator[Tuple[str, str]]:
+        for _conversation_id, line_id, _speaker_id, text in self._iter_line_rows():
+            yield line_id, text.strip()
+
+    def iter_line_offsets(self) -> Iterator[Tuple[str, int, int]]:
+        # The texts are copied next to the index, see `lines_file`.
+        return iter(())
+
+
+class JsonlCorpus(UtteranceCorpus):
+    """Utterances as one JSON object per line in `dialogues.jsonl`."""
+
+    name = "jsonl"
+    source_file = "dialogues.jsonl"
+
+    def _iter_rows(self) -> Iterator[dict]:
+        path = os.path.join(self.data_dir, self.source_file)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(row, dict):
+                    yield row
+
+
+class CsvCorpus(UtteranceCorpus):
+    """Utterances as rows of `dialogues.csv`, with a header row naming the fields.
+
+    `movie_genres` is a `|`-separated list in this format.
+    """
+
+    name = "csv"
+    source_file = "dialogues.csv"
+
+    def _iter_rows(self) -> Iterator[dict]:
+        path = os.path.join(self.data_dir, self.source_file)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+CORPUS_FORMATS: Dict[str, Type[DialogueCorpus]] = {
+    CornellCorpus.name: CornellCorpus,
+    JsonlCorpus.name: JsonlCorpus,
+    CsvCorpus.name: CsvCorpus,
+}
+
+
+def load_corpus(data_dir: str, corpus_format: Optional[str] = None) -> DialogueCorpus:
+    """Returns the corpus reader for `data_dir`.
+
+    Without an explicit format, the first format whose files are present is
+    used, falling back to Cornell.
+    """
+    if corpus_format:
+        corpus_cls = CORPUS_FORMATS.get(corpus_format.lower())
+        if corpus_cls is None:
+            raise ValueError(f"Unsupported corpus format: {corpus_format}")
+        return corpus_cls(data_dir)
+
+    for corpus_cls in CORPUS_FORMATS.values():
+        corpus = corpus_cls(data_dir)
+        if corpus.exists():
+            return corpus
+    return CornellCorpus(data_dir)
@@ -0,0 +1,341 @@
+import math
+import os
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from libs.dataset_service.movie_index import MovieDatasetIndex, decade_of
+
+NGRAM_SIZE = 3
+
+
+def _deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate retained size of `obj`, following containers once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            _deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def _ngrams(text: str) -> set:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _build_ngram_index(texts: List[str]) -> Dict[str, array]:
+    postings: Dict[str, array] = {}
+    for position, text in enumerate(texts):
+        for gram in _ngrams(text):
+            postings.setdefault(gram, array("l")).append(position)
+    return postings
+
+
+def _substring_matches(
+    query: str, texts: List[str], postings: Dict[str, array]
+) -> List[int]:
+    """Positions of `texts` containing `query`, narrowed down by n-gram postings."""
+    grams = _ngrams(query)
+    if not grams:
+        # Too short to use the n-gram index
+        return [p for p, text in enumerate(texts) if query in text]
+    lists = sorted((postings.get(gram, ()) for gram in grams), key=len)
+    candidates = set(lists[0])
+    for posting in lists[1:]:
+        if not candidates:
+            break
+        candidates.intersection_update(posting)
+    # Shared n-grams do not guarantee a contiguous match, so verify each hit
+    return sorted(p for p in candidates if query in texts[p])
+
+
+def _iter_bits(bits: int) -> Iterator[int]:
+    """Set bit positions of `bits` in ascending order."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class MovieCorpusCache:
+    """Resident, column-oriented copy of the movie and character metadata.
+
+    Movies and characters are held in parallel arrays indexed by position,
+    so searches and random sampling never touch the disk once loaded.
+
+    Searches go through a faceted index: n-gram postings for title and
+    character-name substrings, character bitmaps (Python ints, one bit per
+    character position) for every genre, year and decade, and the distinct
+    ratings in sorted order with one suffix bitmap each for minimum-rating
+    filters. A query is the
+    intersection of the relevant bitmaps, and facet counts are popcounts of
+    that intersection with each genre and decade bitmap.
+    """
+
+    def __init__(self, index: MovieDatasetIndex):
+        started = time.perf_counter()
+
+        self.movie_ids: List[str] = []
+        self.movie_titles: List[str] = []
+        self.movie_titles_lower: List[str] = []
+        self.movie_years: List[str] = []
+        self.movie_ratings: List[str] = []
+        # NaN for unparseable ratings, so every `>=` comparison excludes them
+        self.movie_rating_values = array("d")
+        self.movie_genres: List[Tuple[str, ...]] = []
+        self.genre_movies: Dict[str, List[int]] = {}
+
+        movie_positions: Dict[str, int] = {}
+        for movie_id, title, year, rating, rating_value, genres in index.iter_movies():
+            position = len(self.movie_ids)
+            movie_positions[movie_id] = position
+            self.movie_ids.append(movie_id)
+            self.movie_titles.append(title)
+            self.movie_titles_lower.append(title.lower())
+            self.movie_years.append(year)
+            self.movie_ratings.append(rating)
+            self.movie_rating_values.append(
+                math.nan if rating_value is None else rating_value
+            )
+            self.movie_genres.append(tuple(sys.intern(str(g)) for g in genres))
+            for genre in {str(g).lower() for g in genres}:
+                self.genre_movies.setdefault(sys.intern(genre), []).append(position)
+
+        self.character_ids: List[str] = []
+        self.character_names: List[str] = []
+        self.character_names_lower: List[str] = []
+        self.character_movies = array("l")
+        for character_id, name, movie_id in index.iter_characters():
+            self.character_ids.append(character_id)
+            self.character_names.append(name)
+            self.character_names_lower.append(name.lower())
+            self.character_movies.append(movie_positions[movie_id])
+
+        self._build_search_index()
+
+        self.load_seconds = time.perf_counter() - started
+        self.memory_bytes = _deep_sizeof(
+            [
+                self.movie_ids,
+                self.movie_titles,
+                self.movie_titles_lower,
+                self.movie_years,
+                self.movie_ratings,
+                self.movie_rating_values,
+                self.movie_genres,
+                self.genre_movies,
+                self.character_ids,
+                self.character_names,
+                self.character_names_lower,
+                self.character_movies,
+                self.movie_characters,
+                self.genre_bits,
+                self.year_bits,
+                self.decade_bits,
+                self.rating_values_sorted,
+                self.rating_suffix_bits,
+                self.title_ngrams,
+                self.name_ngrams,
+            ]
+        )
+
+    def _bits_from_positions(self, positions: Iterable[int]) -> int:
+        bitmap = bytearray((len(self.character_ids) + 7) // 8)
+        for position in positions:
+            bitmap[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bitmap, "little")
+
+    def _build_search_index(self) -> None:
+        self.movie_characters = [array("l") for _ in self.movie_ids]
+        for position, movie in enumerate(self.character_movies):
+            self.movie_characters[movie].append(position)
+        movie_characters = self.movie_characters
+        self.all_bits = (1 << len(self.character_ids)) - 1
+
+        self.genre_bits = {
+            genre: self._bits_from_positions(
+                p for movie in movies for p in movie_characters[movie]
+            )
+            for genre, movies in self.genre_movies.items()
+        }
+
+        year_movies: Dict[str, List[int]] = {}
+        decade_movies: Dict[str, List[int]] = {}
+        for movie, year in enumerate(self.movie_years):
+            year_movies.setdefault(year, []).append(movie)
+            decade = decade_of(year)
+            if decade:
+                decade_movies.setdefault(decade, []).append(movie)
+        self.year_bits = {
+            year: self._bits_from_positions(
+                p for movie in movies for p in movie_characters[movie]
+            )
+            for year, movies in year_movies.items()
+        }
+        self.decade_bits = {
+            decade: self._bits_from_positions(
+                p for movie in movies for p in movie_characters[movie]
+            )
+            for decade, movies in decade_movies.items()
+        }
+
+        # rating_suffix_bits[i] holds every character whose movie is rated at
+        # least rating_values_sorted[i]; unrated movies are left out entirely.
+        # Ratings have few distinct values, which keeps this list short.
+        rating_movies: Dict[float, List[int]] = {}
+        for movie, value in enumerate(self.movie_rating_values):
+            if not math.isnan(value):
+                rating_movies.setdefault(value, []).append(movie)
+        self.rating_values_sorted = array("d", sorted(rating_movies))
+        self.rating_suffix_bits = [0] * (len(self.rating_values_sorted) + 1)
+        for i in range(len(self.rating_values_sorted) - 1, -1, -1):
+            self.rating_suffix_bits[i] = self.rating_suffix_bits[
+                i + 1
+            ] | self._bits_from_positions(
+                p
+                for movie in rating_movies[self.rating_values_sorted[i]]
+                for p in movie_characters[movie]
+            )
+
+        self.title_ngrams = _build_ngram_index(self.movie_titles_lower)
+        self.name_ngrams = _build_ngram_index(self.character_names_lower)
+
+    def _match_bits(
+        self,
+        title_query: Optional[str],
+        genre: Optional[str],
+        min_imdb_rating: Optional[float],
+        release_year: Optional[str],
+        character_name: Optional[str],
+    ) -> int:
+        bits = self.all_bits
+        if genre:
+            bits &= self.genre_bits.get(genre.lower(), 0)
+        if release_year:
+            bits &= self.year_bits.get(release_year, 0)
+        if min_imdb_rating is not None:
+            start = bisect_left(self.rating_values_sorted, min_imdb_rating)
+            bits &= self.rating_suffix_bits[start]
+        if title_query and bits:
+            movies = _substring_matches(
+                title_query.lower(), self.movie_titles_lower, self.title_ngrams
+            )
+            bits &= self._bits_from_positions(
+                p for movie in movies for p in self.movie_characters[movie]
+            )
+        if character_name and bits:
+            bits &= self._bits_from_positions(
+                _substring_matches(
+                    character_name.lower(),
+                    self.character_names_lower,
+                    self.name_ngrams,
+                )
+            )
+        return bits
+
+    def _character_dict(self, position: int) -> dict:
+        movie = self.character_movies[position]
+        return {
+            "movie_id": self.movie_ids[movie],
+            "movie_title": self.movie_titles[movie],
+            "movie_year": self.movie_years[movie],
+            "movie_imdb_rating": self.movie_ratings[movie],
+            "movie_genres": list(self.movie_genres[movie]),
+            "character_id": self.character_ids[position],
+            "character_name": self.character_names[position],
+        }
+
+    def search_characters(
+        self,
+        title_query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_imdb_rating: Optional[float] = None,
+        release_year: Optional[str] = None,
+        character_name: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        bits = self._match_bits(
+            title_query, genre, min_imdb_rating, release_year, character_name
+        )
+        results = []
+        for position in _iter_bits(bits):
+            if len(results) >= limit:
+                break
+            results.append(self._character_dict(position))
+        return results
+
+    def facet_counts(
+        self,
+        title_query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_imdb_rating: Optional[float] = None,
+        release_year: Optional[str] = None,
+        character_name: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """Number of matching characters per genre and per release decade."""
+        bits = self._match_bits(
+            title_query, genre, min_imdb_rating, release_year, character_name
+        )
+        facets: Dict[str, Dict[str, int]] = {"genres": {}, "decades": {}}
+        for name, bitmaps in (
+            ("genres", self.genre_bits),
+            ("decades", self.decade_bits),
+        ):
+            for key in sorted(bitmaps):
+                count = (bits & bitmaps[key]).bit_count()
+                if count:
+                    facets[name][key] = count
+        return facets
+
+    def get_random_characters(self, limit: int, seed: float) -> List[dict]:
+        # Sampling positions draws the same elements for a given seed as
+        # sampling the full list would, but only builds the k chosen dicts.
+        rng = random.Random(seed)
+        total = len(self.character_ids)
+        positions = rng.sample(range(total), min(limit, total))
+        return [self._character_dict(p) for p in positions]
+
+    def stats(self) -> dict:
+        return {
+            "movies": len(self.movie_ids),
+            "characters": len(self.character_ids),
+            "genres": len(self.genre_movies),
+            "load_time_ms": round(self.load_seconds * 1000, 3),
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+_caches: Dict[Tuple[str, int], MovieCorpusCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_corpus_cache(index: MovieDatasetIndex) -> MovieCorpusCache:
+    """Returns the process-wide cache for `index`, loading it on first use."""
+    # Keyed on the index mtime so a rebuilt index is reloaded.
+    key = (index.index_path, os.stat(index.index_path).st_mtime_ns)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            # Drop the caches of earlier builds of the same index.
+            for old_key in [k for k in _caches if k[0] == index.index_path]:
+                del _caches[old_key]
+            cache = MovieCorpusCache(index)
+            _caches[key] = cache
+        return cache
+
+
+def get_loaded_corpus_cache(index: MovieDatasetIndex) -> Optional[MovieCorpusCache]:
+    """The cache for `index` if it has already been loaded, without loading it."""
+    key = (index.index_path, os.stat(index.index_path).st_mtime_ns)
+    with _caches_lock:
+        return _caches.get(key)
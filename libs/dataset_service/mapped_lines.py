@@ -0,0 +1,74 @@
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from libs.dataset_service.movie_index import MovieDatasetIndex
+
+
+class MappedLineStore:
+    """Memory-mapped view of the corpus lines file with a sorted offset table.
+
+    The file is mapped read-only, so every worker process shares the same
+    page cache pages, and only the requested lines are ever decoded.
+    """
+
+    def __init__(self, index: MovieDatasetIndex):
+        self.path, self.encoding = index.get_lines_source()
+        self._line_ids: List[str] = []
+        self._offsets = array("q")
+        self._lengths = array("l")
+        for line_id, offset, length in index.iter_line_offsets():
+            self._line_ids.append(line_id)
+            self._offsets.append(offset)
+            self._lengths.append(length)
+
+        # mmap refuses empty files; there is nothing to look up in that case.
+        self._mmap = b""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._line_ids)
+
+    def get(self, line_id: str) -> str:
+        i = bisect_left(self._line_ids, line_id)
+        if i == len(self._line_ids) or self._line_ids[i] != line_id:
+            raise KeyError(line_id)
+        start = self._offsets[i]
+        return self._mmap[start : start + self._lengths[i]].decode(self.encoding)
+
+    def get_many(self, line_ids: List[str]) -> Dict[str, str]:
+        lines = {}
+        for line_id in line_ids:
+            try:
+                lines[line_id] = self.get(line_id)
+            except KeyError:
+                continue
+        return lines
+
+    def close(self) -> None:
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+
+_stores: Dict[Tuple[str, int], MappedLineStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_mapped_line_store(index: MovieDatasetIndex) -> MappedLineStore:
+    """Returns the process-wide store for `index`, loading it on first use."""
+    # Keyed on the index mtime so a rebuilt index gets a fresh offset table.
+    key = (index.index_path, os.stat(index.index_path).st_mtime_ns)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            # Unmap the stores of earlier builds of the same index.
+            for old_key in [k for k in _stores if k[0] == index.index_path]:
+                _stores.pop(old_key).close()
+            store = MappedLineStore(index)
+            _stores[key] = store
+        return store
@@ -1,10 +1,27 @@
 import os
-import ast
-from typing import List, Optional
+import random
+import time
+from typing import Dict, List, Optional, Union
+
+from libs.dataset_service.corpus_cache import (
+    MovieCorpusCache,
+    get_corpus_cache,
+    get_loaded_corpus_cache,
+)
+from libs.dataset_service.corpora import DialogueCorpus, load_corpus
+from libs.dataset_service.mapped_lines import get_mapped_line_store
+from libs.dataset_service.movie_index import MovieDatasetIndex, default_index_path
 
 
 class MovieDatasetService:
-    def __init__(self, data_dir: str = "/dataset/cornell_dialogs"):
+    def __init__(
+        self,
+        data_dir: str = "/dataset/cornell_dialogs",
+        index_path: Optional[str] = None,
+        mmap_lines: Optional[bool] = None,
+        use_cache: Optional[bool] = None,
+        corpus: Optional[DialogueCorpus] = None,
+    ):
         self.data_dir = data_dir
         # Check if the files are nested in the unzipped folder
         nested_dir = os.path.join(self.data_dir, "cornell movie-dialogs corpus")
@@ -16,8 +33,55 @@ class MovieDatasetService:
         if not os.path.exists(os.path.join(self.data_dir, "movie_titles_metadata.txt")) and os.path.exists(fallback_dir):
             self.data_dir = fallback_dir
 
-    def _parse_line(self, line: str) -> List[str]:
-        return [part.strip() for part in line.split("+++$+++")]
+        # Cornell by default; other dialogue datasets plug in through the same
+        # index, so sampling and dialogue lookup work the same for all of them.
+        self.corpus = corpus or load_corpus(
+            self.data_dir, os.getenv("MOVIE_DATASET_FORMAT")
+        )
+        self.index_path = (
+            index_path
+            or os.getenv("MOVIE_DATASET_INDEX_PATH")
+            or default_index_path(self.data_dir)
+        )
+        # Memory-map movie_lines.txt and look lines up in a shared offset table
+        # instead of querying the index for every dialogue request.
+        if mmap_lines is None:
+            mmap_lines = (
+                os.getenv("MOVIE_DATASET_MMAP_LINES", "false").lower() == "true"
+            )
+        self.mmap_lines = mmap_lines
+        # Serve searches and random sampling from a process-wide in-memory copy
+        # of the movie and character metadata.
+        if use_cache is None:
+            use_cache = os.getenv("MOVIE_DATASET_CACHE", "false").lower() == "true"
+        self.use_cache = use_cache
+        self._index: Optional[MovieDatasetIndex] = None
+
+    def _get_index(self) -> Optional[MovieDatasetIndex]:
+        # The index is built from the raw files on first use (or ahead of time
+        # via scripts/build_movie_index.py) and reused for the service lifetime.
+        if self._index is None:
+            self._index = MovieDatasetIndex.open(self.corpus, self.index_path)
+        return self._index
+
+    def build_index(self) -> MovieDatasetIndex:
+        self._index = MovieDatasetIndex.build(self.corpus, self.index_path)
+        return self._index
+
+    def warm_cache(self) -> Optional[MovieCorpusCache]:
+        """Loads the resident corpus cache ahead of the first request."""
+        if not self.use_cache:
+            return None
+        index = self._get_index()
+        return get_corpus_cache(index) if index is not None else None
+
+    def cache_stats(self) -> dict:
+        index = self._get_index() if self.use_cache else None
+        cache = get_loaded_corpus_cache(index) if index is not None else None
+        stats = {"enabled": self.use_cache, "loaded": cache is not None}
+        if cache is not None:
+            stats.update(cache.stats())
+        return stats
 
     def search_characters(
         self,
@@ -28,226 +92,127 @@ class MovieDatasetService:
         character_name: Optional[str] = None,
         limit: int = 50,
     ) -> List[dict]:
-        titles_file = os.path.join(self.data_dir, "movie_titles_metadata.txt")
-        characters_file = os.path.join(self.data_dir, "movie_characters_metadata.txt")
-
+        index = self._get_index()
         # Fallback to empty if not exists (for tests)
-        if not os.path.exists(titles_file) or not os.path.exists(characters_file):
-            return []
-
-        # Read movies
-        valid_movies = {}
-        with open(titles_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 6:
-                    movie_id, title, year, rating_str, votes, genres_str = parts[:6]
-                    
-                    if title_query and title_query.lower() not in title.lower():
-                        continue
-                        
-                    try:
-                        movie_genres = ast.literal_eval(genres_str)
-                    except:
-                        movie_genres = []
-                        
-                    if genre and genre.lower() not in [g.lower() for g in movie_genres]:
-                        continue
-                        
-                    if release_year and release_year != year:
-                        continue
-                        
-                    if min_imdb_rating is not None:
-                        try:
-                            rating = float(rating_str)
-                            if rating < min_imdb_rating:
-                                continue
-                        except ValueError:
-                            continue
-                            
-                    valid_movies[movie_id] = {
-                        "movie_id": movie_id,
-                        "movie_title": title,
-                        "movie_year": year,
-                        "movie_imdb_rating": rating_str,
-                        "movie_genres": movie_genres,
-                    }
-
-        if not valid_movies:
+        if index is None:
             return []
 
-        # Read characters
-        results = []
-        with open(characters_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 4:
-                    char_id, char_name, movie_id, movie_title = parts[:4]
-                    if movie_id in valid_movies:
-                        if character_name and character_name.lower() not in char_name.lower():
-                            continue
-                        movie_info = valid_movies[movie_id]
-                        results.append({
-                            **movie_info,
-                            "character_id": char_id,
-                            "character_name": char_name,
-                        })
-                        if len(results) >= limit:
-                            break
-
-        return results
+        source = get_corpus_cache(index) if self.use_cache else index
+        return source.search_characters(
+            title_query=title_query,
+            genre=genre,
+            min_imdb_rating=min_imdb_rating,
+            release_year=release_year,
+            character_name=character_name,
+            limit=limit,
+        )
+
+    def get_facet_counts(
+        self,
+        title_query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_imdb_rating: Optional[float] = None,
+        release_year: Optional[str] = None,
+        character_name: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        index = self._get_index()
+        if index is None:
+            return {"genres": {}, "decades": {}}
+
+        source = get_corpus_cache(index) if self.use_cache else index
+        return source.facet_counts(
+            title_query=title_query,
+            genre=genre,
+            min_imdb_rating=min_imdb_rating,
+            release_year=release_year,
+            character_name=character_name,
+        )
 
     def get_character_by_id(self, character_id: str) -> Optional[dict]:
-        titles_file = os.path.join(self.data_dir, "movie_titles_metadata.txt")
-        characters_file = os.path.join(self.data_dir, "movie_characters_metadata.txt")
-
-        if not os.path.exists(titles_file) or not os.path.exists(characters_file):
+        index = self._get_index()
+        if index is None:
             return None
-
-        # Find character first
-        char_info = None
-        with open(characters_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 4 and parts[0] == character_id:
-                    char_info = {
-                        "character_id": parts[0],
-                        "character_name": parts[1],
-                        "movie_id": parts[2],
-                    }
-                    break
-        
-        if not char_info:
-            return None
-            
-        # Find movie
-        with open(titles_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 6 and parts[0] == char_info["movie_id"]:
-                    import ast
-                    try:
-                        movie_genres = ast.literal_eval(parts[5])
-                    except:
-                        movie_genres = []
-                        
-                    return {
-                        **char_info,
-                        "movie_title": parts[1],
-                        "movie_year": parts[2],
-                        "movie_imdb_rating": parts[3],
-                        "movie_genres": movie_genres,
-                    }
-        return None
+        return index.get_character(character_id)
 
     def get_character_dialogues(self, character_id: str, limit: int = 100) -> List[List[str]]:
-        conversations_file = os.path.join(self.data_dir, "movie_conversations.txt")
-        lines_file = os.path.join(self.data_dir, "movie_lines.txt")
-
-        if not os.path.exists(conversations_file) or not os.path.exists(lines_file):
-            return []
-
-        # Find conversations involving the character
-        conv_line_ids = []
-        with open(conversations_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 4:
-                    char1_id, char2_id, movie_id, lines_str = parts[:4]
-                    if character_id == char1_id or character_id == char2_id:
-                        try:
-                            line_ids = ast.literal_eval(lines_str)
-                            conv_line_ids.append(line_ids)
-                        except:
-                            pass
-                if len(conv_line_ids) >= limit:
-                    break
-        
-        if not conv_line_ids:
-            return []
-            
-        # Collect all required line IDs to avoid scanning multiple times
+        return self.get_dialogues_for_characters([character_id], limit)[character_id]
+
+    def get_dialogues_for_characters(
+        self, character_ids: List[str], limits: Union[int, List[int]] = 100
+    ) -> Dict[str, List[List[str]]]:
+        """Dialogues of several characters, resolved with one pass over the index.
+
+        `limits` caps the number of conversations per character, either as a
+        single value for all of them or one value per entry of `character_ids`.
+        A character listed more than once is looked up once, with the largest
+        of its limits.
+        """
+        if isinstance(limits, int):
+            limits = [limits] * len(character_ids)
+        if len(limits) != len(character_ids):
+            raise ValueError(
+                f"Got {len(limits)} limits for {len(character_ids)} characters."
+            )
+        limit_by_character: Dict[str, int] = {}
+        for character_id, limit in zip(character_ids, limits):
+            limit_by_character[character_id] = max(
+                limit, limit_by_character.get(character_id, limit)
+            )
+        dialogues_by_character: Dict[str, List[List[str]]] = {
+            character_id: [] for character_id in limit_by_character
+        }
+
+        index = self._get_index()
+        if index is None:
+            return dialogues_by_character
+
+        # Find conversations involving each character
+        conv_line_ids = index.get_conversation_line_ids(limit_by_character)
+
+        # Resolve every required line in a single lookup
         required_line_ids = set()
-        for c in conv_line_ids:
-            required_line_ids.update(c)
-            
-        # Parse lines
-        lines_map = {}
-        with open(lines_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 5:
-                    line_id = parts[0]
-                    if line_id in required_line_ids:
-                        text = parts[-1]
-                        lines_map[line_id] = text
-
-        dialogues = []
-        for c in conv_line_ids:
-            dialogue = []
-            for line_id in c:
-                if line_id in lines_map:
-                    dialogue.append(lines_map[line_id])
-            if dialogue:
-                dialogues.append(dialogue)
-
-        return dialogues
+        for conversations in conv_line_ids.values():
+            for c in conversations:
+                required_line_ids.update(c)
+        if not required_line_ids:
+            return dialogues_by_character
+
+        if self.mmap_lines:
+            lines_map = get_mapped_line_store(index).get_many(list(required_line_ids))
+        else:
+            lines_map = index.get_lines(list(required_line_ids))
+
+        for character_id, conversations in conv_line_ids.items():
+            dialogues = dialogues_by_character[character_id]
+            for c in conversations:
+                dialogue = []
+                for line_id in c:
+                    if line_id in lines_map:
+                        dialogue.append(lines_map[line_id])
+                if dialogue:
+                    dialogues.append(dialogue)
+
+        return dialogues_by_character
 
     def get_random_characters(self, limit: int = 50, seed: Optional[float] = None) -> List[dict]:
-        import random
-        import time
-        
-        titles_file = os.path.join(self.data_dir, "movie_titles_metadata.txt")
-        characters_file = os.path.join(self.data_dir, "movie_characters_metadata.txt")
-
+        index = self._get_index()
         # Fallback to empty if not exists (for tests)
-        if not os.path.exists(titles_file) or not os.path.exists(characters_file):
+        if index is None:
             return []
 
-        # 1. Read all movies into memory
-        valid_movies = {}
-        with open(titles_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 6:
-                    movie_id, title, year, rating_str, votes, genres_str = parts[:6]
-                    try:
-                        movie_genres = ast.literal_eval(genres_str)
-                    except:
-                        movie_genres = []
-                    valid_movies[movie_id] = {
-                        "movie_id": movie_id,
-                        "movie_title": title,
-                        "movie_year": year,
-                        "movie_imdb_rating": rating_str,
-                        "movie_genres": movie_genres,
-                    }
-
-        if not valid_movies:
-            return []
+        if seed is None:
+            seed = time.time()
+
+        if self.use_cache:
+            return get_corpus_cache(index).get_random_characters(limit, seed)
 
-        # 2. Read all characters into a list
-        all_characters = []
-        with open(characters_file, "r", encoding="iso-8859-1") as f:
-            for line in f:
-                parts = self._parse_line(line)
-                if len(parts) >= 4:
-                    char_id, char_name, movie_id, movie_title = parts[:4]
-                    if movie_id in valid_movies:
-                        movie_info = valid_movies[movie_id]
-                        all_characters.append({
-                            **movie_info,
-                            "character_id": char_id,
-                            "character_name": char_name,
-                        })
-
-        if not all_characters:
+        # Characters are stored at contiguous positions, so a sample of
+        # positions picks the same characters as sampling the full list with
+        # this seed, while only the sampled rows are read.
+        total = index.count_characters()
+        if not total:
             return []
 
-        if seed is None:
-            seed = time.time()
-            
         rng = random.Random(seed)
-        sample_size = min(limit, len(all_characters))
-        return rng.sample(all_characters, sample_size)
-
+        positions = rng.sample(range(total), min(limit, total))
+        return index.get_characters_at(positions)
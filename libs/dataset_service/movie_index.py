@@ -0,0 +1,484 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from libs.dataset_service.corpora import DialogueCorpus
+
+# Bump whenever the schema or the parsing rules below change so that stale
+# index files are rebuilt instead of being read with the wrong layout.
+INDEX_VERSION = 4
+INDEX_FILENAME = "movie_index.sqlite3"
+# Line texts of corpora that cannot be read in place are copied here.
+LINES_SUFFIX = ".lines"
+LINES_ENCODING = "utf-8"
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE movie (
+    movie_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_lower TEXT NOT NULL,
+    year TEXT NOT NULL,
+    imdb_rating TEXT NOT NULL,
+    rating_value REAL,
+    genres TEXT NOT NULL
+);
+CREATE TABLE movie_genre (
+    genre TEXT NOT NULL,
+    movie_id TEXT NOT NULL,
+    PRIMARY KEY (genre, movie_id)
+) WITHOUT ROWID;
+CREATE TABLE character (
+    position INTEGER PRIMARY KEY,
+    character_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    movie_id TEXT NOT NULL
+);
+CREATE INDEX character_character_id_idx ON character (character_id);
+CREATE TABLE conversation (
+    position INTEGER PRIMARY KEY,
+    line_ids TEXT NOT NULL
+);
+CREATE TABLE character_conversation (
+    character_id TEXT NOT NULL,
+    conversation_position INTEGER NOT NULL,
+    PRIMARY KEY (character_id, conversation_position)
+) WITHOUT ROWID;
+CREATE TABLE line (
+    line_id TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+CHARACTER_COLUMNS = (
+    "c.character_id, c.name, m.movie_id, m.title, m.year, m.imdb_rating, m.genres"
+)
+
+
+def decade_of(year: str) -> Optional[str]:
+    """'1999' and '1999/I' both fall in '1990s'; unparseable years have none."""
+    return f"{year[:3]}0s" if year[:4].isdigit() else None
+
+
+def default_index_path(data_dir: str) -> str:
+    """Keeps the index next to the corpus, or in the temp dir if that is read-only."""
+    if os.access(data_dir, os.W_OK):
+        return os.path.join(data_dir, INDEX_FILENAME)
+    digest = hashlib.sha1(os.path.abspath(data_dir).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"movie_index_{digest}.sqlite3")
+
+
+class MovieDatasetIndex:
+    """Read-only SQLite index built once from the raw files of a dialogue corpus."""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self._lines_source: Optional[Tuple[str, str]] = None
+
+    @classmethod
+    def open(
+        cls, corpus: DialogueCorpus, index_path: str
+    ) -> Optional["MovieDatasetIndex"]:
+        """Returns an up-to-date index for `corpus`, building it if needed."""
+        signature = corpus.source_signature()
+        if not signature:
+            return None
+
+        index = cls(index_path)
+        if index.is_current(corpus.name, signature):
+            return index
+
+        try:
+            return cls.build(corpus, index_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error building movie dataset index at {index_path}: {e}")
+            return None
+
+    def is_current(self, corpus_name: str, signature: Dict[str, List[int]]) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with closing(self._connect()) as conn:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            return False
+        return (
+            meta.get("version") == str(INDEX_VERSION)
+            and meta.get("corpus") == corpus_name
+            and meta.get("signature") == json.dumps(signature, sort_keys=True)
+        )
+
+    @classmethod
+    def build(cls, corpus: DialogueCorpus, index_path: str) -> "MovieDatasetIndex":
+        """Streams the corpus into a fresh index file and swaps it in atomically."""
+        signature = corpus.source_signature()
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        tmp_lines_path = f"{index_path}{LINES_SUFFIX}.{os.getpid()}.tmp"
+        for path in (tmp_path, tmp_lines_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        lines_source = corpus.lines_file()
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.executescript(SCHEMA)
+            movie_ids = cls._ingest_movies(conn, corpus)
+            cls._ingest_characters(conn, corpus, movie_ids)
+            cls._ingest_conversations(conn, corpus)
+            if lines_source is None:
+                cls._ingest_lines(conn, cls._copy_lines(corpus, tmp_lines_path))
+                lines_source = (
+                    os.path.abspath(index_path + LINES_SUFFIX),
+                    LINES_ENCODING,
+                )
+            else:
+                cls._ingest_lines(conn, corpus.iter_line_offsets())
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("version", str(INDEX_VERSION)),
+                    ("corpus", corpus.name),
+                    ("signature", json.dumps(signature, sort_keys=True)),
+                    ("lines_path", lines_source[0]),
+                    ("lines_encoding", lines_source[1]),
+                ],
+            )
+            conn.commit()
+
+        # The lines file goes first so the new index never points at old text.
+        if os.path.exists(tmp_lines_path):
+            os.replace(tmp_lines_path, index_path + LINES_SUFFIX)
+        os.replace(tmp_path, index_path)
+        return cls(index_path)
+
+    @classmethod
+    def _ingest_movies(cls, conn: sqlite3.Connection, corpus: DialogueCorpus) -> set:
+        movies = {}
+        for movie_id, title, year, rating_str, genres in corpus.iter_movies():
+            try:
+                rating_value = float(rating_str)
+            except ValueError:
+                rating_value = None
+            movies[movie_id] = (
+                movie_id,
+                title,
+                title.lower(),
+                year,
+                rating_str,
+                rating_value,
+                json.dumps(genres),
+            )
+
+        conn.executemany(
+            "INSERT INTO movie VALUES (?, ?, ?, ?, ?, ?, ?)", movies.values()
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO movie_genre (genre, movie_id) VALUES (?, ?)",
+            (
+                (str(genre).lower(), movie_id)
+                for movie_id, *_, genres in movies.values()
+                for genre in json.loads(genres)
+            ),
+        )
+        return set(movies)
+
+    @classmethod
+    def _ingest_characters(
+        cls, conn: sqlite3.Connection, corpus: DialogueCorpus, movie_ids: set
+    ) -> None:
+        # Characters of movies missing from the corpus can never be
+        # returned, so they are dropped here and positions stay contiguous.
+        rows = (
+            (character_id, name, name.lower(), movie_id)
+            for character_id, name, movie_id in corpus.iter_characters()
+            if movie_id in movie_ids
+        )
+        conn.executemany(
+            "INSERT INTO character "
+            "(position, character_id, name, name_lower, movie_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((position, *row) for position, row in enumerate(rows)),
+        )
+
+    @classmethod
+    def _ingest_conversations(
+        cls, conn: sqlite3.Connection, corpus: DialogueCorpus
+    ) -> None:
+        conversations = []
+        postings = []
+        for position, (participants, line_ids) in enumerate(
+            corpus.iter_conversations()
+        ):
+            conversations.append((position, json.dumps(line_ids)))
+            postings.extend((character_id, position) for character_id in participants)
+
+        conn.executemany(
+            "INSERT INTO conversation (position, line_ids) VALUES (?, ?)",
+            conversations,
+        )
+        # Inverted index: character -> conversations, clustered by character so
+        # one range scan returns all of a character's conversations in order.
+        conn.executemany(
+            "INSERT OR IGNORE INTO character_conversation "
+            "(character_id, conversation_position) VALUES (?, ?)",
+            postings,
+        )
+
+    @staticmethod
+    def _copy_lines(
+        corpus: DialogueCorpus, path: str
+    ) -> Iterator[Tuple[str, int, int]]:
+        """Writes every line's text to `path`, yielding (line_id, offset, length)."""
+        offset = 0
+        with open(path, "wb") as f:
+            for line_id, text in corpus.iter_lines():
+                data = text.encode(LINES_ENCODING)
+                f.write(data)
+                yield line_id, offset, len(data)
+                offset += len(data)
+
+    @classmethod
+    def _ingest_lines(
+        cls, conn: sqlite3.Connection, offsets: Iterator[Tuple[str, int, int]]
+    ) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO line (line_id, offset, length) VALUES (?, ?, ?)",
+            offsets,
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = Path(os.path.abspath(self.index_path)).as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    @staticmethod
+    def _character_row_to_dict(row: Tuple) -> dict:
+        character_id, name, movie_id, title, year, rating, genres = row
+        return {
+            "movie_id": movie_id,
+            "movie_title": title,
+            "movie_year": year,
+            "movie_imdb_rating": rating,
+            "movie_genres": json.loads(genres),
+            "character_id": character_id,
+            "character_name": name,
+        }
+
+    @staticmethod
+    def _search_filter(
+        title_query: Optional[str],
+        genre: Optional[str],
+        min_imdb_rating: Optional[float],
+        release_year: Optional[str],
+        character_name: Optional[str],
+    ) -> Tuple[str, list]:
+        clauses = []
+        params: list = []
+        if title_query:
+            clauses.append("instr(m.title_lower, ?) > 0")
+            params.append(title_query.lower())
+        if genre:
+            clauses.append(
+                "m.movie_id IN (SELECT movie_id FROM movie_genre WHERE genre = ?)"
+            )
+            params.append(genre.lower())
+        if release_year:
+            clauses.append("m.year = ?")
+            params.append(release_year)
+        if min_imdb_rating is not None:
+            clauses.append("m.rating_value >= ?")
+            params.append(min_imdb_rating)
+        if character_name:
+            clauses.append("instr(c.name_lower, ?) > 0")
+            params.append(character_name.lower())
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def search_characters(
+        self,
+        title_query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_imdb_rating: Optional[float] = None,
+        release_year: Optional[str] = None,
+        character_name: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        where, params = self._search_filter(
+            title_query, genre, min_imdb_rating, release_year, character_name
+        )
+        query = (
+            f"SELECT {CHARACTER_COLUMNS} FROM character c "
+            f"JOIN movie m ON m.movie_id = c.movie_id {where} "
+            "ORDER BY c.position LIMIT ?"
+        )
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, (*params, limit)).fetchall()
+        return [self._character_row_to_dict(row) for row in rows]
+
+    def facet_counts(
+        self,
+        title_query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_imdb_rating: Optional[float] = None,
+        release_year: Optional[str] = None,
+        character_name: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """Number of matching characters per genre and per release decade."""
+        where, params = self._search_filter(
+            title_query, genre, min_imdb_rating, release_year, character_name
+        )
+        source = f"FROM character c JOIN movie m ON m.movie_id = c.movie_id {where}"
+        with closing(self._connect()) as conn:
+            conn.create_function("decade", 1, decade_of, deterministic=True)
+            genres = conn.execute(
+                "SELECT g.genre, count(*) FROM character c "
+                "JOIN movie m ON m.movie_id = c.movie_id "
+                f"JOIN movie_genre g ON g.movie_id = m.movie_id {where} "
+                "GROUP BY g.genre ORDER BY g.genre",
+                params,
+            ).fetchall()
+            decades = conn.execute(
+                f"SELECT decade(m.year) AS d, count(*) {source} "
+                "GROUP BY d HAVING d IS NOT NULL ORDER BY d",
+                params,
+            ).fetchall()
+        return {"genres": dict(genres), "decades": dict(decades)}
+
+    def get_character(self, character_id: str) -> Optional[dict]:
+        query = (
+            f"SELECT {CHARACTER_COLUMNS} FROM character c "
+            "JOIN movie m ON m.movie_id = c.movie_id "
+            "WHERE c.character_id = ? ORDER BY c.position LIMIT 1"
+        )
+        with closing(self._connect()) as conn:
+            row = conn.execute(query, (character_id,)).fetchone()
+        return self._character_row_to_dict(row) if row else None
+
+    def iter_movies(self) -> Iterator[Tuple[str, str, str, str, Optional[float], list]]:
+        """(movie_id, title, year, imdb_rating, rating_value, genres) per movie."""
+        with closing(self._connect()) as conn:
+            for row in conn.execute(
+                "SELECT movie_id, title, year, imdb_rating, rating_value, genres "
+                "FROM movie ORDER BY movie_id"
+            ):
+                yield (*row[:5], json.loads(row[5]))
+
+    def iter_characters(self) -> Iterator[Tuple[str, str, str]]:
+        """(character_id, name, movie_id) per character, in corpus order."""
+        with closing(self._connect()) as conn:
+            yield from conn.execute(
+                "SELECT character_id, name, movie_id FROM character ORDER BY position"
+            )
+
+    def count_characters(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT count(*) FROM character").fetchone()[0]
+
+    def get_characters_at(self, positions: List[int]) -> List[dict]:
+        """Characters at the given corpus positions, in the order requested."""
+        if not positions:
+            return []
+        placeholders = ", ".join("?" * len(positions))
+        query = (
+            f"SELECT c.position, {CHARACTER_COLUMNS} FROM character c "
+            "JOIN movie m ON m.movie_id = c.movie_id "
+            f"WHERE c.position IN ({placeholders})"
+        )
+        with closing(self._connect()) as conn:
+            rows = {row[0]: row[1:] for row in conn.execute(query, positions)}
+        return [self._character_row_to_dict(rows[p]) for p in positions if p in rows]
+
+    def get_conversation_line_ids(
+        self, limits: Dict[str, int]
+    ) -> Dict[str, List[list]]:
+        """Line ids of the first `limits[character_id]` conversations of each character.
+
+        All characters are resolved in one query: the inverted index is
+        range-scanned per character and cut off with a per-character limit.
+        """
+        result: Dict[str, List[list]] = {character_id: [] for character_id in limits}
+        if not limits:
+            return result
+
+        values = ", ".join("(?, ?)" for _ in limits)
+        params = [value for item in limits.items() for value in item]
+        query = (
+            f"WITH wanted (character_id, max_conversations) AS (VALUES {values}) "
+            "SELECT ranked.character_id, c.line_ids FROM ("
+            "  SELECT cc.character_id, cc.conversation_position, w.max_conversations, "
+            "  row_number() OVER ("
+            "    PARTITION BY cc.character_id ORDER BY cc.conversation_position"
+            "  ) AS rank "
+            "  FROM wanted w JOIN character_conversation cc "
+            "  ON cc.character_id = w.character_id"
+            ") ranked "
+            "JOIN conversation c ON c.position = ranked.conversation_position "
+            "WHERE ranked.rank <= ranked.max_conversations "
+            "ORDER BY ranked.character_id, ranked.conversation_position"
+        )
+        with closing(self._connect()) as conn:
+            for character_id, line_ids in conn.execute(query, params):
+                result[character_id].append(json.loads(line_ids))
+        return result
+
+    def get_line_offsets(self, line_ids: List[str]) -> List[Tuple[str, int, int]]:
+        """(line_id, offset, length) for each known line id, sorted by offset."""
+        offsets: List[Tuple[str, int, int]] = []
+        # Stay well below SQLite's bound-parameter limit.
+        chunk_size = 500
+        with closing(self._connect()) as conn:
+            for start in range(0, len(line_ids), chunk_size):
+                chunk = line_ids[start : start + chunk_size]
+                placeholders = ", ".join("?" * len(chunk))
+                offsets.extend(
+                    conn.execute(
+                        "SELECT line_id, offset, length FROM line "
+                        f"WHERE line_id IN ({placeholders})",
+                        chunk,
+                    )
+                )
+        offsets.sort(key=lambda entry: entry[1])
+        return offsets
+
+    def iter_line_offsets(self) -> Iterator[Tuple[str, int, int]]:
+        """Every (line_id, offset, length) entry, sorted by line id."""
+        with closing(self._connect()) as conn:
+            yield from conn.execute(
+                "SELECT line_id, offset, length FROM line ORDER BY line_id"
+            )
+
+    def get_lines_source(self) -> Tuple[str, str]:
+        """Path and encoding of the file the line offsets point into."""
+        if self._lines_source is None:
+            with closing(self._connect()) as conn:
+                meta = dict(
+                    conn.execute(
+                        "SELECT key, value FROM meta "
+                        "WHERE key IN ('lines_path', 'lines_encoding')"
+                    )
+                )
+            self._lines_source = (meta["lines_path"], meta["lines_encoding"])
+        return self._lines_source
+
+    def get_lines(self, line_ids: List[str]) -> Dict[str, str]:
+        offsets = self.get_line_offsets(line_ids)
+        if not offsets:
+            return {}
+
+        # Reading in file order keeps the seeks moving forward.
+        path, encoding = self.get_lines_source()
+        lines: Dict[str, str] = {}
+        with open(path, "rb") as f:
+            for line_id, offset, length in offsets:
+                f.seek(offset)
+                lines[line_id] = f.read(length).decode(encoding)
+        return lines
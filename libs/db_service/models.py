@@ -1,8 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, create_engine, JSON
+import os
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+    create_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship, sessionmaker
 from sqlalchemy.sql import func
-import os
-import datetime
 
 # Database setup
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///thoughts.db")
@@ -69,6 +81,12 @@ class Thought(Base):
         cascade="all, delete-orphan"
     )
 
+    # Match the (created_at, id) keyset order of list_thoughts, overall and per persona
+    __table_args__ = (
+        Index("ix_thought_created_at_id", "created_at", "id"),
+        Index("ix_thought_persona_id_created_at_id", "persona_id", "created_at", "id"),
+    )
+
 class Tag(Base):
     __tablename__ = "tag"
     id = Column(Integer, primary_key=True, index=True)
@@ -3,10 +3,30 @@ from sqlalchemy import select, func, update, delete
 from sqlalchemy.orm import joinedload
 import json
 import random
-from libs.llm_service.gemini import GeminiLLM
+from libs.llm_service.factory import LLMFactory
+from libs.llm_service.instrumentation import llm_operation
+from libs.llm_service.prompting import PromptTemplate, compact_json
 from .models import Persona, SessionLocal, Thought, ThoughtEmotion, ThoughtTag, Emotion, Tag
 from .dto import PersonaDomain
 
+PROFILE_FROM_THOUGHTS_PROMPT = PromptTemplate("""
+Create a generalized profile for a new persona based on the thoughts from a persona
+below.
+The specific topics should be merged into broader, generalized topics.
+Map the emotions from the thoughts to these new generalized topics.
+Limit to at most 5 generalized topics.
+
+Return ONLY a valid JSON object with the following structure:
+{{"topics": [{{"name": "Generalized Topic Name",
+"emotions": ["emotion1", "emotion2"]}}],
+"thought_patterns": "Brief summary of thought patterns",
+"tags": ["tag1", "tag2", "tag3"], "thought_type": "Automatic/Deliberate/etc.",
+"action_orientation": "Action-oriented/Ruminative/etc."}}
+
+Thoughts:
+{thoughts_json}
+""")
+
 class PersonaService:
     @classmethod
     def create_persona(cls, name: str, age: int, gender: str, profile: Optional[Dict[str, Any]] = None, additional_info: Optional[Dict[str, Any]] = None, source: str = "manual", origin_description: Optional[str] = None) -> PersonaDomain:
@@ -189,32 +209,13 @@ class PersonaService:
             return None
 
     @classmethod
+    @llm_operation
     def _generate_profile_from_thoughts(cls, thought_texts: List[str]) -> Optional[Dict[str, Any]]:
         try:
-            llm = GeminiLLM()
-            prompt = f"""
-            Analyze the following thoughts from a persona:
-            {json.dumps(thought_texts)}
-
-            Create a generalized profile for a new persona based on these thoughts.
-            The specific topics should be merged into broader, generalized topics.
-            Map the emotions from the thoughts to these new generalized topics.
-            Limit to at most 5 generalized topics.
-
-            Return ONLY a valid JSON object with the following structure:
-            {{
-                "topics": [
-                    {{
-                        "name": "Generalized Topic Name",
-                        "emotions": ["emotion1", "emotion2"]
-                    }}
-                ],
-                "thought_patterns": "Brief summary of thought patterns",
-                "tags": ["tag1", "tag2", "tag3"],
-                "thought_type": "Automatic/Deliberate/etc.",
-                "action_orientation": "Action-oriented/Ruminative/etc."
-            }}
-            """
+            llm = LLMFactory.get_llm()
+            prompt = PROFILE_FROM_THOUGHTS_PROMPT.format(
+                thoughts_json=compact_json(thought_texts)
+            )
             
             response_text = llm.generate_content(prompt)
             
@@ -1,8 +1,36 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, func, update, delete
+import base64
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import joinedload
-from .models import Thought, Tag, ThoughtTag, Emotion, ThoughtEmotion, ThoughtLink, Persona, Topic, ThoughtTopic, SessionLocal
-from .dto import ThoughtDomain, EmotionDomain, TagDomain, TopicDomain, PersonaDomain
+
+from .dto import EmotionDomain, PersonaDomain, TagDomain, ThoughtDomain, TopicDomain
+from .models import (
+    Emotion,
+    Persona,
+    SessionLocal,
+    Tag,
+    Thought,
+    ThoughtEmotion,
+    ThoughtLink,
+    ThoughtTag,
+    ThoughtTopic,
+    Topic,
+)
+
+# Thought totals are cached this long per filter combination instead of counted on
+# every page
+THOUGHT_COUNT_CACHE_SECONDS = float(os.getenv("THOUGHT_COUNT_CACHE_SECONDS", "30"))
+# Above this many rows an unfiltered Postgres total is the planner's estimate
+APPROXIMATE_COUNT_THRESHOLD = 100000
+# Filter combinations whose totals are kept; the oldest is dropped beyond this
+MAX_COUNT_CACHE_ENTRIES = 1024
+_count_cache: Dict[tuple, Tuple[float, int]] = {}
 
 class ThoughtService:
     @staticmethod
@@ -48,23 +76,16 @@ class ThoughtService:
             session.add(thought)
             session.flush() 
 
-            for emotion_name in emotions:
-                stmt = select(Emotion).where(Emotion.name == emotion_name.lower())
-                emotion = session.scalar(stmt)
-                if not emotion:
-                    emotion = Emotion(name=emotion_name.lower())
-                    session.add(emotion)
-                    session.flush()
-                
-                stmt_te = select(ThoughtEmotion).where(
-                    ThoughtEmotion.thought_id == thought.id,
-                    ThoughtEmotion.emotion_id == emotion.id
-                )
-                if not session.scalar(stmt_te):
-                    te = ThoughtEmotion(thought_id=thought.id, emotion_id=emotion.id, is_generated=False)
-                    session.add(te)
-
+            cls._link_labels(
+                session,
+                Emotion,
+                ThoughtEmotion,
+                "emotion_id",
+                {thought.id: emotions},
+                False,
+            )
             session.commit()
+            _count_cache.clear()
             
             stmt = select(Thought).where(Thought.id == thought.id).options(
                 joinedload(Thought.emotions).joinedload(ThoughtEmotion.emotion),
@@ -77,7 +98,176 @@ class ThoughtService:
             return cls._map_to_domain(thought)
 
     @classmethod
-    def list_thoughts(cls, tag: Optional[str] = None, emotion: Optional[str] = None, persona_id: Optional[int] = None, page: int = 1, limit: int = 10):
+    def bulk_create_thoughts(cls, thoughts: List[Dict[str, Any]]) -> List[int]:
+        """Creates many thoughts in one transaction; returns their ids in input order.
+
+        Each item takes the arguments of create_thought. The rows go in one
+        multi-row INSERT ... RETURNING and their emotions are linked in bulk;
+        nothing is reloaded, so callers that need the full thoughts should
+        fetch them afterwards.
+        """
+        if not thoughts:
+            return []
+        with SessionLocal() as session:
+            persona_ids = {t["persona_id"] for t in thoughts if t.get("persona_id")}
+            known_personas = set(
+                session.scalars(select(Persona.id).where(Persona.id.in_(persona_ids))).all()
+            ) if persona_ids else set()
+
+            rows = [
+                {
+                    "content": t["content"],
+                    "status": "pending",
+                    "is_generated": t.get("is_generated", False),
+                    "persona_id": t.get("persona_id")
+                    if t.get("persona_id") in known_personas
+                    else None,
+                    "action_orientation": t.get("action_orientation"),
+                    "thought_type": t.get("thought_type"),
+                }
+                for t in thoughts
+            ]
+            # render_nulls keeps rows with and without a persona in one statement.
+            if session.get_bind().dialect.name == "postgresql":
+                # Postgres keeps the batched insert and returns ids in row order.
+                stmt = insert(Thought).returning(
+                    Thought.id, sort_by_parameter_order=True
+                )
+                ids = list(
+                    session.scalars(stmt.execution_options(render_nulls=True), rows)
+                )
+            else:
+                # SQLite would insert row by row to keep RETURNING order. Its
+                # writes are serialized, so the rowids of one statement ascend
+                # in row order and sorting them restores input order.
+                stmt = (
+                    insert(Thought)
+                    .returning(Thought.id)
+                    .execution_options(render_nulls=True)
+                )
+                ids = sorted(session.scalars(stmt, rows))
+            cls._link_labels(
+                session,
+                Emotion,
+                ThoughtEmotion,
+                "emotion_id",
+                {
+                    thought_id: t.get("emotions") or []
+                    for thought_id, t in zip(ids, thoughts)
+                },
+                False,
+            )
+            session.commit()
+            _count_cache.clear()
+            return ids
+
+    @staticmethod
+    def _encode_cursor(thought: Thought) -> str:
+        payload = json.dumps([thought.created_at.isoformat(), thought.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _keyset(session, created_at=None):
+        """The created_at expression pages are ordered and compared on.
+
+        SQLite keeps datetimes as text, and server-default rows
+        ("YYYY-MM-DD HH:MM:SS") do not compare as text with bound values
+        ("YYYY-MM-DD HH:MM:SS.ffffff"). There both sides go through
+        julianday(), which reads either format as the same instant.
+        """
+        if session.get_bind().dialect.name != "sqlite":
+            return Thought.created_at if created_at is None else created_at
+        if created_at is None:
+            return func.julianday(Thought.created_at)
+        return func.julianday(created_at.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, thought_id = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            return datetime.fromisoformat(created_at), int(thought_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @classmethod
+    def count_thoughts(
+        cls,
+        tag: Optional[str] = None,
+        emotion: Optional[str] = None,
+        persona_id: Optional[int] = None,
+    ) -> int:
+        """Number of thoughts matching the filters, cached THOUGHT_COUNT_CACHE_SECONDS.
+
+        Without filters on Postgres, a table above APPROXIMATE_COUNT_THRESHOLD
+        rows reports the planner's row estimate instead of counting.
+        """
+        key = (tag, emotion, persona_id)
+        cached = _count_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        with SessionLocal() as session:
+            total = None
+            if (
+                not (tag or emotion or persona_id)
+                and session.get_bind().dialect.name == "postgresql"
+            ):
+                estimate = session.scalar(
+                    text(
+                        "SELECT reltuples::bigint FROM pg_class "
+                        "WHERE relname = 'thought'"
+                    )
+                )
+                if estimate and estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                    total = int(estimate)
+            if total is None:
+                count_query = select(func.count(Thought.id))
+                if tag:
+                    count_query = (
+                        count_query.join(Thought.tags)
+                        .join(ThoughtTag.tag)
+                        .where(Tag.name == tag.lower())
+                    )
+                if emotion:
+                    count_query = (
+                        count_query.join(Thought.emotions)
+                        .join(ThoughtEmotion.emotion)
+                        .where(Emotion.name == emotion.lower())
+                    )
+                if persona_id:
+                    count_query = count_query.where(Thought.persona_id == persona_id)
+                total = session.scalar(count_query)
+
+        now = time.monotonic()
+        for stale in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+            del _count_cache[stale]
+        while len(_count_cache) >= MAX_COUNT_CACHE_ENTRIES:
+            del _count_cache[next(iter(_count_cache))]
+        _count_cache[key] = (now + THOUGHT_COUNT_CACHE_SECONDS, total)
+        return total
+
+    @classmethod
+    def list_thoughts(
+        cls,
+        tag: Optional[str] = None,
+        emotion: Optional[str] = None,
+        persona_id: Optional[int] = None,
+        page: int = 1,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ):
+        """One page of thoughts, newest first.
+
+        With a `cursor` (the `next_cursor` of the previous page) the page
+        starts right after the thought it points to, using the
+        (created_at, id) index instead of an OFFSET, so deep pages cost the
+        same as the first. Without one, `page` selects an offset page.
+        `total` comes from `count_thoughts`, or is None when not requested.
+        """
         with SessionLocal() as session:
             query = select(Thought).options(
                 joinedload(Thought.emotions).joinedload(ThoughtEmotion.emotion),
@@ -87,25 +277,38 @@ class ThoughtService:
                 joinedload(Thought.persona)
             )
             
-            count_query = select(func.count(Thought.id))
             if tag:
                 query = query.join(Thought.tags).join(ThoughtTag.tag).where(Tag.name == tag.lower())
-                count_query = count_query.join(Thought.tags).join(ThoughtTag.tag).where(Tag.name == tag.lower())
             if emotion:
                 query = query.join(Thought.emotions).join(ThoughtEmotion.emotion).where(Emotion.name == emotion.lower())
-                count_query = count_query.join(Thought.emotions).join(ThoughtEmotion.emotion).where(Emotion.name == emotion.lower())
             if persona_id:
                 query = query.where(Thought.persona_id == persona_id)
-                count_query = count_query.where(Thought.persona_id == persona_id)
-            
-            total_count = session.scalar(count_query)
 
-            query = query.order_by(Thought.created_at.desc()).offset((page - 1) * limit).limit(limit)
-            thoughts = session.scalars(query).unique().all()
-            
+            query = query.order_by(cls._keyset(session).desc(), Thought.id.desc())
+            if cursor:
+                created_at, thought_id = cls._decode_cursor(cursor)
+                query = query.where(
+                    tuple_(cls._keyset(session), Thought.id)
+                    < tuple_(cls._keyset(session, created_at), thought_id)
+                )
+            else:
+                query = query.offset((page - 1) * limit)
+            # One extra row tells whether there is a next page.
+            thoughts = session.scalars(query.limit(limit + 1)).unique().all()
+            next_cursor = (
+                cls._encode_cursor(thoughts[limit - 1])
+                if len(thoughts) > limit
+                else None
+            )
+
             return {
-                "total": total_count,
-                "items": [cls._map_to_domain(t) for t in thoughts]
+                "total": cls.count_thoughts(
+                    tag=tag, emotion=emotion, persona_id=persona_id
+                )
+                if include_total
+                else None,
+                "items": [cls._map_to_domain(t) for t in thoughts[:limit]],
+                "next_cursor": next_cursor,
             }
 
     @classmethod
@@ -121,6 +324,19 @@ class ThoughtService:
             thought = session.scalar(stmt)
             return cls._map_to_domain(thought) if thought else None
 
+    @classmethod
+    def get_thought_contents(cls, thought_ids: List[int]) -> Dict[int, str]:
+        """Contents of the existing thoughts among `thought_ids`, read in one query."""
+        if not thought_ids:
+            return {}
+        with SessionLocal() as session:
+            rows = session.execute(
+                select(Thought.id, Thought.content)
+                .where(Thought.id.in_(thought_ids))
+                .order_by(Thought.id)
+            )
+            return {thought_id: content for thought_id, content in rows}
+
     @classmethod
     def add_tags(cls, thought_id: int, tags_list: List[str], is_generated: bool = False) -> bool:
         try:
@@ -129,20 +345,14 @@ class ThoughtService:
                 if not thought:
                     return False
                 
-                for tag_name in tags_list:
-                    tag = session.scalar(select(Tag).where(Tag.name == tag_name.lower()))
-                    if not tag:
-                        tag = Tag(name=tag_name.lower())
-                        session.add(tag)
-                        session.flush()
-                    
-                    stmt_tt = select(ThoughtTag).where(
-                        ThoughtTag.thought_id == thought.id,
-                        ThoughtTag.tag_id == tag.id
-                    )
-                    if not session.scalar(stmt_tt):
-                        tt = ThoughtTag(thought_id=thought.id, tag_id=tag.id, is_generated=is_generated)
-                        session.add(tt)
+                cls._link_labels(
+                    session,
+                    Tag,
+                    ThoughtTag,
+                    "tag_id",
+                    {thought.id: tags_list},
+                    is_generated,
+                )
                 session.commit()
                 return True
         except Exception:
@@ -156,20 +366,14 @@ class ThoughtService:
                 if not thought:
                     return False
 
-                for emotion_name in emotions_list:
-                    emotion = session.scalar(select(Emotion).where(Emotion.name == emotion_name.lower()))
-                    if not emotion:
-                        emotion = Emotion(name=emotion_name.lower())
-                        session.add(emotion)
-                        session.flush()
-
-                    stmt_te = select(ThoughtEmotion).where(
-                        ThoughtEmotion.thought_id == thought.id,
-                        ThoughtEmotion.emotion_id == emotion.id
-                    )
-                    if not session.scalar(stmt_te):
-                        te = ThoughtEmotion(thought_id=thought.id, emotion_id=emotion.id, is_generated=is_generated)
-                        session.add(te)
+                cls._link_labels(
+                    session,
+                    Emotion,
+                    ThoughtEmotion,
+                    "emotion_id",
+                    {thought.id: emotions_list},
+                    is_generated,
+                )
                 session.commit()
                 return True
         except Exception:
@@ -183,25 +387,180 @@ class ThoughtService:
                 if not thought:
                     return False
                 
-                for topic_name in topics_list:
-                    topic = session.scalar(select(Topic).where(Topic.name == topic_name.lower()))
-                    if not topic:
-                        topic = Topic(name=topic_name.lower())
-                        session.add(topic)
-                        session.flush()
-                    
-                    stmt_tt = select(ThoughtTopic).where(
-                        ThoughtTopic.thought_id == thought.id,
-                        ThoughtTopic.topic_id == topic.id
-                    )
-                    if not session.scalar(stmt_tt):
-                        tt = ThoughtTopic(thought_id=thought.id, topic_id=topic.id, is_generated=is_generated)
-                        session.add(tt)
+                cls._link_labels(
+                    session,
+                    Topic,
+                    ThoughtTopic,
+                    "topic_id",
+                    {thought.id: topics_list},
+                    is_generated,
+                )
                 session.commit()
                 return True
         except Exception:
             return False
 
+    @staticmethod
+    def _insert_ignoring_conflicts(
+        session, model, rows: List[Dict[str, Any]], index_elements: List[str]
+    ) -> None:
+        """Inserts `rows` in one statement, skipping rows that clash on a unique key."""
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(model).on_conflict_do_nothing(
+                index_elements=index_elements
+            )
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(model).on_conflict_do_nothing(
+                index_elements=index_elements
+            )
+        else:
+            # No portable upsert: insert what a lookup does not find.
+            columns = [getattr(model, name) for name in index_elements]
+            keys = [tuple(row[name] for name in index_elements) for row in rows]
+            found = {
+                tuple(row)
+                for row in session.execute(
+                    select(*columns).where(columns[0].in_([k[0] for k in keys]))
+                )
+            }
+            rows = [row for row, key in zip(rows, keys) if key not in found]
+            if not rows:
+                return
+            stmt = insert(model)
+        session.execute(stmt, rows)
+
+    @classmethod
+    def _link_labels(
+        cls,
+        session,
+        model,
+        link_model,
+        fk: str,
+        names_by_thought: Dict[int, List[str]],
+        is_generated: bool,
+    ) -> None:
+        """Links thoughts to tags, emotions or topics by name in a fixed query count.
+
+        Existing label ids are read with one IN query and only the missing
+        labels are inserted (conflict-ignoring, in case a concurrent writer
+        adds them first) and read back, so labels that already exist never
+        reach an INSERT or use up sequence values. The links the thoughts do
+        not have yet are added with one bulk insert.
+        """
+        names_by_thought = {
+            thought_id: list(dict.fromkeys(name.lower() for name in names))
+            for thought_id, names in names_by_thought.items()
+            if names
+        }
+        if not names_by_thought:
+            return
+        all_names = {name for names in names_by_thought.values() for name in names}
+        label_ids = dict(
+            session.execute(
+                select(model.name, model.id).where(model.name.in_(all_names))
+            ).all()
+        )
+        # Sorted, so concurrent upserts take row locks in the same order.
+        missing = sorted(all_names - set(label_ids))
+        if missing:
+            cls._insert_ignoring_conflicts(
+                session, model, [{"name": name} for name in missing], ["name"]
+            )
+            label_ids.update(
+                session.execute(
+                    select(model.name, model.id).where(model.name.in_(missing))
+                ).all()
+            )
+
+        label_column = getattr(link_model, fk)
+        existing = {
+            tuple(row)
+            for row in session.execute(
+                select(link_model.thought_id, label_column).where(
+                    link_model.thought_id.in_(list(names_by_thought)),
+                    label_column.in_(list(label_ids.values())),
+                )
+            )
+        }
+        rows = [
+            {
+                "thought_id": thought_id,
+                fk: label_ids[name],
+                "is_generated": is_generated,
+            }
+            for thought_id, names in names_by_thought.items()
+            for name in names
+            if (thought_id, label_ids[name]) not in existing
+        ]
+        if rows:
+            session.execute(insert(link_model), rows)
+
+    @classmethod
+    def save_analysis(
+        cls,
+        thought_id: int,
+        analysis: Dict[str, Any],
+        is_generated: bool = True,
+        status: str = "completed",
+    ) -> bool:
+        """Writes every analysis result for a thought in one transaction.
+
+        `analysis` may hold distortions (stored as tags), emotions, topics,
+        action_orientation and thought_type; missing keys are left untouched.
+        """
+        return (
+            cls.save_analyses(
+                {thought_id: analysis}, is_generated=is_generated, status=status
+            )
+            == 1
+        )
+
+    @classmethod
+    def save_analyses(
+        cls,
+        analyses: Dict[int, Dict[str, Any]],
+        is_generated: bool = True,
+        status: Optional[str] = "completed",
+    ) -> int:
+        """Writes the analysis results of many thoughts in one transaction.
+
+        Each value is an analysis as accepted by `save_analysis`. A `status`
+        of None leaves the thoughts' status untouched. Returns how many of the
+        thoughts existed and were saved.
+        """
+        if not analyses:
+            return 0
+        try:
+            with SessionLocal() as session:
+                thoughts = session.scalars(
+                    select(Thought).where(Thought.id.in_(list(analyses)))
+                ).all()
+                if not thoughts:
+                    return 0
+
+                for key, model, link_model, fk in (
+                    ("distortions", Tag, ThoughtTag, "tag_id"),
+                    ("emotions", Emotion, ThoughtEmotion, "emotion_id"),
+                    ("topics", Topic, ThoughtTopic, "topic_id"),
+                ):
+                    names = {t.id: analyses[t.id].get(key) or [] for t in thoughts}
+                    cls._link_labels(
+                        session, model, link_model, fk, names, is_generated
+                    )
+                for thought in thoughts:
+                    analysis = analyses[thought.id]
+                    for key in ("action_orientation", "thought_type"):
+                        if analysis.get(key) is not None:
+                            setattr(thought, key, analysis[key])
+                    if status is not None:
+                        thought.status = status
+                session.commit()
+                return len(thoughts)
+        except Exception as e:
+            print(f"Error saving analysis for thoughts {sorted(analyses)}: {e}")
+            return 0
+
     @classmethod
     def link_thoughts(cls, source_id: int, target_id: int) -> bool:
         if source_id == target_id:
@@ -250,6 +609,7 @@ class ThoughtService:
                     return False
                 session.delete(thought)
                 session.commit()
+                _count_cache.clear()
                 return True
         except Exception:
             return False
@@ -311,6 +671,7 @@ class ThoughtService:
 
 from .models import init_db
 
+
 def init_database():
     init_db()
 
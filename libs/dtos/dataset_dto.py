@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -13,5 +13,21 @@ class MovieCharacterResponse(BaseModel):
     character_name: str
 
 
+class MovieSearchFacets(BaseModel):
+    genres: Dict[str, int]
+    decades: Dict[str, int]
+
+
 class MovieSearchResponse(BaseModel):
     results: List[MovieCharacterResponse]
+    facets: Optional[MovieSearchFacets] = None
+
+
+class CorpusCacheStatsResponse(BaseModel):
+    enabled: bool
+    loaded: bool
+    movies: Optional[int] = None
+    characters: Optional[int] = None
+    genres: Optional[int] = None
+    load_time_ms: Optional[float] = None
+    memory_bytes: Optional[int] = None
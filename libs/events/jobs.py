@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+
+from libs.processor_service import (
+    ANALYSIS_MODE_BATCH,
+    ANALYSIS_MODE_FUSED,
+    ANALYSIS_MODE_MICROBATCH,
+    get_analysis_mode,
+)
+
+# (queue name, task path, task args)
+JobSpec = Tuple[str, str, Tuple[Any, ...]]
+
+# Jobs sent per Redis round-trip; each one takes a few pipelined commands
+MAX_JOBS_PER_PIPELINE = 500
+
+# Queue and task of each analysis dimension in split mode
+SPLIT_ANALYSIS_TASKS = [
+    ("distortions", "workers.tasks.analyze_cognitive_distortions"),
+    ("sentiment", "workers.tasks.analyze_sentiment"),
+    ("action_orientation", "workers.tasks.analyze_action_orientation"),
+    ("thought_type", "workers.tasks.analyze_thought_type"),
+    ("topics", "workers.tasks.analyze_topics"),
+]
+FUSED_ANALYSIS_TASK = ("analysis", "workers.tasks.analyze_thought")
+BATCH_ANALYSIS_TASK = ("analysis", "workers.tasks.analyze_thoughts_batched")
+# One job running the LLM calls of many thoughts concurrently
+BULK_ANALYSIS_TASK = ("analysis", "workers.tasks.analyze_thoughts")
+
+_queues: Dict[Tuple[Redis, str], Queue] = {}
+
+
+def get_queue(name: str, connection: Redis) -> Queue:
+    """The Queue named `name` on `connection`, built once and then reused."""
+    key = (connection, name)
+    queue = _queues.get(key)
+    if queue is None:
+        queue = _queues.setdefault(key, Queue(name, connection=connection))
+    return queue
+
+
+def enqueue_jobs(jobs: Sequence[JobSpec], connection: Redis) -> List[Job]:
+    """Enqueues many jobs, possibly on different queues, in a few round-trips.
+
+    The jobs are grouped by queue and written with `Queue.enqueue_many`
+    into a shared Redis pipeline, which is sent every MAX_JOBS_PER_PIPELINE
+    jobs instead of once per job. Jobs are returned in the order given.
+    """
+    enqueued: List[Job] = []
+    for start in range(0, len(jobs), MAX_JOBS_PER_PIPELINE):
+        chunk = jobs[start : start + MAX_JOBS_PER_PIPELINE]
+        by_queue: Dict[str, List[int]] = {}
+        for index, (queue_name, _, _) in enumerate(chunk):
+            by_queue.setdefault(queue_name, []).append(index)
+
+        chunk_jobs: List[Optional[Job]] = [None] * len(chunk)
+        with connection.pipeline() as pipe:
+            for queue_name, indexes in by_queue.items():
+                queue = get_queue(queue_name, connection)
+                job_datas = [
+                    Queue.prepare_data(chunk[i][1], args=chunk[i][2]) for i in indexes
+                ]
+                for i, job in zip(
+                    indexes, queue.enqueue_many(job_datas, pipeline=pipe)
+                ):
+                    chunk_jobs[i] = job
+            pipe.execute()
+        enqueued.extend(chunk_jobs)
+    return enqueued
+
+
+def analysis_jobs(thought_ids: List[int], mode: Optional[str] = None) -> List[JobSpec]:
+    """The jobs analyzing newly created thoughts in the given analysis mode.
+
+    Batch mode sends one job for all of them, fused mode one combined job per
+    thought, and split mode one job per thought and dimension.
+    """
+    if not thought_ids:
+        return []
+    mode = mode or get_analysis_mode()
+    if mode == ANALYSIS_MODE_BATCH:
+        queue_name, task = BATCH_ANALYSIS_TASK
+        return [(queue_name, task, (list(thought_ids),))]
+    tasks = (
+        [FUSED_ANALYSIS_TASK] if mode == ANALYSIS_MODE_FUSED else SPLIT_ANALYSIS_TASKS
+    )
+    return [
+        (queue_name, task, (thought_id,))
+        for thought_id in thought_ids
+        for queue_name, task in tasks
+    ]
+
+
+def pending_key(queue_name: str) -> str:
+    """Redis list of thought ids waiting for a micro-batching worker of `queue_name`."""
+    return f"analysis:pending:{queue_name}"
+
+
+def processing_key(queue_name: str, consumer: str) -> str:
+    """Redis list of ids `consumer` took from `queue_name` and has not saved yet."""
+    return f"analysis:processing:{queue_name}:{consumer}"
+
+
+def failed_key(queue_name: str) -> str:
+    """Redis list of thought ids whose `queue_name` analysis failed, kept for replay."""
+    return f"analysis:failed:{queue_name}"
+
+
+def push_pending(thought_ids: List[int], connection: Redis) -> None:
+    """Queues bare thought ids for every analysis dimension in one round-trip."""
+    with connection.pipeline() as pipe:
+        for queue_name, _ in SPLIT_ANALYSIS_TASKS:
+            pipe.rpush(pending_key(queue_name), *thought_ids)
+        pipe.execute()
+
+
+def enqueue_analysis(
+    thought_ids: List[int], connection: Redis, mode: Optional[str] = None
+) -> List[Job]:
+    """Enqueues the analysis of newly created thoughts in one pipelined batch.
+
+    In microbatch mode no RQ jobs are created: the ids go to the pending
+    lists drained by `workers.micro_batch`, and an empty list is returned.
+    """
+    mode = mode or get_analysis_mode()
+    if mode == ANALYSIS_MODE_MICROBATCH:
+        if thought_ids:
+            push_pending(thought_ids, connection)
+        return []
+    return enqueue_jobs(analysis_jobs(thought_ids, mode), connection)
+
+
+def enqueue_bulk_analysis(
+    thought_ids: List[int], connection: Redis, mode: Optional[str] = None
+) -> List[Job]:
+    """Enqueues a single job analyzing many newly created thoughts.
+
+    Split and fused mode send one `analyze_thoughts` job that keeps several
+    LLM calls in flight, with the mode as an argument so the worker does not
+    fall back to its own setting. Batch mode sends one batched job and
+    microbatch mode fills the pending lists, as `enqueue_analysis` does.
+    """
+    mode = mode or get_analysis_mode()
+    if mode in (ANALYSIS_MODE_BATCH, ANALYSIS_MODE_MICROBATCH):
+        return enqueue_analysis(thought_ids, connection, mode)
+    if not thought_ids:
+        return []
+    queue_name, task = BULK_ANALYSIS_TASK
+    return enqueue_jobs([(queue_name, task, (list(thought_ids), mode))], connection)
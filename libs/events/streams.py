@@ -0,0 +1,149 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+# Streams are kept long enough for a client to reconnect and replay them
+STREAM_TTL_SECONDS = int(os.getenv("GENERATION_STREAM_TTL_SECONDS", 3600))
+# Upper bound on entries per stream, so a long conversation cannot grow without limit
+STREAM_MAX_LEN = 10000
+
+EVENT_CHUNK = "chunk"
+EVENT_DONE = "done"
+EVENT_ERROR = "error"
+# Published once a conversation has ended; closes its readers
+EVENT_END = "end"
+
+# (entry_id, event, data)
+StreamEntry = Tuple[str, str, Dict[str, Any]]
+
+
+def essay_stream_key(job_id: str) -> str:
+    return f"stream:essay:{job_id}"
+
+
+def conversation_stream_key(conversation_id: int) -> str:
+    return f"stream:conversation:{conversation_id}"
+
+
+class GenerationStream:
+    """Partial LLM output of one generation, published through a Redis Stream.
+
+    Workers append `chunk` events as text arrives and a final `done` or
+    `error` event. Unlike pub/sub, a Stream keeps its entries, so a reader
+    that connects late (or reconnects) replays everything it missed.
+    Publishing errors are logged and never interrupt the generation itself.
+    """
+
+    def __init__(self, key: str, redis_conn: Optional[Redis] = None):
+        if redis_conn is None:
+            redis_conn = Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=os.getenv("REDIS_PORT", "6379"),
+            )
+        self.key = key
+        self.redis = redis_conn
+
+    def _add(self, event: str, data: Dict[str, Any]) -> None:
+        try:
+            pipe = self.redis.pipeline()
+            pipe.xadd(
+                self.key,
+                {"event": event, "data": json.dumps(data)},
+                maxlen=STREAM_MAX_LEN,
+                approximate=True,
+            )
+            pipe.expire(self.key, STREAM_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            print(f"Error publishing to generation stream {self.key}: {e}")
+
+    def publish(self, text: str, **fields: Any) -> None:
+        self._add(EVENT_CHUNK, {"text": text, **fields})
+
+    def finish(self, result: Any = None, **fields: Any) -> None:
+        self._add(EVENT_DONE, {"result": result, **fields})
+
+    def fail(self, error: str, **fields: Any) -> None:
+        self._add(EVENT_ERROR, {"error": error, **fields})
+
+    def end(self, **fields: Any) -> None:
+        self._add(EVENT_END, fields)
+
+    def latest_id(self) -> str:
+        """Id of the newest entry, to read only what is published from now on."""
+        entries = self.redis.xrevrange(self.key, count=1)
+        if not entries:
+            return "0-0"
+        entry_id = entries[0][0]
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    def read(self, last_id: str = "0", block_ms: int = 15000) -> Iterator[StreamEntry]:
+        """(entry_id, event, data) of the entries after `last_id`.
+
+        Blocks up to `block_ms` for new entries; yields nothing on timeout.
+        Pass "$" to only see entries added after the call.
+        """
+        response = self.redis.xread({self.key: last_id}, block=block_ms)
+        yield from _decode_entries(response)
+
+
+class AsyncGenerationStream:
+    """Reading side of a GenerationStream for async SSE endpoints.
+
+    Uses `redis.asyncio`, so a reader blocked on XREAD waits on the event
+    loop instead of holding a threadpool worker for the whole stream.
+    """
+
+    def __init__(self, key: str, redis_conn: Optional[AsyncRedis] = None):
+        if redis_conn is None:
+            redis_conn = AsyncRedis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=os.getenv("REDIS_PORT", "6379"),
+            )
+        self.key = key
+        self.redis = redis_conn
+
+    async def latest_id(self) -> str:
+        """Id of the newest entry, to read only what is published from now on."""
+        entries = await self.redis.xrevrange(self.key, count=1)
+        if not entries:
+            return "0-0"
+        entry_id = entries[0][0]
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    async def read(
+        self, last_id: str = "0", block_ms: int = 15000
+    ) -> List[StreamEntry]:
+        """(entry_id, event, data) of the entries after `last_id`; empty on timeout."""
+        response = await self.redis.xread({self.key: last_id}, block=block_ms)
+        return list(_decode_entries(response))
+
+
+def _decode_entries(response: Any) -> Iterator[StreamEntry]:
+    for _key, entries in response or []:
+        for entry_id, fields in entries:
+            fields = {
+                (k.decode() if isinstance(k, bytes) else k): (
+                    v.decode() if isinstance(v, bytes) else v
+                )
+                for k, v in fields.items()
+            }
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            yield (
+                entry_id,
+                fields.get("event", EVENT_CHUNK),
+                json.loads(fields.get("data") or "{}"),
+            )
+
+
+def format_sse(entry_id: Optional[str], event: str, data: Dict[str, Any]) -> str:
+    """One Server-Sent Events message; the id lets clients resume via Last-Event-ID."""
+    lines = []
+    if entry_id:
+        lines.append(f"id: {entry_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
@@ -1,3 +1,75 @@
 from .base import BaseLLM
-from .gemini import GeminiLLM
+from .cache import (
+    CachedLLM,
+    LRUResponseCache,
+    RedisResponseCache,
+    SQLiteResponseCache,
+    with_response_cache,
+)
 from .factory import LLMFactory, LLMProvider
+from .fake import FakeLLM, FakeLLMError
+from .gemini import GeminiLLM
+from .instrumentation import (
+    InstrumentedLLM,
+    get_usage_stats,
+    llm_operation,
+    llm_operation_scope,
+)
+from .prompting import Prompt, PromptTemplate, compact_json
+from .rate_limit import (
+    Priority,
+    RateLimitedLLM,
+    RateLimiter,
+    RateLimitTimeout,
+    with_rate_limit,
+)
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientLLM,
+    get_retry_metrics,
+    with_retries,
+)
+from .routing import (
+    RoutedLLM,
+    TaskType,
+    get_routing_metrics,
+    task_models,
+    with_routing,
+)
+
+__all__ = [
+    "BaseLLM",
+    "GeminiLLM",
+    "LLMFactory",
+    "LLMProvider",
+    "CachedLLM",
+    "LRUResponseCache",
+    "RedisResponseCache",
+    "SQLiteResponseCache",
+    "with_response_cache",
+    "Priority",
+    "RateLimitedLLM",
+    "RateLimiter",
+    "RateLimitTimeout",
+    "with_rate_limit",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ResilientLLM",
+    "get_retry_metrics",
+    "with_retries",
+    "FakeLLM",
+    "FakeLLMError",
+    "InstrumentedLLM",
+    "get_usage_stats",
+    "llm_operation",
+    "llm_operation_scope",
+    "Prompt",
+    "PromptTemplate",
+    "compact_json",
+    "RoutedLLM",
+    "TaskType",
+    "get_routing_metrics",
+    "task_models",
+    "with_routing",
+]
@@ -1,8 +1,26 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Iterator
+
 
 class BaseLLM(ABC):
     @abstractmethod
     def generate_content(self, prompt: str) -> str:
         """Generates content based on the prompt."""
         pass
+
+    async def agenerate_content(self, prompt: str) -> str:
+        """Async counterpart of generate_content.
+
+        Runs the blocking call in a thread by default; clients with a native
+        async API should override it.
+        """
+        return await asyncio.to_thread(self.generate_content, prompt)
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """Yields the response in chunks as the model produces them.
+
+        Defaults to a single chunk holding the whole response; clients with a
+        streaming API should override it.
+        """
+        yield self.generate_content(prompt)
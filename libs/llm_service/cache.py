@@ -0,0 +1,339 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from typing import Callable, Dict, Optional, Tuple
+
+from .base import BaseLLM
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """Content address of a prompt: the same prompt to the same model shares a key."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class ResponseCacheBackend(ABC):
+    """Storage for cached LLM responses, with TTL and a bound on the entry count."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response, or None if missing or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        """Stores a response, evicting the least recently used entries if full."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class LRUResponseCache(ResponseCacheBackend):
+    """In-process cache; entries are lost when the process exits."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(max_entries)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisResponseCache(ResponseCacheBackend):
+    """Cache shared by every worker through Redis.
+
+    Values expire through Redis TTLs. A sorted set of keys scored by last
+    access time bounds the number of entries.
+    """
+
+    def __init__(
+        self,
+        redis_conn=None,
+        prefix: str = "llm_cache",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        super().__init__(max_entries)
+        if redis_conn is None:
+            from redis import Redis
+
+            redis_conn = Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=os.getenv("REDIS_PORT", "6379"),
+            )
+        self.redis = redis_conn
+        self.prefix = prefix
+        self._lru_key = f"{prefix}:lru"
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis.get(self._key(key))
+        if value is None:
+            self.redis.zrem(self._lru_key, key)
+            return None
+        self.redis.zadd(self._lru_key, {key: time.time()})
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(key), value, ex=ttl or None)
+        pipe.zadd(self._lru_key, {key: time.time()})
+        pipe.zcard(self._lru_key)
+        size = pipe.execute()[-1]
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = self.redis.zrange(self._lru_key, 0, overflow - 1)
+            if evicted:
+                pipe = self.redis.pipeline()
+                pipe.delete(
+                    *[
+                        self._key(k.decode("utf-8") if isinstance(k, bytes) else k)
+                        for k in evicted
+                    ]
+                )
+                pipe.zrem(self._lru_key, *evicted)
+                pipe.execute()
+
+    def clear(self) -> None:
+        keys = list(self.redis.scan_iter(match=f"{self.prefix}:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+
+class SQLiteResponseCache(ResponseCacheBackend):
+    """On-disk cache that survives restarts of a single host."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS response (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS response_accessed_at_idx ON response (accessed_at);
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # WAL lets several worker processes share one file.
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM response WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE response SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            conn.execute(
+                "DELETE FROM response WHERE key IN ("
+                "  SELECT key FROM response ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("DELETE FROM response")
+            conn.commit()
+
+
+class CachedLLM(BaseLLM):
+    """Wraps an LLM so repeated prompts are answered from a response cache.
+
+    Only use it for prompts whose answer should not change between calls,
+    such as classification; generation prompts expect a fresh response.
+    When `validate` is given, only responses it accepts are stored, so a
+    malformed answer is asked again instead of being replayed until its TTL.
+    Cache failures are logged and fall through to the wrapped LLM.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        backend: ResponseCacheBackend,
+        ttl: Optional[int] = DEFAULT_TTL_SECONDS,
+        validate: Optional[Callable[[str], bool]] = None,
+    ):
+        self.llm = llm
+        self.backend = backend
+        self.ttl = ttl
+        self.validate = validate
+        self.model_name = getattr(llm, "model_name", type(llm).__name__)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            print(f"Error reading LLM response cache: {e}")
+            cached = None
+        self.backend.record(cached is not None)
+        return cached
+
+    def _store(self, key: str, result: Optional[str]) -> None:
+        if result is None or (self.validate is not None and not self.validate(result)):
+            return
+        try:
+            self.backend.set(key, result, self.ttl)
+        except Exception as e:
+            print(f"Error writing LLM response cache: {e}")
+
+    def generate_content(self, prompt: str) -> str:
+        key = cache_key(self.model_name, prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        result = self.llm.generate_content(prompt)
+        self._store(key, result)
+        return result
+
+    async def agenerate_content(self, prompt: str) -> str:
+        # Redis and SQLite backends block, so they are kept off the event loop.
+        key = cache_key(self.model_name, prompt)
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            return cached
+
+        result = await self.llm.agenerate_content(prompt)
+        await asyncio.to_thread(self._store, key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return self.backend.stats()
+
+
+_backends: Dict[str, ResponseCacheBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_cache_backend(name: str) -> Optional[ResponseCacheBackend]:
+    """Process-wide backend by name ("memory", "redis" or "sqlite").
+
+    The backend is configured from the environment.
+
+    Returns None for "none" or an empty name.
+    """
+    name = (name or "none").lower()
+    if name == "none":
+        return None
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is not None:
+            return backend
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        if name == "memory":
+            backend = LRUResponseCache(max_entries=max_entries)
+        elif name == "redis":
+            backend = RedisResponseCache(max_entries=max_entries)
+        elif name == "sqlite":
+            path = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+            backend = SQLiteResponseCache(path, max_entries=max_entries)
+        else:
+            raise ValueError(f"Unsupported LLM cache backend: {name}")
+        _backends[name] = backend
+        return backend
+
+
+def reset_cache_backends() -> None:
+    with _backends_lock:
+        _backends.clear()
+
+
+def with_response_cache(
+    llm: BaseLLM,
+    backend: Optional[str] = None,
+    validate: Optional[Callable[[str], bool]] = None,
+) -> BaseLLM:
+    """Wraps `llm` with the response cache selected by LLM_CACHE_BACKEND.
+
+    Returns `llm` unchanged when caching is disabled (the default).
+    """
+    cache_backend = get_cache_backend(backend or os.getenv("LLM_CACHE_BACKEND", "none"))
+    if cache_backend is None:
+        return llm
+    ttl = int(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    return CachedLLM(llm, cache_backend, ttl=ttl or None, validate=validate)
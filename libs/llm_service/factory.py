@@ -1,14 +1,88 @@
+import os
+import threading
 from enum import Enum
-from .gemini import GeminiLLM
+from typing import Dict, Optional, Tuple
+
 from .base import BaseLLM
+from .fake import FakeLLM
+from .gemini import GeminiLLM
+from .instrumentation import with_instrumentation
+from .rate_limit import Priority, with_rate_limit
+from .resilience import with_retries
+
 
 class LLMProvider(Enum):
     GEMINI = "gemini"
+    # Deterministic offline responses, for load tests and CI
+    FAKE = "fake"
 
 class LLMFactory:
+    """Builds LLM clients and shares them across the process.
+
+    Clients are created on first use and reused by every later caller with
+    the same provider and arguments, so their HTTP connection pools and TLS
+    sessions are reused too. A forked child (RQ forks a work horse per job)
+    must not reuse the parent's sockets, so the registry is emptied after a
+    fork and the child builds its own clients.
+    """
+
+    _clients: Dict[Tuple, BaseLLM] = {}
+    # Provider clients shared by the wrapped clients of every priority
+    _providers: Dict[Tuple, BaseLLM] = {}
+    _lock = threading.Lock()
+    _pid = os.getpid()
+
     @staticmethod
-    def get_llm(provider: LLMProvider = LLMProvider.GEMINI, **kwargs) -> BaseLLM:
+    def _create(provider: LLMProvider, **kwargs) -> BaseLLM:
         if provider == LLMProvider.GEMINI:
-            return GeminiLLM(**kwargs)
+            return with_instrumentation(GeminiLLM(**kwargs))
+        elif provider == LLMProvider.FAKE:
+            return with_instrumentation(FakeLLM(**kwargs))
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    @classmethod
+    def get_llm(
+        cls,
+        provider: Optional[LLMProvider] = None,
+        priority: Priority = Priority.BACKGROUND,
+        **kwargs,
+    ) -> BaseLLM:
+        """Shared client for `provider`, by default the one named by LLM_PROVIDER.
+
+        Retries wrap the rate limiter, so every attempt waits for quota at
+        `priority`, not just the first one.
+        """
+        if provider is None:
+            provider = LLMProvider(
+                os.getenv("LLM_PROVIDER", LLMProvider.GEMINI.value).lower()
+            )
+        provider_key = (provider, tuple(sorted(kwargs.items())))
+        key = (*provider_key, priority)
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._clients = {}
+                cls._providers = {}
+                cls._pid = os.getpid()
+            llm = cls._clients.get(key)
+            if llm is None:
+                base = cls._providers.get(provider_key)
+                if base is None:
+                    base = cls._create(provider, **kwargs)
+                    cls._providers[provider_key] = base
+                llm = with_retries(with_rate_limit(base, priority))
+                cls._clients[key] = llm
+            return llm
+
+    @classmethod
+    def reset_clients(cls) -> None:
+        """Drops every shared client; the next get_llm call builds a new one."""
+        # A fresh lock too: a fork may have copied it while another thread held it.
+        cls._lock = threading.Lock()
+        cls._clients = {}
+        cls._providers = {}
+        cls._pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=LLMFactory.reset_clients)
@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional
+
+from .base import BaseLLM
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+DISTORTIONS = [
+    "All-or-nothing thinking",
+    "Overgeneralization",
+    "Mental filter",
+    "Disqualifying the positive",
+    "Jumping to conclusions",
+    "Magnification",
+    "Emotional reasoning",
+    "Should statements",
+    "Labeling",
+    "Personalization",
+]
+EMOTIONS = [
+    "Happy",
+    "Sad",
+    "Angry",
+    "Anxious",
+    "Fearful",
+    "Disgusted",
+    "Surprised",
+    "Neutral",
+    "Hopeful",
+    "Frustrated",
+]
+TOPICS = [
+    "Work",
+    "Family",
+    "Friendship",
+    "Health",
+    "Money",
+    "Love",
+    "Career",
+    "Education",
+    "Travel",
+    "Identity",
+    "Future",
+    "Loss",
+]
+WORDS = (
+    "the a quiet morning light city street memory old friend letter window rain "
+    "river road home promise doubt hope fear small voice long night open door "
+    "careful step moment between silence laughter winter summer distant train "
+    "coffee book page story always never perhaps again slowly"
+).split()
+NAMES = [
+    "Alex Rivera",
+    "Sam Okafor",
+    "Jordan Lee",
+    "Maya Chen",
+    "Noah Fischer",
+    "Priya Nair",
+]
+
+
+class FakeLLMError(Exception):
+    """Simulated provider error; `code` makes it look transient to the retry layer."""
+
+    def __init__(self, code: int):
+        super().__init__(f"{code} simulated fake LLM failure")
+        self.code = code
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _single(kind: str) -> Callable[["FakeLLM", str, random.Random], str]:
+    """Responder for a single-thought prompt asking for analysis `kind`."""
+
+    def respond(llm: "FakeLLM", prompt: str, rng: random.Random) -> str:
+        result = llm._classify(kind, llm._thought(prompt))
+        return result if isinstance(result, str) else json.dumps(result)
+
+    return respond
+
+
+class FakeLLM(BaseLLM):
+    """Deterministic offline stand-in for a real model, for load tests and CI.
+
+    Every prompt from the processor, persona and essay flows gets a
+    response in the format that prompt asks for, so the whole pipeline
+    runs unchanged. Responses depend only on the prompt (and, for thought
+    analysis, only on the thought), so repeated runs produce the same data.
+    Latency and failures are drawn from a seeded generator to mimic a real
+    provider: `latency_ms` is the mean of `latency_distribution`, and
+    `failure_rate` of the calls raise a transient FakeLLMError.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake",
+        latency_ms: Optional[float] = None,
+        latency_distribution: Optional[str] = None,
+        latency_sigma: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.latency_ms = (
+            latency_ms
+            if latency_ms is not None
+            else _env_float("FAKE_LLM_LATENCY_MS", 0)
+        )
+        self.latency_distribution = (
+            latency_distribution or os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "fixed")
+        ).lower()
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                "Unsupported fake LLM latency distribution: "
+                f"{self.latency_distribution}"
+            )
+        self.latency_sigma = (
+            latency_sigma
+            if latency_sigma is not None
+            else _env_float("FAKE_LLM_LATENCY_SIGMA", 0.5)
+        )
+        self.failure_rate = (
+            failure_rate
+            if failure_rate is not None
+            else _env_float("FAKE_LLM_FAILURE_RATE", 0)
+        )
+        self._random = random.Random(
+            seed if seed is not None else int(os.getenv("FAKE_LLM_SEED", "0"))
+        )
+        self._lock = threading.Lock()
+
+    # Simulated provider behaviour
+
+    def _latency(self) -> float:
+        mean = max(0.0, self.latency_ms / 1000.0)
+        if mean == 0:
+            return 0.0
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                return self._random.uniform(0, 2 * mean)
+            if self.latency_distribution == "exponential":
+                return self._random.expovariate(1 / mean)
+            if self.latency_distribution == "lognormal":
+                # mu is chosen so the mean stays at `mean` whatever sigma is.
+                sigma = self.latency_sigma
+                return mean * self._random.lognormvariate(-sigma * sigma / 2, sigma)
+            return mean
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            code = self._random.choice([429, 503]) if failed else None
+        if failed:
+            raise FakeLLMError(code)
+
+    def generate_content(self, prompt: str) -> str:
+        time.sleep(self._latency())
+        self._maybe_fail()
+        return self.respond(prompt)
+
+    async def agenerate_content(self, prompt: str) -> str:
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self.respond(prompt)
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        # The latency is the time to first token; the rest arrives at once.
+        time.sleep(self._latency())
+        self._maybe_fail()
+        response = self.respond(prompt)
+        for start in range(0, len(response), 40):
+            yield response[start : start + 40]
+
+    # Deterministic responses
+
+    @staticmethod
+    def _rng(*parts: str) -> random.Random:
+        digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+        return random.Random(digest)
+
+    @staticmethod
+    def _pick(
+        rng: random.Random, vocabulary: List[str], low: int, high: int
+    ) -> List[str]:
+        return rng.sample(vocabulary, rng.randint(low, high))
+
+    @staticmethod
+    def _sentences(rng: random.Random, count: int) -> str:
+        sentences = []
+        for _ in range(count):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        return " ".join(sentences)
+
+    def _classify(self, kind: str, thought: str) -> Any:
+        """Result of one analysis dimension, the same for a thought in any prompt."""
+        rng = self._rng(kind, thought)
+        if kind == "distortions":
+            return self._pick(rng, DISTORTIONS, 0, 2)
+        if kind == "emotions":
+            return self._pick(rng, EMOTIONS, 1, 3)
+        if kind == "topics":
+            return self._pick(rng, TOPICS, 1, 3)
+        if kind == "action_orientation":
+            return rng.choice(["Action-oriented", "Ruminative"])
+        if kind == "thought_type":
+            return rng.choice(["Automatic", "Deliberate"])
+        return {
+            name: self._classify(name, thought)
+            for name in (
+                "distortions",
+                "emotions",
+                "action_orientation",
+                "thought_type",
+                "topics",
+            )
+        }
+
+    @staticmethod
+    def _thought(prompt: str) -> str:
+        match = re.search(r'Thought: "(.*?)"\n', prompt, re.DOTALL)
+        return match.group(1) if match else prompt
+
+    def _batch(self, prompt: str, rng: random.Random) -> str:
+        match = re.search(r"\nThoughts:\n(.*)", prompt, re.DOTALL)
+        try:
+            items = json.loads(match.group(1)) if match else []
+        except json.JSONDecodeError:
+            items = []
+        instructions = prompt.split("You are given several thoughts", 1)[0]
+        for marker, kind in (
+            ("For each thought, give", "analysis"),
+            ("Cognitive Distortions", "distortions"),
+            ("primary emotions", "emotions"),
+            ("main topics", "topics"),
+            ('"Action-oriented"', "action_orientation"),
+            ('"Automatic"', "thought_type"),
+        ):
+            if marker in instructions:
+                break
+        else:
+            kind = "analysis"
+        return json.dumps(
+            {
+                str(item["id"]): self._classify(kind, str(item.get("thought", "")))
+                for item in items
+                if isinstance(item, dict) and "id" in item
+            }
+        )
+
+    def _thought_list(self, prompt: str, rng: random.Random) -> str:
+        match = re.search(r"Extract exactly (\d+)", prompt)
+        count = int(match.group(1)) if match else rng.randint(3, 6)
+        return json.dumps(
+            [self._sentences(rng, rng.randint(1, 3)) for _ in range(count)]
+        )
+
+    def _essay(self, prompt: str, rng: random.Random) -> str:
+        paragraphs = [
+            self._sentences(rng, rng.randint(3, 6)) for _ in range(rng.randint(2, 4))
+        ]
+        return "\n\n".join(paragraphs)
+
+    def _essay_draft(self, prompt: str, rng: random.Random) -> str:
+        return json.dumps(
+            {
+                "essay": self._essay(prompt, rng),
+                "tags": [topic.lower() for topic in self._pick(rng, TOPICS, 3, 5)],
+            }
+        )
+
+    def _emotion_list(self, prompt: str, rng: random.Random) -> str:
+        return json.dumps(self._pick(rng, EMOTIONS, 1, 3))
+
+    def _conversation(self, prompt: str, rng: random.Random) -> str:
+        messages = [
+            {"content": self._sentences(rng, 1)} for _ in range(rng.randint(1, 3))
+        ]
+        return json.dumps({"messages": messages})
+
+    def _persona(self, prompt: str, rng: random.Random) -> str:
+        return json.dumps(
+            {
+                "name": rng.choice(NAMES),
+                "age": rng.randint(18, 75),
+                "gender": rng.choice(["Female", "Male", "Non-binary"]),
+                "profile": {
+                    key: self._sentences(rng, 1)
+                    for key in ("background", "core_beliefs", "fears", "desires")
+                },
+            }
+        )
+
+    def _persona_profile(self, prompt: str, rng: random.Random) -> str:
+        return json.dumps(
+            {
+                "topics": [
+                    {"name": topic, "emotions": self._pick(rng, EMOTIONS, 1, 3)}
+                    for topic in self._pick(rng, TOPICS, 1, 5)
+                ],
+                "thought_patterns": self._sentences(rng, 1),
+                "tags": [topic.lower() for topic in self._pick(rng, TOPICS, 2, 4)],
+                "thought_type": rng.choice(["Automatic", "Deliberate"]),
+                "action_orientation": rng.choice(["Action-oriented", "Ruminative"]),
+            }
+        )
+
+    # Phrases that identify each prompt, checked in order (more specific first).
+    RESPONDERS = [
+        ("maps every id to its result", _batch),
+        ("in a single pass", _single("analysis")),
+        (
+            "Analyze the following thought for Cognitive Distortions",
+            _single("distortions"),
+        ),
+        ("identify the primary emotions associated with it", _single("emotions")),
+        ("identify up to 3 main topics discussed", _single("topics")),
+        (
+            'classify it as either "Action-oriented" or "Ruminative"',
+            _single("action_orientation"),
+        ),
+        ('classify it as either "Automatic" or "Deliberate"', _single("thought_type")),
+        ('"essay" (string) and "tags"', _essay_draft),
+        ("Extract the emotions associated with that topic", _emotion_list),
+        ("You are a creative editor", _essay),
+        ("Complete the following essay", _essay),
+        ("You are roleplaying as a specific persona", _conversation),
+        ("Extract exactly", _thought_list),
+        ("extract distinct thoughts", _thought_list),
+        ("synthesize a complete, entirely new Persona profile", _persona),
+        ("Create a generalized profile", _persona_profile),
+    ]
+
+    def respond(self, prompt: str) -> str:
+        """The deterministic response to `prompt`, without latency or failures."""
+        rng = self._rng(prompt)
+        for marker, responder in self.RESPONDERS:
+            if marker in prompt:
+                return responder(self, prompt, rng)
+        return self._sentences(rng, 3)
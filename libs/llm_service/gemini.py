@@ -1,25 +1,149 @@
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
 from google import genai
+from google.genai import types
+
 from .base import BaseLLM
+from .instrumentation import report_usage
+from .rate_limit import estimate_tokens
+
+
+def _report_usage(response) -> None:
+    """Passes the token counts Gemini returned on to the instrumentation layer."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        report_usage(
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+class ContextCache:
+    """Gemini cached contents holding the static prefixes of prompts.
+
+    A prefix is uploaded once as the system instruction of a cached content
+    and later calls only send the rest of the prompt, paying the reduced
+    cached-token rate for the prefix. Gemini rejects caches below a minimum
+    size, so shorter prefixes are sent inline (where the provider's implicit
+    prefix caching may still apply). A prefix whose upload fails is not
+    retried by this process.
+    """
+
+    # Renew a cache this long before it expires, so no call races its expiry.
+    EXPIRY_MARGIN_SECONDS = 60
+
+    def __init__(self, client: Any, model_name: str, min_tokens: int, ttl_seconds: int):
+        self.client = client
+        self.model_name = model_name
+        self.min_tokens = min_tokens
+        self.ttl_seconds = ttl_seconds
+        self._names: Dict[str, Tuple[str, float]] = {}
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def name_for(self, prefix: str) -> Optional[str]:
+        """Name of the cached content holding `prefix`, or None to send it inline."""
+        if not prefix or estimate_tokens(prefix) < self.min_tokens:
+            return None
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._failed:
+                return None
+            cached = self._names.get(key)
+            if cached and cached[1] - time.monotonic() > self.EXPIRY_MARGIN_SECONDS:
+                return cached[0]
+            try:
+                cache = self.client.caches.create(
+                    model=self.model_name,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=prefix, ttl=f"{self.ttl_seconds}s"
+                    ),
+                )
+            except Exception as e:
+                print(
+                    "Error creating Gemini context cache, "
+                    f"sending the prompt inline: {e}"
+                )
+                self._failed.add(key)
+                return None
+            self._names[key] = (cache.name, time.monotonic() + self.ttl_seconds)
+            return cache.name
+
 
 class GeminiLLM(BaseLLM):
     def __init__(self, api_key: str = None, model_name: str = "gemini-2.0-flash"):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY is not set.")
-        
+
         self.client = genai.Client(api_key=self.api_key)
         self.model_name = model_name
+        self.context_cache = None
+        if os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true":
+            self.context_cache = ContextCache(
+                self.client,
+                model_name,
+                min_tokens=int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096")),
+                ttl_seconds=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600")),
+            )
+
+    def _request(self, prompt: str, cache_name: Optional[str]) -> Dict[str, Any]:
+        """Arguments of a generate call, without the prefix when it is cached."""
+        if cache_name is None:
+            return {"model": self.model_name, "contents": prompt}
+        return {
+            "model": self.model_name,
+            "contents": prompt.dynamic_part,
+            "config": types.GenerateContentConfig(cached_content=cache_name),
+        }
+
+    def _cache_name(self, prompt: str) -> Optional[str]:
+        prefix = getattr(prompt, "static_prefix", "")
+        if self.context_cache is None or not prefix:
+            return None
+        return self.context_cache.name_for(prefix)
 
     def generate_content(self, prompt: str) -> str:
         """Generates content using Gemini API."""
         try:
             response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
+                **self._request(prompt, self._cache_name(prompt))
             )
+            _report_usage(response)
             return response.text
         except Exception as e:
             # Handle API errors gracefully or re-raise
             print(f"Error calling Gemini API: {e}")
             raise e
+
+    async def agenerate_content(self, prompt: str) -> str:
+        """Generates content with the async Gemini client off the event loop."""
+        try:
+            # Creating a cache blocks, but happens once per prefix and TTL.
+            cache_name = await asyncio.to_thread(self._cache_name, prompt)
+            response = await self.client.aio.models.generate_content(
+                **self._request(prompt, cache_name)
+            )
+            _report_usage(response)
+            return response.text
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}")
+            raise e
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """Yields text chunks from the streaming Gemini API as they arrive."""
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                **self._request(prompt, self._cache_name(prompt))
+            ):
+                # Usage is cumulative; the last chunk carries the totals.
+                _report_usage(chunk)
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}")
+            raise e
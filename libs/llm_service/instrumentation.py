@@ -0,0 +1,300 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .base import BaseLLM
+from .rate_limit import estimate_tokens
+
+try:
+    from prometheus_client import Counter, Histogram
+except (
+    ImportError
+):  # Metrics are optional; structured logs and in-process totals still work.
+    Counter = Histogram = None
+
+UNKNOWN_OPERATION = "unknown"
+
+if Counter is not None:
+    LLM_REQUESTS = Counter(
+        "llm_requests_total", "LLM calls by outcome", ["model", "operation", "outcome"]
+    )
+    LLM_PROMPT_TOKENS = Counter(
+        "llm_prompt_tokens_total", "Prompt tokens sent", ["model", "operation"]
+    )
+    LLM_OUTPUT_TOKENS = Counter(
+        "llm_output_tokens_total", "Output tokens received", ["model", "operation"]
+    )
+    LLM_LATENCY = Histogram(
+        "llm_request_duration_seconds",
+        "Duration of one LLM call",
+        ["model", "operation"],
+        buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+    )
+    LLM_PROMPT_SIZE = Histogram(
+        "llm_prompt_size_tokens",
+        "Prompt size of one LLM call",
+        ["model", "operation"],
+        buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+    )
+
+_operation: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_operation", default=UNKNOWN_OPERATION
+)
+_usage: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "llm_usage", default=None
+)
+
+
+@contextmanager
+def llm_operation_scope(name: str):
+    """Attributes the LLM calls made inside the block to operation `name`."""
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def llm_operation(func: Callable) -> Callable:
+    """Decorator attributing the LLM calls a method makes to the method's name.
+
+    Works for sync and async methods; the innermost decorated method wins.
+    """
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with llm_operation_scope(func.__name__):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with llm_operation_scope(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def report_usage(
+    prompt_tokens: Optional[int] = None, output_tokens: Optional[int] = None
+) -> None:
+    """Called by clients with the token counts their provider reported for a call."""
+    usage = _usage.get()
+    if usage is None:
+        return
+    if isinstance(prompt_tokens, int):
+        usage["prompt_tokens"] = prompt_tokens
+    if isinstance(output_tokens, int):
+        usage["output_tokens"] = output_tokens
+
+
+class UsageStats:
+    """In-process totals per model and operation, available without Prometheus."""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model: str,
+        operation: str,
+        outcome: str,
+        prompt_tokens: int,
+        output_tokens: int,
+        seconds: float,
+    ) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(
+                f"{model}:{operation}",
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "prompt_tokens": 0,
+                    "output_tokens": 0,
+                    "seconds": 0.0,
+                },
+            )
+            totals["calls"] += 1
+            totals["errors"] += outcome != "success"
+            totals["prompt_tokens"] += prompt_tokens
+            totals["output_tokens"] += output_tokens
+            totals["seconds"] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+usage_stats = UsageStats()
+
+
+def get_usage_stats() -> Dict[str, Dict[str, float]]:
+    return usage_stats.stats()
+
+
+class InstrumentedLLM(BaseLLM):
+    """Records tokens, latency and outcome of every call to the wrapped LLM.
+
+    Each call is attributed to the operation set with `llm_operation`, and
+    exported as Prometheus metrics (when prometheus_client is installed),
+    as a JSON log line (unless LLM_USAGE_LOG is false) and to `usage_stats`.
+    Token counts come from the provider via `report_usage`, or are
+    estimated from the text when it reports none.
+    """
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        self.model_name = getattr(llm, "model_name", type(llm).__name__)
+        self.log_usage = os.getenv("LLM_USAGE_LOG", "true").lower() == "true"
+
+    def _record(
+        self,
+        prompt: str,
+        output: Optional[str],
+        usage: Dict[str, int],
+        started: float,
+        outcome: str,
+    ) -> None:
+        seconds = time.perf_counter() - started
+        operation = _operation.get()
+        estimated = "prompt_tokens" not in usage
+        prompt_tokens = usage.get("prompt_tokens", estimate_tokens(prompt))
+        output_tokens = usage.get(
+            "output_tokens", estimate_tokens(output) if output else 0
+        )
+
+        usage_stats.record(
+            self.model_name, operation, outcome, prompt_tokens, output_tokens, seconds
+        )
+        if Counter is not None:
+            LLM_REQUESTS.labels(self.model_name, operation, outcome).inc()
+            LLM_PROMPT_TOKENS.labels(self.model_name, operation).inc(prompt_tokens)
+            LLM_OUTPUT_TOKENS.labels(self.model_name, operation).inc(output_tokens)
+            LLM_LATENCY.labels(self.model_name, operation).observe(seconds)
+            LLM_PROMPT_SIZE.labels(self.model_name, operation).observe(prompt_tokens)
+        if self.log_usage:
+            print(
+                json.dumps(
+                    {
+                        "event": "llm_call",
+                        "model": self.model_name,
+                        "operation": operation,
+                        "outcome": outcome,
+                        "prompt_tokens": prompt_tokens,
+                        "output_tokens": output_tokens,
+                        "tokens_estimated": estimated,
+                        "latency_ms": round(seconds * 1000, 1),
+                        "prompt_chars": len(prompt),
+                    }
+                )
+            )
+
+    def generate_content(self, prompt: str) -> str:
+        usage: Dict[str, int] = {}
+        token = _usage.set(usage)
+        started = time.perf_counter()
+        try:
+            result = self.llm.generate_content(prompt)
+        except Exception:
+            self._record(prompt, None, usage, started, "error")
+            raise
+        finally:
+            _usage.reset(token)
+        self._record(prompt, result, usage, started, "success")
+        return result
+
+    async def agenerate_content(self, prompt: str) -> str:
+        usage: Dict[str, int] = {}
+        token = _usage.set(usage)
+        started = time.perf_counter()
+        try:
+            result = await self.llm.agenerate_content(prompt)
+        except Exception:
+            self._record(prompt, None, usage, started, "error")
+            raise
+        finally:
+            _usage.reset(token)
+        self._record(prompt, result, usage, started, "success")
+        return result
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        # The usage holder is passed by reference: the stream runs in the
+        # caller's context between yields, so no context variable is kept set.
+        usage: Dict[str, int] = {}
+        chunks = []
+        started = time.perf_counter()
+        stream = self.llm.stream_content(prompt)
+        try:
+            while True:
+                token = _usage.set(usage)
+                try:
+                    chunk = next(stream)
+                except StopIteration:
+                    break
+                finally:
+                    _usage.reset(token)
+                chunks.append(chunk)
+                yield chunk
+        except Exception:
+            self._record(prompt, "".join(chunks), usage, started, "error")
+            raise
+        self._record(prompt, "".join(chunks), usage, started, "success")
+
+
+def with_instrumentation(llm: BaseLLM) -> BaseLLM:
+    return InstrumentedLLM(llm)
+
+
+def metrics_registry() -> Any:
+    """Registry to expose, across forked processes if PROMETHEUS_MULTIPROC_DIR is set.
+
+    RQ runs each job in a forked work horse, so worker metrics only survive
+    in multiprocess mode. Returns None when prometheus_client is missing.
+    """
+    if Counter is None:
+        return None
+    from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_asgi_app() -> Any:
+    """ASGI app serving /metrics, or None when prometheus_client is missing."""
+    registry = metrics_registry()
+    if registry is None:
+        return None
+    from prometheus_client import make_asgi_app
+
+    return make_asgi_app(registry=registry)
+
+
+def start_metrics_server(port: Optional[int] = None) -> bool:
+    """Serves metrics over HTTP on `port` (default METRICS_PORT).
+
+    For processes without an API, such as the RQ workers.
+    """
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    registry = metrics_registry()
+    if not port or registry is None:
+        return False
+    from prometheus_client import start_http_server
+
+    start_http_server(port, registry=registry)
+    return True
@@ -0,0 +1,128 @@
+import json
+import textwrap
+from string import Formatter
+from typing import Any, List, Optional, Set, Tuple
+
+_formatter = Formatter()
+
+# (literal text, field name or None, format spec, conversion)
+_Piece = Tuple[str, Optional[str], str, Optional[str]]
+
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or padding, for embedding data in prompts.
+
+    Indented JSON costs one or more tokens per line of whitespace; the model
+    reads both forms equally well.
+    """
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class Prompt(str):
+    """A rendered prompt that remembers how much of its text is static.
+
+    `static_prefix` is the leading text every prompt from the same template
+    shares. Wrappers pass the prompt through unchanged, so the client at the
+    end of the chain can send the prefix once as cached context and only the
+    rest on each call. Anywhere else it is a plain string.
+    """
+
+    static_prefix: str
+
+    def __new__(cls, text: str, static_prefix: str = ""):
+        prompt = super().__new__(cls, text)
+        prompt.static_prefix = static_prefix if text.startswith(static_prefix) else ""
+        return prompt
+
+    @property
+    def dynamic_part(self) -> str:
+        return str(self)[len(self.static_prefix) :]
+
+
+class PromptTemplate:
+    """A prompt template parsed once at import instead of on every call.
+
+    Indentation and surrounding blank lines are stripped when it is built,
+    and the text before the first placeholder is kept as the static prefix
+    of every prompt it renders. Templates should therefore put their fixed
+    instructions first and the per-call data last. `format` accepts the same
+    placeholders as str.format.
+    """
+
+    def __init__(self, template: str):
+        self.template = textwrap.dedent(template).strip() + "\n"
+        self._pieces: List[_Piece] = list(_formatter.parse(self.template))
+        self.fields: Set[str] = {
+            field for _, field, _, _ in self._pieces if field is not None
+        }
+        if not all(field.isidentifier() for field in self.fields):
+            raise ValueError("Prompt templates only support named placeholders.")
+        self.static_prefix = self._render_prefix()
+
+    @classmethod
+    def _from_pieces(cls, pieces: List[_Piece]) -> "PromptTemplate":
+        template = cls.__new__(cls)
+        template.template = "".join(
+            literal.replace("{", "{{").replace("}", "}}")
+            + cls._placeholder(field, spec, conversion)
+            for literal, field, spec, conversion in pieces
+        )
+        template._pieces = pieces
+        template.fields = {field for _, field, _, _ in pieces if field is not None}
+        template.static_prefix = template._render_prefix()
+        return template
+
+    @staticmethod
+    def _placeholder(field: Optional[str], spec: str, conversion: Optional[str]) -> str:
+        if field is None:
+            return ""
+        return (
+            "{"
+            + field
+            + (f"!{conversion}" if conversion else "")
+            + (f":{spec}" if spec else "")
+            + "}"
+        )
+
+    @staticmethod
+    def _render_field(
+        field: str, spec: str, conversion: Optional[str], values: dict
+    ) -> str:
+        value = values[field]
+        return _formatter.format_field(
+            _formatter.convert_field(value, conversion), spec
+        )
+
+    def _render_prefix(self) -> str:
+        prefix = []
+        for literal, field, _, _ in self._pieces:
+            prefix.append(literal)
+            if field is not None:
+                break
+        return "".join(prefix)
+
+    def partial(self, **values: Any) -> "PromptTemplate":
+        """A template with some placeholders filled in, extending the static prefix."""
+        pieces: List[_Piece] = []
+        pending = ""
+        for literal, field, spec, conversion in self._pieces:
+            pending += literal
+            if field is not None and field in values:
+                pending += self._render_field(field, spec, conversion, values)
+                continue
+            pieces.append((pending, field, spec, conversion))
+            pending = ""
+        if pending:
+            pieces.append((pending, None, "", None))
+        return self._from_pieces(pieces)
+
+    def format(self, **values: Any) -> Prompt:
+        parts = []
+        for literal, field, spec, conversion in self._pieces:
+            parts.append(literal)
+            if field is not None:
+                parts.append(self._render_field(field, spec, conversion, values))
+        return Prompt("".join(parts), self.static_prefix)
+
+    def __str__(self) -> str:
+        return self.template
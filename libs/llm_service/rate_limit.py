@@ -0,0 +1,316 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .base import BaseLLM
+
+# Rough characters-per-token ratio, close enough to budget tokens without a tokenizer
+CHARS_PER_TOKEN = 4
+DEFAULT_RPM = 60
+DEFAULT_TPM = 1_000_000
+# Share of each bucket that background work must leave for interactive work
+INTERACTIVE_RESERVE = 0.2
+DEFAULT_MAX_WAIT_SECONDS = 600
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class Priority(Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than the limiter's max_wait for quota."""
+
+
+# One bucket: (capacity, refill per second, amount to take)
+BucketSpec = Tuple[float, float, float]
+
+
+class TokenBucketBackend(ABC):
+    @abstractmethod
+    def try_acquire(
+        self, keys: List[str], specs: List[BucketSpec], reserve: float
+    ) -> float:
+        """Takes `amount` from every bucket at once, or from none of them.
+
+        Each bucket must keep `reserve` (a share of its capacity) after the
+        take. Returns 0 on success, otherwise the seconds to wait before the
+        take could succeed.
+        """
+        pass
+
+
+def _take(
+    states: List[Tuple[float, float]],
+    specs: List[BucketSpec],
+    now: float,
+    reserve: float,
+):
+    """Refills `states` of (tokens, updated_at) to `now` and takes from them if it can.
+
+    Returns (wait_seconds, new_states).
+    """
+    refilled = []
+    wait = 0.0
+    for (tokens, updated_at), (capacity, rate, amount) in zip(states, specs):
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+        refilled.append(tokens)
+        held_back = min(reserve * capacity, capacity - amount)
+        missing = amount + held_back - tokens
+        if missing > 0:
+            wait = max(wait, missing / rate)
+    if wait > 0:
+        return wait, [(tokens, now) for tokens in refilled]
+    return 0.0, [
+        (tokens - amount, now) for tokens, (_c, _r, amount) in zip(refilled, specs)
+    ]
+
+
+class LocalTokenBucket(TokenBucketBackend):
+    """Buckets shared by the threads of one process only."""
+
+    def __init__(self):
+        self._states: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(
+        self, keys: List[str], specs: List[BucketSpec], reserve: float
+    ) -> float:
+        now = time.monotonic()
+        with self._lock:
+            states = [
+                self._states.get(key, (capacity, now))
+                for key, (capacity, _rate, _amount) in zip(keys, specs)
+            ]
+            wait, states = _take(states, specs, now, reserve)
+            self._states.update(zip(keys, states))
+        return wait
+
+
+class RedisTokenBucket(TokenBucketBackend):
+    """Buckets shared by every worker through Redis.
+
+    Refill and take happen in one Lua script on the Redis clock, so
+    containers never disagree about the remaining quota. If Redis is
+    unreachable the in-process fallback keeps calls throttled per process.
+    """
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local reserve = tonumber(ARGV[1])
+    local wait = 0
+    local tokens = {}
+    for i = 1, #KEYS do
+        local capacity = tonumber(ARGV[i * 3 - 1])
+        local rate = tonumber(ARGV[i * 3])
+        local amount = tonumber(ARGV[i * 3 + 1])
+        local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+        local current = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        current = math.min(capacity, current + math.max(0, now - updated) * rate)
+        tokens[i] = current
+        local headroom = math.min(reserve * capacity, capacity - amount)
+        local missing = amount + headroom - current
+        if missing > 0 then
+            wait = math.max(wait, missing / rate)
+        end
+    end
+    if wait > 0 then
+        return tostring(wait)
+    end
+    for i = 1, #KEYS do
+        local capacity = tonumber(ARGV[i * 3 - 1])
+        local rate = tonumber(ARGV[i * 3])
+        local amount = tonumber(ARGV[i * 3 + 1])
+        redis.call('HSET', KEYS[i], 'tokens', tokens[i] - amount, 'ts', now)
+        redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 60)
+    end
+    return '0'
+    """
+
+    def __init__(self, redis_conn=None, prefix: str = "llm_rate"):
+        if redis_conn is None:
+            from redis import Redis
+
+            redis_conn = Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=os.getenv("REDIS_PORT", "6379"),
+            )
+        self.redis = redis_conn
+        self.prefix = prefix
+        self._script = self.redis.register_script(self.SCRIPT)
+        self._fallback = LocalTokenBucket()
+
+    def try_acquire(
+        self, keys: List[str], specs: List[BucketSpec], reserve: float
+    ) -> float:
+        args = [reserve]
+        for spec in specs:
+            args.extend(spec)
+        try:
+            result = self._script(
+                keys=[f"{self.prefix}:{key}" for key in keys], args=args
+            )
+        except Exception as e:
+            print(f"Error using Redis rate limiter, limiting in-process instead: {e}")
+            return self._fallback.try_acquire(keys, specs, reserve)
+        return float(result.decode() if isinstance(result, bytes) else result)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one model.
+
+    Callers over budget wait for quota instead of failing. Background calls
+    leave INTERACTIVE_RESERVE of each bucket untouched, so interactive calls
+    get through first when quota runs short.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: TokenBucketBackend,
+        rpm: int = DEFAULT_RPM,
+        tpm: int = DEFAULT_TPM,
+        max_wait: Optional[float] = DEFAULT_MAX_WAIT_SECONDS,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self._keys = [f"{model_name}:requests", f"{model_name}:tokens"]
+
+    def _try(self, tokens: int, priority: Priority) -> float:
+        specs = [
+            (float(self.rpm), self.rpm / 60.0, 1.0),
+            (float(self.tpm), self.tpm / 60.0, float(min(tokens, self.tpm))),
+        ]
+        reserve = INTERACTIVE_RESERVE if priority == Priority.BACKGROUND else 0.0
+        return self.backend.try_acquire(self._keys, specs, reserve)
+
+    def _next_sleep(self, wait: float, started: float) -> float:
+        if (
+            self.max_wait is not None
+            and time.monotonic() - started + wait > self.max_wait
+        ):
+            raise RateLimitTimeout(
+                f"Waited more than {self.max_wait}s for {self.model_name} quota"
+            )
+        # Jitter keeps waiting workers from retrying in lockstep.
+        return wait + random.uniform(0, min(wait, 1.0) * 0.1)
+
+    def acquire(self, tokens: int, priority: Priority = Priority.BACKGROUND) -> None:
+        started = time.monotonic()
+        while True:
+            wait = self._try(tokens, priority)
+            if wait <= 0:
+                return
+            time.sleep(self._next_sleep(wait, started))
+
+    async def aacquire(
+        self, tokens: int, priority: Priority = Priority.BACKGROUND
+    ) -> None:
+        started = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self._try, tokens, priority)
+            if wait <= 0:
+                return
+            await asyncio.sleep(self._next_sleep(wait, started))
+
+
+class RateLimitedLLM(BaseLLM):
+    """Wraps an LLM so every call first waits for quota from a RateLimiter."""
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        limiter: RateLimiter,
+        priority: Priority = Priority.BACKGROUND,
+    ):
+        self.llm = llm
+        self.limiter = limiter
+        self.priority = priority
+        self.model_name = getattr(llm, "model_name", type(llm).__name__)
+
+    def generate_content(self, prompt: str) -> str:
+        self.limiter.acquire(estimate_tokens(prompt), self.priority)
+        return self.llm.generate_content(prompt)
+
+    async def agenerate_content(self, prompt: str) -> str:
+        await self.limiter.aacquire(estimate_tokens(prompt), self.priority)
+        return await self.llm.agenerate_content(prompt)
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        self.limiter.acquire(estimate_tokens(prompt), self.priority)
+        yield from self.llm.stream_content(prompt)
+
+
+_buckets: Dict[str, TokenBucketBackend] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket_backend(name: str) -> Optional[TokenBucketBackend]:
+    """Process-wide bucket backend by name ("memory" or "redis"); None for "none"."""
+    name = (name or "none").lower()
+    if name == "none":
+        return None
+    with _buckets_lock:
+        backend = _buckets.get(name)
+        if backend is None:
+            if name == "memory":
+                backend = LocalTokenBucket()
+            elif name == "redis":
+                backend = RedisTokenBucket()
+            else:
+                raise ValueError(f"Unsupported LLM rate limit backend: {name}")
+            _buckets[name] = backend
+        return backend
+
+
+def model_limits(model_name: str) -> Tuple[int, int]:
+    """(rpm, tpm) for `model_name`.
+
+    LLM_RATE_LIMITS holds per-model overrides as JSON, e.g.
+    {"gemini-2.0-flash": {"rpm": 2000, "tpm": 4000000}}; LLM_RPM and LLM_TPM
+    apply to every other model.
+    """
+    rpm = int(os.getenv("LLM_RPM", DEFAULT_RPM))
+    tpm = int(os.getenv("LLM_TPM", DEFAULT_TPM))
+    try:
+        overrides = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+    except json.JSONDecodeError as e:
+        print(f"Ignoring invalid LLM_RATE_LIMITS: {e}")
+        overrides = {}
+    limits = overrides.get(model_name, {}) if isinstance(overrides, dict) else {}
+    return int(limits.get("rpm", rpm)), int(limits.get("tpm", tpm))
+
+
+def with_rate_limit(
+    llm: BaseLLM,
+    priority: Priority = Priority.BACKGROUND,
+    backend: Optional[str] = None,
+) -> BaseLLM:
+    """Wraps `llm` with the limiter selected by LLM_RATE_LIMIT_BACKEND.
+
+    Returns `llm` unchanged when rate limiting is disabled (the default).
+    """
+    bucket_backend = get_bucket_backend(
+        backend or os.getenv("LLM_RATE_LIMIT_BACKEND", "none")
+    )
+    if bucket_backend is None:
+        return llm
+    model_name = getattr(llm, "model_name", type(llm).__name__)
+    rpm, tpm = model_limits(model_name)
+    limiter = RateLimiter(model_name, bucket_backend, rpm=rpm, tpm=tpm)
+    return RateLimitedLLM(llm, limiter, priority)
@@ -0,0 +1,336 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, Optional
+
+from .base import BaseLLM
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# How long a call may wait for an open circuit before giving up
+DEFAULT_MAX_CIRCUIT_WAIT = 300.0
+
+
+class CircuitOpenError(Exception):
+    """Raised when the provider's circuit stayed open longer than a call may wait."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether `error` is transient: a network failure or a retryable HTTP status."""
+    code = _status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # httpx transport errors (what the Gemini client raises on network trouble)
+    # do not subclass the builtin ones.
+    return type(error).__module__.startswith("httpx") and type(error).__name__ in (
+        "ConnectError",
+        "ReadError",
+        "WriteError",
+        "RemoteProtocolError",
+        "ConnectTimeout",
+        "ReadTimeout",
+        "WriteTimeout",
+        "PoolTimeout",
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or Gemini's RetryInfo."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            value = headers.get("retry-after")
+        except Exception:
+            value = None
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except (TypeError, ValueError):
+                pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        # Gemini wraps the status in {"error": {...}}; some transports unwrap it.
+        body = details.get("error", details)
+        for item in (body.get("details") if isinstance(body, dict) else None) or []:
+            delay = item.get("retryDelay") if isinstance(item, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return max(0.0, float(delay[:-1]))
+                except ValueError:
+                    pass
+    return None
+
+
+class RetryMetrics:
+    """Per-model counters of attempts, retries and outcomes."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+class CircuitBreaker:
+    """Stops calls to a provider after repeated transient failures.
+
+    After `failure_threshold` failures in a row the circuit opens for
+    `reset_timeout` seconds. It then lets a single trial call through
+    (half-open): success closes it again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        metrics: Optional[RetryMetrics] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.metrics = metrics or RetryMetrics()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> float:
+        """0 if a call may go ahead now, otherwise the seconds to wait first."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return min(1.0, self.reset_timeout)
+            self._trial_in_flight = True
+            return 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.metrics.record("circuit_opened")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ResilientLLM(BaseLLM):
+    """Wraps an LLM with classified retries and a circuit breaker.
+
+    Transient errors are retried with exponential backoff and full jitter,
+    never sooner than the provider's Retry-After. Other errors are raised at
+    once. While the circuit is open, calls wait for it to half-open instead
+    of failing, so a failure storm slows work down rather than dropping it.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        breaker: Optional[CircuitBreaker] = None,
+        max_circuit_wait: float = DEFAULT_MAX_CIRCUIT_WAIT,
+    ):
+        self.llm = llm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.model_name = getattr(llm, "model_name", type(llm).__name__)
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = self.breaker.metrics
+        self.max_circuit_wait = max_circuit_wait
+
+    def _circuit_wait(self, started: float) -> float:
+        wait = self.breaker.before_call()
+        if wait > 0 and time.monotonic() - started + wait > self.max_circuit_wait:
+            self.metrics.record("failed")
+            raise CircuitOpenError(f"Circuit for {self.model_name} is open")
+        return wait
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Records a failed attempt and returns the delay before the next one.
+
+        Re-raises `error` when it is not transient or retries are used up.
+        """
+        retryable = is_retryable(error)
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            # A bad request says nothing about the provider's health.
+            self.breaker.record_success()
+        if not retryable or attempt >= self.max_retries:
+            self.metrics.record("failed")
+            raise error
+
+        self.metrics.record("retries")
+        self.metrics.record(f"retries_{_status_code(error) or type(error).__name__}")
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(backoff, retry_after(error) or 0.0)
+
+    def generate_content(self, prompt: str) -> str:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self._circuit_wait(started)
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            self.metrics.record("attempts")
+            try:
+                result = self.llm.generate_content(prompt)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                print(
+                    f"Retrying {self.model_name} call in {delay:.1f}s after error: {e}"
+                )
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.metrics.record("succeeded")
+            return result
+
+    async def agenerate_content(self, prompt: str) -> str:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self._circuit_wait(started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            self.metrics.record("attempts")
+            try:
+                result = await self.llm.agenerate_content(prompt)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                print(
+                    f"Retrying {self.model_name} call in {delay:.1f}s after error: {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.metrics.record("succeeded")
+            return result
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """Streams with retries until the first chunk arrives.
+
+        Once text has been yielded a retry would repeat it, so later errors
+        are raised to the caller.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self._circuit_wait(started)
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            self.metrics.record("attempts")
+            chunks = self.llm.stream_content(prompt)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                print(
+                    f"Retrying {self.model_name} stream in {delay:.1f}s "
+                    f"after error: {e}"
+                )
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.metrics.record("succeeded")
+            if first is not None:
+                yield first
+            yield from chunks
+            return
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    """Process-wide breaker per model, so every client of a model shares its health."""
+    with _breakers_lock:
+        breaker = _breakers.get(model_name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(
+                    os.getenv(
+                        "LLM_CIRCUIT_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD
+                    )
+                ),
+                reset_timeout=float(
+                    os.getenv("LLM_CIRCUIT_RESET_SECONDS", DEFAULT_RESET_TIMEOUT)
+                ),
+            )
+            _breakers[model_name] = breaker
+        return breaker
+
+
+def get_retry_metrics() -> Dict[str, Dict[str, int]]:
+    """Retry counters of every model used in this process."""
+    with _breakers_lock:
+        return {model: breaker.metrics.stats() for model, breaker in _breakers.items()}
+
+
+def with_retries(llm: BaseLLM) -> BaseLLM:
+    """Wraps `llm` in a ResilientLLM configured from the environment.
+
+    LLM_MAX_RETRIES=0 disables retries (the circuit breaker is skipped too).
+    """
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+    if max_retries <= 0:
+        return llm
+    model_name = getattr(llm, "model_name", type(llm).__name__)
+    return ResilientLLM(
+        llm,
+        max_retries=max_retries,
+        base_delay=float(os.getenv("LLM_RETRY_BASE_SECONDS", DEFAULT_BASE_DELAY)),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_SECONDS", DEFAULT_MAX_DELAY)),
+        breaker=get_circuit_breaker(model_name),
+    )
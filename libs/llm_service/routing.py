@@ -0,0 +1,370 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .base import BaseLLM
+from .rate_limit import RateLimitTimeout
+from .resilience import CircuitOpenError, RetryMetrics, is_retryable
+
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MIN_SECONDS = 1.0
+# At most this share of calls may send a duplicate
+DEFAULT_HEDGE_BUDGET = 0.1
+DEFAULT_TIER_TIMEOUT = 30.0
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class TaskType(Enum):
+    # Short structured answers (distortions, emotions, topics...)
+    CLASSIFICATION = "classification"
+    # Long-form, user-facing text (essays, conversation messages)
+    GENERATION = "generation"
+
+
+class LatencyTracker:
+    """Sliding window of successful call durations for one tier."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-quantile of the window, or None while it has too few samples."""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """Caps hedged duplicates to a share of all calls, so a slow provider
+    does not get twice the traffic exactly when it is struggling."""
+
+    def __init__(self, ratio: float):
+        self.ratio = ratio
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._calls += 1
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._hedges >= max(1.0, self.ratio * self._calls):
+                return False
+            self._hedges += 1
+            return True
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_metrics: Dict[str, RetryMetrics] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Threads running sync tier calls, created on first use (after any fork)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", "32")),
+                thread_name_prefix="llm-route",
+            )
+        return _executor
+
+
+def _reset_executor() -> None:
+    # A forked child cannot use the parent's threads.
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def get_routing_metrics() -> Dict[str, Dict[str, int]]:
+    """Hedge and fallback counters of every routed model in this process."""
+    return {model: metrics.stats() for model, metrics in list(_metrics.items())}
+
+
+def _discard_result(future: Future, discard: Callable[[Any], None]) -> None:
+    if future.exception() is None:
+        discard(future.result())
+
+
+def _close_stream(stream: Iterator[str]) -> None:
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+def _should_fall_back(error: Exception) -> bool:
+    return isinstance(
+        error, (TimeoutError, CircuitOpenError, RateLimitTimeout)
+    ) or is_retryable(error)
+
+
+class RoutedLLM(BaseLLM):
+    """Sends each call to a list of model tiers, hedging slow calls.
+
+    A call goes to the first tier. If it has not answered after the tier's
+    p95 latency (`hedge_percentile` of recent calls), a duplicate is sent to
+    the same tier and the first answer wins. Until the tier has enough
+    latency samples it is only hedged after `hedge_after`, if given. If the
+    tier has still not answered after `tier_timeout`, or fails with a
+    transient error, the call moves on to the next (cheaper or faster) tier;
+    the last tier is waited for without a timeout. Streams are hedged on
+    their first chunk, and the losing streams are closed.
+    """
+
+    def __init__(
+        self,
+        tiers: List[BaseLLM],
+        hedge: bool = True,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        hedge_after: Optional[float] = None,
+        hedge_min: float = DEFAULT_HEDGE_MIN_SECONDS,
+        hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+        tier_timeout: Optional[float] = DEFAULT_TIER_TIMEOUT,
+    ):
+        if not tiers:
+            raise ValueError("RoutedLLM needs at least one tier.")
+        self.tiers = tiers
+        self.model_name = getattr(tiers[0], "model_name", type(tiers[0]).__name__)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after
+        self.hedge_min = hedge_min
+        self.tier_timeout = tier_timeout
+        self.budget = HedgeBudget(hedge_budget)
+        self.latencies = [LatencyTracker() for _ in tiers]
+        self.metrics = _metrics.setdefault(self.model_name, RetryMetrics())
+
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        if not self.hedge:
+            return None
+        observed = self.latencies[index].percentile(self.hedge_percentile)
+        return self.hedge_after if observed is None else max(self.hedge_min, observed)
+
+    def _timeout(self, index: int) -> Optional[float]:
+        return self.tier_timeout if index < len(self.tiers) - 1 else None
+
+    def _deadlines(
+        self, index: int, started: float
+    ) -> Tuple[Optional[float], Optional[float]]:
+        delay, timeout = self._hedge_delay(index), self._timeout(index)
+        return (
+            None if delay is None else started + delay,
+            None if timeout is None else started + timeout,
+        )
+
+    def _on_tier_error(self, index: int, error: Exception) -> None:
+        """Re-raises `error` unless the call can move on to the next tier."""
+        if index == len(self.tiers) - 1 or not _should_fall_back(error):
+            raise error
+        self.metrics.record("fallbacks")
+        current = getattr(self.tiers[index], "model_name", index)
+        fallback = getattr(self.tiers[index + 1], "model_name", index + 1)
+        print(f"LLM tier {current} failed ({error}); falling back to {fallback}.")
+
+    # Sync calls run in a thread pool so the caller can stop waiting for them.
+
+    def _submit(self, index: int, call: Callable[[BaseLLM], Any]) -> Future:
+        context = contextvars.copy_context()
+        started = time.monotonic()
+
+        def run():
+            result = context.run(call, self.tiers[index])
+            self.latencies[index].record(time.monotonic() - started)
+            return result
+
+        return _get_executor().submit(run)
+
+    def _run_tier(
+        self,
+        index: int,
+        call: Callable[[BaseLLM], Any],
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """The first answer of tier `index`; `discard` releases the losing answers."""
+        hedge_at, deadline = self._deadlines(index, time.monotonic())
+        first = self._submit(index, call)
+        submitted = [first]
+        pending = {first}
+        winner: Optional[Future] = None
+        error: Optional[Exception] = None
+        try:
+            while pending:
+                wakeups = [t for t in (hedge_at, deadline) if t is not None]
+                timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+                done, pending = wait(
+                    pending, timeout=timeout, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        if future is not first:
+                            self.metrics.record("hedge_wins")
+                        winner = future
+                        return future.result()
+                    error = future.exception()
+                now = time.monotonic()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if pending and self.budget.try_acquire():
+                        self.metrics.record("hedges")
+                        hedge = self._submit(index, call)
+                        submitted.append(hedge)
+                        pending.add(hedge)
+                if deadline is not None and now >= deadline and pending:
+                    # Abandoned calls finish in the background; their answers
+                    # are dropped.
+                    self.metrics.record("timeouts")
+                    raise TimeoutError(f"No answer within {self.tier_timeout}s")
+            raise error
+        finally:
+            if discard is not None:
+                for future in submitted:
+                    if future is not winner:
+                        future.add_done_callback(lambda f: _discard_result(f, discard))
+
+    def _route(
+        self,
+        call: Callable[[BaseLLM], Any],
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        self.budget.record_call()
+        for index in range(len(self.tiers)):
+            try:
+                return self._run_tier(index, call, discard)
+            except Exception as e:
+                self._on_tier_error(index, e)
+
+    def generate_content(self, prompt: str) -> str:
+        return self._route(lambda llm: llm.generate_content(prompt))
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        def first_chunk(llm: BaseLLM) -> Tuple[Optional[str], Iterator[str]]:
+            stream = iter(llm.stream_content(prompt))
+            return next(stream, None), stream
+
+        first, stream = self._route(
+            first_chunk, discard=lambda answer: _close_stream(answer[1])
+        )
+        try:
+            if first is not None:
+                yield first
+                yield from stream
+        finally:
+            _close_stream(stream)
+
+    # Async calls are tasks, so losing hedges and timed-out calls are cancelled.
+
+    async def _atimed(self, index: int, prompt: str) -> str:
+        started = time.monotonic()
+        result = await self.tiers[index].agenerate_content(prompt)
+        self.latencies[index].record(time.monotonic() - started)
+        return result
+
+    async def _arun_tier(self, index: int, prompt: str) -> str:
+        hedge_at, deadline = self._deadlines(index, time.monotonic())
+        first = asyncio.ensure_future(self._atimed(index, prompt))
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wakeups = [t for t in (hedge_at, deadline) if t is not None]
+                timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.metrics.record("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                now = time.monotonic()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if pending and self.budget.try_acquire():
+                        self.metrics.record("hedges")
+                        pending.add(asyncio.ensure_future(self._atimed(index, prompt)))
+                if deadline is not None and now >= deadline and pending:
+                    self.metrics.record("timeouts")
+                    raise TimeoutError(f"No answer within {self.tier_timeout}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def agenerate_content(self, prompt: str) -> str:
+        self.budget.record_call()
+        for index in range(len(self.tiers)):
+            try:
+                return await self._arun_tier(index, prompt)
+            except Exception as e:
+                self._on_tier_error(index, e)
+
+
+def _env_json(name: str) -> Dict[str, Any]:
+    try:
+        value = json.loads(os.getenv(name) or "{}")
+    except json.JSONDecodeError as e:
+        print(f"Ignoring invalid {name}: {e}")
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def task_models(task: TaskType) -> List[Optional[str]]:
+    """Model tiers for `task`: the routed model, then its fallbacks.
+
+    LLM_MODEL_ROUTES maps task types to models and LLM_FALLBACK_MODELS to
+    lists of fallback models. None stands for the client's default model.
+    """
+    primary = _env_json("LLM_MODEL_ROUTES").get(task.value)
+    fallbacks = _env_json("LLM_FALLBACK_MODELS").get(task.value) or []
+    if isinstance(fallbacks, str):
+        fallbacks = [fallbacks]
+    return [primary] + [model for model in fallbacks if model and model != primary]
+
+
+def with_routing(tiers: List[BaseLLM], task: TaskType) -> BaseLLM:
+    """Wraps the tiers of `task` in a RoutedLLM configured from the environment.
+
+    Hedging is off unless the task type is listed in LLM_HEDGE_TASKS; a
+    hedged task is wrapped even with a single tier, since hedges go to the
+    same tier. An unhedged single tier is returned unchanged.
+    """
+    hedged_tasks = os.getenv("LLM_HEDGE_TASKS", "")
+    hedge = task.value in {name.strip() for name in hedged_tasks.split(",")}
+    if len(tiers) == 1 and not hedge:
+        return tiers[0]
+    hedge_after = os.getenv("LLM_HEDGE_AFTER_SECONDS")
+    return RoutedLLM(
+        tiers,
+        hedge=hedge,
+        hedge_percentile=float(
+            os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)
+        ),
+        hedge_after=float(hedge_after) if hedge_after else None,
+        hedge_min=float(os.getenv("LLM_HEDGE_MIN_SECONDS", DEFAULT_HEDGE_MIN_SECONDS)),
+        hedge_budget=float(os.getenv("LLM_HEDGE_BUDGET", DEFAULT_HEDGE_BUDGET)),
+        tier_timeout=float(os.getenv("LLM_TIER_TIMEOUT_SECONDS", DEFAULT_TIER_TIMEOUT)),
+    )
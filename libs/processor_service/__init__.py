@@ -1 +1,20 @@
-from .service import ProcessorService
+from .concurrency import gather_bounded, run_bounded
+from .service import (
+    ANALYSIS_MODE_BATCH,
+    ANALYSIS_MODE_FUSED,
+    ANALYSIS_MODE_MICROBATCH,
+    ANALYSIS_MODE_SPLIT,
+    ProcessorService,
+    get_analysis_mode,
+)
+
+__all__ = [
+    "ANALYSIS_MODE_BATCH",
+    "ANALYSIS_MODE_FUSED",
+    "ANALYSIS_MODE_MICROBATCH",
+    "ANALYSIS_MODE_SPLIT",
+    "ProcessorService",
+    "gather_bounded",
+    "get_analysis_mode",
+    "run_bounded",
+]
@@ -0,0 +1,34 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List, Sequence
+
+# Upper bound on LLM requests one worker keeps in flight at once.
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+
+async def gather_bounded(
+    factories: Sequence[Callable[[], Awaitable[Any]]],
+    limit: int = DEFAULT_MAX_CONCURRENCY,
+) -> List[Any]:
+    """Awaits every factory's coroutine with at most `limit` running at once.
+
+    Results come back in the order of `factories`. A failing call does not
+    cancel the others; its exception is returned in its slot instead.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(
+        *(run(factory) for factory in factories), return_exceptions=True
+    )
+
+
+def run_bounded(
+    factories: Sequence[Callable[[], Awaitable[Any]]],
+    limit: int = DEFAULT_MAX_CONCURRENCY,
+) -> List[Any]:
+    """Blocking entry point for gather_bounded, for use from RQ tasks."""
+    return asyncio.run(gather_bounded(factories, limit))
@@ -1,5 +1,10 @@
+from libs.llm_service.prompting import PromptTemplate
 
-COGNITIVE_DISTORTION_PROMPT = """
+# Templates put their fixed instructions first and the per-call data last,
+# so every prompt built from one shares the longest possible static prefix.
+
+
+COGNITIVE_DISTORTION_PROMPT = PromptTemplate("""
 You are a mental health assistant expert in Cognitive Behavioral Therapy (CBT).
 Analyze the following thought for Cognitive Distortions based on David Burns' definitions.
 Identify any distortions present. If none are found, return an empty list.
@@ -20,9 +25,9 @@ Known distortions:
 Thought: "{thought_content}"
 
 Output format: ["Distortion 1", "Distortion 2"]
-"""
+""")
 
-SENTIMENT_ANALYSIS_PROMPT = """
+SENTIMENT_ANALYSIS_PROMPT = PromptTemplate("""
 You are an expert in emotion analysis.
 Analyze the following thought and identify the primary emotions associated with it.
 Return the result strictly as a valid JSON list of strings. Do not include any other text or explanation.
@@ -32,9 +37,9 @@ Examples of emotions: Happy, Sad, Angry, Anxious, Fearful, Disgusted, Surprised,
 Thought: "{thought_content}"
 
 Output format: ["Emotion 1", "Emotion 2"]
-"""
+""")
 
-TOPIC_ANALYSIS_PROMPT = """
+TOPIC_ANALYSIS_PROMPT = PromptTemplate("""
 You are an expert content analyzer.
 Analyze the following thought and identify up to 3 main topics discussed.
 Return the result strictly as a valid JSON list of strings. Do not include any other text or explanation.
@@ -42,9 +47,112 @@ Return the result strictly as a valid JSON list of strings. Do not include any o
 Thought: "{thought_content}"
 
 Output format: ["Topic 1", "Topic 2", "Topic 3"]
-"""
+""")
+
+THOUGHT_ANALYSIS_PROMPT = PromptTemplate("""
+You are a mental health assistant expert in Cognitive Behavioral Therapy (CBT),
+emotion analysis and cognitive psychology.
+Analyze the following thought along all of the dimensions below in a single pass.
+
+1. "distortions": Cognitive Distortions based on David Burns' definitions.
+   Use an empty list if none are found.
+   Known distortions: All-or-nothing thinking, Overgeneralization, Mental filter,
+   Disqualifying the positive, Jumping to conclusions (Mind reading, Fortune telling),
+   Magnification (Catastrophizing) or Minimization, Emotional reasoning,
+   Should statements, Labeling and mislabeling, Personalization.
+2. "emotions": The primary emotions associated with the thought.
+   Examples: Happy, Sad, Angry, Anxious, Fearful, Disgusted, Surprised, Neutral,
+   Hopeful, Frustrated.
+3. "action_orientation": "Action-oriented" if the thought focuses on planning,
+   problem-solving or taking steps forward, "Ruminative" if it dwells repetitively
+   on negative feelings, past events or abstract problems without a solution.
+4. "thought_type": "Automatic" if the thought is spontaneous and habitual,
+   "Deliberate" if it is conscious, intentional and effortful.
+5. "topics": Up to 3 main topics discussed.
+
+Return the result strictly as a valid JSON object with exactly these keys.
+Do not include any other text or explanation.
+
+Thought: "{thought_content}"
+
+Output format: {{"distortions": ["Distortion 1"], "emotions": ["Emotion 1"],
+"action_orientation": "Action-oriented", "thought_type": "Automatic",
+"topics": ["Topic 1"]}}
+""")
+
+BATCH_CLASSIFICATION_PROMPT = PromptTemplate("""
+{instructions}
+
+You are given several thoughts as a JSON list of objects with an "id" and a
+"thought". Analyze each thought independently.
+Return the result strictly as a valid JSON object that maps every id to its result.
+Include every id exactly once. Do not include any other text or explanation.
 
-THOUGHT_GENERATION_PROMPT = """
+Output format: {{"<id>": {output_example}}}
+
+Thoughts:
+{thoughts_json}
+""")
+
+# Instructions and per-thought result format for each batch analysis dimension
+BATCH_CLASSIFICATION_TASKS = {
+    "distortions": (
+        "You are a mental health assistant expert in "
+        "Cognitive Behavioral Therapy (CBT).\n"
+        "Identify the Cognitive Distortions (David Burns' definitions) present in "
+        "each thought, or an empty list if none are found.\n"
+        "Known distortions: All-or-nothing thinking, Overgeneralization, "
+        "Mental filter, Disqualifying the positive, "
+        "Jumping to conclusions (Mind reading, Fortune telling), "
+        "Magnification (Catastrophizing) or Minimization, "
+        "Emotional reasoning, Should statements, Labeling and mislabeling, "
+        "Personalization.",
+        '["Distortion 1", "Distortion 2"]',
+    ),
+    "emotions": (
+        "You are an expert in emotion analysis.\n"
+        "Identify the primary emotions associated with each thought.\n"
+        "Examples of emotions: Happy, Sad, Angry, Anxious, Fearful, Disgusted, "
+        "Surprised, Neutral, Hopeful, Frustrated.",
+        '["Emotion 1", "Emotion 2"]',
+    ),
+    "topics": (
+        "You are an expert content analyzer.\n"
+        "Identify up to 3 main topics discussed in each thought.",
+        '["Topic 1", "Topic 2", "Topic 3"]',
+    ),
+    "action_orientation": (
+        "You are a behavioral psychologist.\n"
+        'Classify each thought as either "Action-oriented" '
+        "(planning, problem-solving, taking steps forward) "
+        'or "Ruminative" (repetitive dwelling on negative feelings, past events, '
+        "or abstract problems without a solution).",
+        '"Action-oriented"',
+    ),
+    "thought_type": (
+        "You are a cognitive psychologist.\n"
+        'Classify each thought as either "Automatic" '
+        "(spontaneous, habitual, without conscious effort) "
+        'or "Deliberate" (conscious, intentional, effortful).',
+        '"Automatic"',
+    ),
+    "analysis": (
+        "You are a mental health assistant expert in Cognitive Behavioral Therapy "
+        "(CBT), emotion analysis and cognitive psychology.\n"
+        "For each thought, give:\n"
+        '- "distortions": Cognitive Distortions (David Burns\' definitions) present, '
+        "or an empty list.\n"
+        '- "emotions": the primary emotions.\n'
+        '- "action_orientation": "Action-oriented" or "Ruminative".\n'
+        '- "thought_type": "Automatic" or "Deliberate".\n'
+        '- "topics": up to 3 main topics.',
+        '{"distortions": ["Distortion 1"], "emotions": ["Emotion 1"], '
+        '"action_orientation": "Action-oriented", "thought_type": "Automatic", '
+        '"topics": ["Topic 1"]}',
+    ),
+}
+
+THOUGHT_GENERATION_PROMPT = PromptTemplate("""
 You are an AI assistant helping to extract thoughts from a blog post.
 Analyze the following text content from a blog post and extract distinct thoughts expressed by the author.
 A "thought" is a specific idea, opinion, or reflection.
@@ -59,20 +167,14 @@ Blog Content:
 "{blog_content}"
 
 Output format: ["Thought 1 content...", "Thought 2 content..."]
-"""
+""")
 
-ESSAY_GENERATION_PROMPT = """
+ESSAY_GENERATION_PROMPT = PromptTemplate("""
 You are a creative writer.
 Complete the following essay based on the starting text provided.
 Adopt the persona described below.
 Incorporating the provided emotions and tags into the tone and content of the essay.
 
-Persona:
-{persona_details}
-
-Top Emotions: {emotions}
-Top Tags: {tags}
-
 Constraints:
 - Continue the essay from the starting text.
 - Maximum 500 words.
@@ -81,11 +183,17 @@ Constraints:
 - Do not include the mentioned emotions and tags in the written text.
 - Return only the completion text. Do not repeat the starting text unless necessary for flow, but preferably just continue.
 
+Persona:
+{persona_details}
+
+Top Emotions: {emotions}
+Top Tags: {tags}
+
 Starting Text:
 "{starting_text}"
-"""
+""")
 
-ACTION_ORIENTATION_PROMPT = """
+ACTION_ORIENTATION_PROMPT = PromptTemplate("""
 You are a behavioral psychologist.
 Analyze the following thought and classify it as either "Action-oriented" or "Ruminative".
 "Action-oriented" thoughts focus on planning, problem-solving, or taking steps forward.
@@ -96,9 +204,9 @@ Return the result strictly as a single string: "Action-oriented" or "Ruminative"
 Thought: "{thought_content}"
 
 Output:
-"""
+""")
 
-THOUGHT_TYPE_PROMPT = """
+THOUGHT_TYPE_PROMPT = PromptTemplate("""
 You are a cognitive psychologist.
 Analyze the following thought and classify it as either "Automatic" or "Deliberate".
 "Automatic" thoughts are spontaneous, often habitual, and pop up without conscious effort.
@@ -109,20 +217,14 @@ Return the result strictly as a single string: "Automatic" or "Deliberate". Do n
 Thought: "{thought_content}"
 
 Output:
-"""
+""")
 
-ESSAY_DRAFT_AND_TAG_PROMPT = """
+ESSAY_DRAFT_AND_TAG_PROMPT = PromptTemplate("""
 You are a creative writer.
 Complete the following essay based on the starting text provided.
 Adopt the persona described below.
 Incorporating the provided thought type and action orientation into the tone and content of the essay.
 
-Persona:
-{persona_details}
-
-Thought Type: {thought_type}
-Action Orientation: {action_orientation}
-
 Constraints:
 - Continue the essay from the starting text.
 - Maximum 500 words.
@@ -132,62 +234,59 @@ Constraints:
 - "essay": The completed essay text. Ensure all newlines are escaped as \\n. Do not use literal newlines within the string.
 - "tags": A list of 3-5 keywords or themes representing the content of the essay.
 
+Output format: {{"essay": "...", "tags": ["tag1", "tag2", "tag3"]}}
+
+Persona:
+{persona_details}
+
+Thought Type: {thought_type}
+Action Orientation: {action_orientation}
+
 Starting Text:
 "{starting_text}"
+""")
 
-Output format:
-{{
-    "essay": "...",
-    "tags": ["tag1", "tag2", "tag3"]
-}}
-"""
-
-ESSAY_MODIFICATION_PROMPT = """
+ESSAY_MODIFICATION_PROMPT = PromptTemplate("""
 You are a creative editor.
 Refine the following essay by infusing it with specific emotions.
 The goal is to subtlety shift the tone of the essay to reflect these emotions without changing the core narrative or length significantly.
 
-Emotions to infuse: {emotions}
-
-Essay:
-"{essay_content}"
-
 Constraints:
 - Return only the modified essay text.
 - Do not add any preamble or explanation.
 - Keep the length approximately the same.
-"""
 
-PROFILE_EMOTION_EXTRACTION_PROMPT = """
+Emotions to infuse: {emotions}
+
+Essay:
+"{essay_content}"
+""")
+
+PROFILE_EMOTION_EXTRACTION_PROMPT = PromptTemplate("""
 You are an expert psychological profiler.
 Analyze the following "Starting Text" of an essay.
 Compare it against the provided "Persona Profile" (which contains topics and associated emotions).
 Identify which topic in the profile is most relevant to the starting text.
 Extract the emotions associated with that topic.
+Return the result strictly as a valid JSON list of strings containing the emotions.
+If no specific topic matches well, return the emotions from the most generic or
+first topic in the profile.
+
+Output format: ["Emotion1", "Emotion2"]
 
 Persona Profile:
 {profile_json}
 
 Starting Text:
 "{starting_text}"
+""")
 
-Return the result strictly as a valid JSON list of strings containing the emotions.
-If no specific topic matches well, return the emotions from the most generic or first topic in the profile.
-
-Output format: ["Emotion1", "Emotion2"]
-"""
-
-ESSAY_COMPLETION_FROM_PROFILE_PROMPT = """
+ESSAY_COMPLETION_FROM_PROFILE_PROMPT = PromptTemplate("""
 You are a creative writer.
 Complete the following essay based on the starting text provided.
 Adopt the persona described below.
 The essay should reflect the emotions and topics found in the persona's profile that are relevant to the text.
 
-Persona:
-{persona_details}
-
-Relevant Emotions: {emotions}
-
 Constraints:
 - Continue the essay from the starting text.
 - Maximum 500 words.
@@ -195,32 +294,22 @@ Constraints:
 - Seamlessly integrate the emotions into the narrative tone.
 - Return only the completion text. Do not repeat the starting text unless necessary for flow.
 
+Persona:
+{persona_details}
+
+Relevant Emotions: {emotions}
+
 Starting Text:
 "{starting_text}"
-"""
+""")
 
-CONVERSATION_MESSAGE_GENERATION_PROMPT = """
+CONVERSATION_MESSAGE_GENERATION_PROMPT = PromptTemplate("""
 You are roleplaying as a specific persona in a social conversation among people who know each other.
 Your goal is to contribute naturally, staying fully in character.
 
-Persona Details:
-Name: {persona_name}
-Age: {persona_age}
-Gender: {persona_gender}
-Profile: {persona_profile}
-
-Other Personas in Conversation:
-{other_personas_info}
-
-Conversation Context:
-{conversation_context}
-
-Recent Messages:
-{recent_messages}
-
 ## Age-Based Communication Style (CRITICAL — follow strictly)
 
-Based on the persona's age of {persona_age}, adjust the messaging style:
+Based on the persona's age (see Persona Details below), adjust the messaging style:
 
 - **Teens (13-19)**: Send 2-3 short, rapid-fire messages. Use slang, abbreviations (lol, ngl, idk, fr, lowkey), emojis, and incomplete sentences. Split thoughts across multiple messages. Keep each message under 15 words. Example: "wait what" / "noo thats crazy lmaooo" / "ok but fr tho 😭"
 - **Young Adults (20-35)**: Send 1-3 messages. Mix casual tone with more complete thoughts. Occasional slang is fine. Each message 10-25 words. May split a thought across 2 messages or add an afterthought.
@@ -228,25 +317,36 @@ Based on the persona's age of {persona_age}, adjust the messaging style:
 - **Older Adults (56+)**: Send 1 message (rarely 2). Use proper grammar, full sentences, and a warm or considered tone. Message can be 20-40 words.
 
 ## Constraints
-- Respond as {persona_name} would at age {persona_age}.
+- Respond as the persona would at their age.
 - Messages in the sequence MUST be related and flow naturally (e.g., continuing a thought, adding a reaction, clarifying).
 - Reflect the persona's characteristics and emotions from their profile.
 - Do NOT include the persona name at the start of any message.
 - Return the result strictly as valid JSON. No other text.
 
-Output format:
-{{
-  "messages": [
-    {{"content": "first message"}},
-    {{"content": "optional follow-up message"}}
-  ]
-}}
-"""
+Output format: {{"messages": [{{"content": "first message"}},
+{{"content": "optional follow-up message"}}]}}
+
+Persona Details:
+Name: {persona_name}
+Age: {persona_age}
+Gender: {persona_gender}
+Profile: {persona_profile}
+
+Other Personas in Conversation:
+{other_personas_info}
+
+Conversation Context:
+{conversation_context}
+
+Recent Messages:
+{recent_messages}
+""")
 
-THOUGHT_GENERATION_FROM_DIALOGUE_PROMPT = """
+THOUGHT_GENERATION_FROM_DIALOGUE_PROMPT = PromptTemplate("""
 You are an AI psychologist.
 Analyze the following snippets of dialogue spoken by a specific movie character.
-Extract exactly {count} distinct inner thoughts or reflections that this character might have based on these dialogues.
+Extract distinct inner thoughts or reflections that this character might have based
+on these dialogues.
 A "thought" is a specific idea, opinion, or reflection reflecting their personality.
 
 Constraints:
@@ -254,37 +354,38 @@ Constraints:
 - Make inferences about their worldview, fears, or desires.
 - Return the result strictly as a valid JSON list of strings. Do not include any other text or explanation.
 
+Output format: ["Thought 1...", "Thought 2...", "..."]
+
+Extract exactly {count} thoughts.
+
 Character Dialogues:
 {dialogues_text}
+""")
 
-Output format: ["Thought 1...", "Thought 2...", "..."]
-"""
-
-PERSONA_SYNTHESIS_FROM_THOUGHTS_PROMPT = """
+PERSONA_SYNTHESIS_FROM_THOUGHTS_PROMPT = PromptTemplate("""
 You are an expert psychological profiler and character creator.
 Based on the following collection of thoughts generated for a movie character, synthesize a complete, entirely new Persona profile.
 You must auto-fill or creatively infer missing information such as a suitable name (can be a new creative name), age, gender, and deep psychological profile.
 The persona should feel cohesive and derived from the themes, tone, and worldview present in the thoughts.
 
-Thoughts:
-{thoughts_list}
-
 Constraints:
 - Return the result strictly as a valid JSON object.
 - The age should be an integer.
 - The profile can contain keys like "background", "core_beliefs", "fears", "desires".
 
-Output format:
-{{
-  "name": "Jane Doe",
-  "age": 30,
-  "gender": "Female",
-  "profile": {{
-    "background": "...",
-    "core_beliefs": "...",
-    "fears": "...",
-    "desires": "..."
-  }}
-}}
-"""
+Output format: {{"name": "Jane Doe", "age": 30, "gender": "Female",
+"profile": {{"background": "...", "core_beliefs": "...", "fears": "...",
+"desires": "..."}}}}
+
+Thoughts:
+{thoughts_list}
+""")
+
 
+# Batch prompt of each task, with its instructions already part of the static prefix
+BATCH_CLASSIFICATION_PROMPTS = {
+    task: BATCH_CLASSIFICATION_PROMPT.partial(
+        instructions=instructions, output_example=output_example
+    )
+    for task, (instructions, output_example) in BATCH_CLASSIFICATION_TASKS.items()
+}
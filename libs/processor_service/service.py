@@ -1,12 +1,27 @@
 import ast
+import asyncio
 import json
+import os
 import re
-from typing import Any, Dict, List
-
-from libs.llm_service import LLMFactory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from libs.llm_service import (
+    BaseLLM,
+    LLMFactory,
+    Priority,
+    TaskType,
+    compact_json,
+    llm_operation,
+    llm_operation_scope,
+    task_models,
+    with_response_cache,
+    with_routing,
+)
 
 from .prompts import (
     ACTION_ORIENTATION_PROMPT,
+    BATCH_CLASSIFICATION_PROMPTS,
+    BATCH_CLASSIFICATION_TASKS,
     COGNITIVE_DISTORTION_PROMPT,
     CONVERSATION_MESSAGE_GENERATION_PROMPT,
     ESSAY_COMPLETION_FROM_PROFILE_PROMPT,
@@ -15,16 +30,90 @@ from .prompts import (
     PERSONA_SYNTHESIS_FROM_THOUGHTS_PROMPT,
     PROFILE_EMOTION_EXTRACTION_PROMPT,
     SENTIMENT_ANALYSIS_PROMPT,
+    THOUGHT_ANALYSIS_PROMPT,
     THOUGHT_GENERATION_FROM_DIALOGUE_PROMPT,
     THOUGHT_GENERATION_PROMPT,
     THOUGHT_TYPE_PROMPT,
     TOPIC_ANALYSIS_PROMPT,
 )
 
+# "split" runs one prompt (and one RQ job) per analysis dimension, "fused"
+# asks for all five dimensions in a single structured response, and "batch"
+# additionally packs many thoughts into each fused prompt for bulk imports.
+# "microbatch" keeps one prompt per dimension but queues bare thought ids that
+# micro-batching workers drain in groups, many thoughts per prompt.
+ANALYSIS_MODE_SPLIT = "split"
+ANALYSIS_MODE_FUSED = "fused"
+ANALYSIS_MODE_BATCH = "batch"
+ANALYSIS_MODE_MICROBATCH = "microbatch"
+ANALYSIS_MODES = (
+    ANALYSIS_MODE_SPLIT,
+    ANALYSIS_MODE_FUSED,
+    ANALYSIS_MODE_BATCH,
+    ANALYSIS_MODE_MICROBATCH,
+)
+
+# Batch prompts are packed up to this many estimated tokens (prompt plus
+# expected answer) and never hold more than MAX_BATCH_SIZE thoughts.
+BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "8000"))
+MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "50"))
+# Rough characters-per-token ratio, close enough to size batches without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def get_analysis_mode() -> str:
+    mode = os.getenv("THOUGHT_ANALYSIS_MODE", ANALYSIS_MODE_SPLIT).lower()
+    return mode if mode in ANALYSIS_MODES else ANALYSIS_MODE_SPLIT
+
 
 class ProcessorService:
+    ACTION_ORIENTATIONS = ("Action-oriented", "Ruminative")
+    THOUGHT_TYPES = ("Automatic", "Deliberate")
+    # Combined-analysis field -> per-dimension method asked when the field is invalid
+    ANALYSIS_FALLBACKS = {
+        "distortions": "analyze_cognitive_distortions",
+        "emotions": "analyze_sentiment",
+        "action_orientation": "analyze_action_orientation",
+        "thought_type": "analyze_thought_type",
+        "topics": "analyze_topics",
+    }
+    # Batch task -> single-thought method asked when a batch entry is invalid
+    BATCH_FALLBACKS = {**ANALYSIS_FALLBACKS, "analysis": "analyze_thought"}
+
     def __init__(self):
-        self.llm = LLMFactory.get_llm()
+        # Essay, conversation and other generation calls get quota ahead of
+        # background analysis when the shared rate limit runs short.
+        self.llm = self._routed_llm(TaskType.GENERATION, Priority.INTERACTIVE)
+        # Classification prompts have one right answer, so repeats of the same
+        # thought can be served from the response cache (before any quota is
+        # spent). Generation prompts always go to the model.
+        self.analysis_llm = with_response_cache(
+            self._routed_llm(TaskType.CLASSIFICATION, Priority.BACKGROUND),
+            validate=self._is_valid_classification,
+        )
+
+    @staticmethod
+    def _routed_llm(task: TaskType, priority: Priority) -> BaseLLM:
+        """The model tiers configured for `task`, each with its own rate limit."""
+        tiers = [
+            LLMFactory.get_llm(
+                priority=priority, **({"model_name": model} if model else {})
+            )
+            for model in task_models(task)
+        ]
+        return with_routing(tiers, task)
+
+    def _generate(
+        self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Generates a response, streaming it to `on_chunk` as it arrives if given."""
+        if on_chunk is None:
+            return self.llm.generate_content(prompt)
+        chunks = []
+        for chunk in self.llm.stream_content(prompt):
+            chunks.append(chunk)
+            on_chunk(chunk)
+        return "".join(chunks)
 
     def _parse_list_output(self, output: str) -> List[str]:
         """Parses the LLM output which is expected to be a string representation of a list."""
@@ -57,29 +146,37 @@ class ProcessorService:
             print(f"Error parsing LLM output: {output}. Error: {e}")
             return []
 
+    @llm_operation
     def analyze_cognitive_distortions(self, thought_content: str) -> List[str]:
         prompt = COGNITIVE_DISTORTION_PROMPT.format(thought_content=thought_content)
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def analyze_sentiment(self, thought_content: str) -> List[str]:
         prompt = SENTIMENT_ANALYSIS_PROMPT.format(thought_content=thought_content)
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def analyze_topics(self, thought_content: str) -> List[str]:
         prompt = TOPIC_ANALYSIS_PROMPT.format(thought_content=thought_content)
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def generate_thoughts_from_text(self, text: str) -> List[str]:
         prompt = THOUGHT_GENERATION_PROMPT.format(blog_content=text)
         result = self.llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def analyze_action_orientation(self, thought_content: str) -> str:
         prompt = ACTION_ORIENTATION_PROMPT.format(thought_content=thought_content)
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
+        return self._parse_action_orientation(result)
+
+    def _parse_action_orientation(self, result: str) -> str:
         cleaned = result.strip().replace('"', "").replace("'", "")
         # Basic validation
         if "Action-oriented" in cleaned:
@@ -88,9 +185,13 @@ class ProcessorService:
             return "Ruminative"
         return cleaned
 
+    @llm_operation
     def analyze_thought_type(self, thought_content: str) -> str:
         prompt = THOUGHT_TYPE_PROMPT.format(thought_content=thought_content)
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
+        return self._parse_thought_type(result)
+
+    def _parse_thought_type(self, result: str) -> str:
         cleaned = result.strip().replace('"', "").replace("'", "")
         if "Automatic" in cleaned:
             return "Automatic"
@@ -98,6 +199,264 @@ class ProcessorService:
             return "Deliberate"
         return cleaned
 
+    def _parse_json_object(self, output: str) -> Optional[Dict[str, Any]]:
+        cleaned = output.strip()
+        match = re.search(r"```(?:\w+)?\s*(.*?)```", cleaned, re.DOTALL)
+        if match:
+            cleaned = match.group(1).strip()
+        try:
+            parsed = json.loads(cleaned)
+        except json.JSONDecodeError:
+            print(f"Error parsing JSON object from LLM output: {output}")
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    def _validate_field(self, key: str, value: Any) -> Optional[Any]:
+        """`value` cleaned up if it is a valid result for analysis field `key`."""
+        if key in ("distortions", "emotions", "topics"):
+            if isinstance(value, list) and all(isinstance(item, str) for item in value):
+                return value[:3] if key == "topics" else value
+            return None
+        allowed = {
+            "action_orientation": self.ACTION_ORIENTATIONS,
+            "thought_type": self.THOUGHT_TYPES,
+        }[key]
+        if isinstance(value, str) and value.strip() in allowed:
+            return value.strip()
+        return None
+
+    def _validate_thought_analysis(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        analysis: Dict[str, Any] = {}
+        for key in self.ANALYSIS_FALLBACKS:
+            value = self._validate_field(key, parsed.get(key))
+            if value is not None:
+                analysis[key] = value
+        return analysis
+
+    def _is_valid_label_or_list(self, value: Any) -> bool:
+        if isinstance(value, list):
+            return all(isinstance(item, str) for item in value)
+        return (
+            isinstance(value, str)
+            and value.strip() in self.ACTION_ORIENTATIONS + self.THOUGHT_TYPES
+        )
+
+    def _is_valid_classification(self, output: str) -> bool:
+        """Whether a classification response parses into a complete, valid result.
+
+        Only such responses are cached: a list of labels, one known label, a
+        combined analysis with every field valid, or a batch answer whose
+        entries all are.
+        """
+        cleaned = output.strip()
+        match = re.search(r"```(?:\w+)?\s*(.*?)```", cleaned, re.DOTALL)
+        if match:
+            cleaned = match.group(1).strip()
+        if self._is_valid_label_or_list(cleaned.strip("\"'")):
+            return True
+        try:
+            parsed = json.loads(cleaned)
+        except json.JSONDecodeError:
+            try:
+                parsed = ast.literal_eval(cleaned)
+            except (ValueError, SyntaxError):
+                return False
+        if not isinstance(parsed, dict):
+            return self._is_valid_label_or_list(parsed)
+        if parsed and set(parsed) <= set(self.ANALYSIS_FALLBACKS):
+            return len(self._validate_thought_analysis(parsed)) == len(
+                self.ANALYSIS_FALLBACKS
+            )
+        return bool(parsed) and all(
+            len(self._validate_thought_analysis(value)) == len(self.ANALYSIS_FALLBACKS)
+            if isinstance(value, dict)
+            else self._is_valid_label_or_list(value)
+            for value in parsed.values()
+        )
+
+    def _parse_thought_analysis(self, output: str) -> Dict[str, Any]:
+        """Valid fields of a combined analysis response; the others are left out."""
+        parsed = self._parse_json_object(output)
+        return self._validate_thought_analysis(parsed) if parsed else {}
+
+    def _fill_missing_analysis(
+        self, thought_content: str, analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        for key, method in self.ANALYSIS_FALLBACKS.items():
+            if key not in analysis:
+                print(f"Combined analysis returned no valid {key}; asking separately.")
+                analysis[key] = getattr(self, method)(thought_content)
+        return analysis
+
+    @llm_operation
+    def analyze_thought(self, thought_content: str) -> Dict[str, Any]:
+        """All five analysis dimensions from one LLM call.
+
+        Any field missing from or invalid in the combined response is asked
+        for with its dedicated prompt, so callers always get every key.
+        """
+        prompt = THOUGHT_ANALYSIS_PROMPT.format(thought_content=thought_content)
+        result = self.analysis_llm.generate_content(prompt)
+        return self._fill_missing_analysis(
+            thought_content, self._parse_thought_analysis(result)
+        )
+
+    def _estimate_tokens(self, text: str) -> int:
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def _plan_batches(
+        self, task: str, items: List[Tuple[str, str]]
+    ) -> List[List[Tuple[str, str]]]:
+        """Splits (id, thought) pairs into batches that fit the token budget."""
+        _, output_example = BATCH_CLASSIFICATION_TASKS[task]
+        overhead = self._estimate_tokens(BATCH_CLASSIFICATION_PROMPTS[task].template)
+        answer_tokens = self._estimate_tokens(output_example)
+
+        batches: List[List[Tuple[str, str]]] = []
+        current: List[Tuple[str, str]] = []
+        used = overhead
+        for item_id, content in items:
+            cost = (
+                self._estimate_tokens(compact_json({"id": item_id, "thought": content}))
+                + answer_tokens
+            )
+            if current and (
+                used + cost > BATCH_TOKEN_BUDGET or len(current) >= MAX_BATCH_SIZE
+            ):
+                batches.append(current)
+                current = []
+                used = overhead
+            current.append((item_id, content))
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def classify_batch(self, task: str, thoughts: Dict[Any, str]) -> Dict[Any, Any]:
+        """Results of analysis `task` for many thoughts from as few prompts as possible.
+
+        `task` is a key of BATCH_CLASSIFICATION_TASKS. The keys of `thoughts`
+        are sent as stable ids and the model answers with a JSON object keyed
+        by them; missing or malformed entries fall back to the single-thought
+        method.
+        """
+        fallback = getattr(self, self.BATCH_FALLBACKS[task])
+        keys = {str(key): key for key in thoughts}
+        results: Dict[Any, Any] = {}
+        for batch in self._plan_batches(
+            task, [(str(k), c) for k, c in thoughts.items()]
+        ):
+            prompt = BATCH_CLASSIFICATION_PROMPTS[task].format(
+                thoughts_json=compact_json(
+                    [{"id": item_id, "thought": content} for item_id, content in batch]
+                ),
+            )
+            with llm_operation_scope(f"classify_batch.{task}"):
+                keyed = (
+                    self._parse_json_object(self.analysis_llm.generate_content(prompt))
+                    or {}
+                )
+            for item_id, content in batch:
+                value = keyed.get(item_id)
+                if task == "analysis":
+                    value = (
+                        self._validate_thought_analysis(value)
+                        if isinstance(value, dict)
+                        else None
+                    )
+                else:
+                    value = self._validate_field(task, value)
+                if value is None:
+                    print(
+                        f"Batch {task} returned no valid result for id {item_id}; "
+                        "asking separately."
+                    )
+                    value = fallback(content)
+                elif task == "analysis":
+                    value = self._fill_missing_analysis(content, value)
+                results[keys[item_id]] = value
+        return results
+
+    def analyze_cognitive_distortions_batch(
+        self, thoughts: Dict[Any, str]
+    ) -> Dict[Any, List[str]]:
+        return self.classify_batch("distortions", thoughts)
+
+    def analyze_sentiment_batch(self, thoughts: Dict[Any, str]) -> Dict[Any, List[str]]:
+        return self.classify_batch("emotions", thoughts)
+
+    def analyze_topics_batch(self, thoughts: Dict[Any, str]) -> Dict[Any, List[str]]:
+        return self.classify_batch("topics", thoughts)
+
+    def analyze_action_orientation_batch(
+        self, thoughts: Dict[Any, str]
+    ) -> Dict[Any, str]:
+        return self.classify_batch("action_orientation", thoughts)
+
+    def analyze_thought_type_batch(self, thoughts: Dict[Any, str]) -> Dict[Any, str]:
+        return self.classify_batch("thought_type", thoughts)
+
+    def analyze_thoughts_batch(
+        self, thoughts: Dict[Any, str]
+    ) -> Dict[Any, Dict[str, Any]]:
+        """All five analysis dimensions for many thoughts, packed into few prompts."""
+        return self.classify_batch("analysis", thoughts)
+
+    # Async variants of the analysis methods. They share prompts and parsing
+    # with the blocking versions but keep the event loop free while waiting on
+    # the model, so one worker can have many requests in flight.
+
+    @llm_operation
+    async def aanalyze_cognitive_distortions(self, thought_content: str) -> List[str]:
+        prompt = COGNITIVE_DISTORTION_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        return self._parse_list_output(result)
+
+    @llm_operation
+    async def aanalyze_sentiment(self, thought_content: str) -> List[str]:
+        prompt = SENTIMENT_ANALYSIS_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        return self._parse_list_output(result)
+
+    @llm_operation
+    async def aanalyze_topics(self, thought_content: str) -> List[str]:
+        prompt = TOPIC_ANALYSIS_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        return self._parse_list_output(result)
+
+    @llm_operation
+    async def aanalyze_action_orientation(self, thought_content: str) -> str:
+        prompt = ACTION_ORIENTATION_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        return self._parse_action_orientation(result)
+
+    @llm_operation
+    async def aanalyze_thought_type(self, thought_content: str) -> str:
+        prompt = THOUGHT_TYPE_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        return self._parse_thought_type(result)
+
+    @llm_operation
+    async def aanalyze_thought(self, thought_content: str) -> Dict[str, Any]:
+        prompt = THOUGHT_ANALYSIS_PROMPT.format(thought_content=thought_content)
+        result = await self.analysis_llm.agenerate_content(prompt)
+        analysis = self._parse_thought_analysis(result)
+        missing = [key for key in self.ANALYSIS_FALLBACKS if key not in analysis]
+        if missing:
+            print(
+                f"Combined analysis returned no valid {', '.join(missing)}; "
+                "asking separately."
+            )
+            results = await asyncio.gather(
+                *(
+                    getattr(self, f"a{self.ANALYSIS_FALLBACKS[key]}")(thought_content)
+                    for key in missing
+                )
+            )
+            analysis.update(zip(missing, results))
+        return analysis
+
+    @llm_operation
     def generate_essay_draft_and_tags(
         self,
         starting_text: str,
@@ -129,34 +488,47 @@ class ProcessorService:
         # Fallback if parsing fails but returns text
         return {"essay": result, "tags": []}
 
-    def modify_essay(self, essay_content: str, emotions: List[str]) -> str:
+    @llm_operation
+    def modify_essay(
+        self,
+        essay_content: str,
+        emotions: List[str],
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
         if not emotions:
             return essay_content
 
         prompt = ESSAY_MODIFICATION_PROMPT.format(
             essay_content=essay_content, emotions=", ".join(emotions)
         )
-        return self.llm.generate_content(prompt)
+        return self._generate(prompt, on_chunk)
 
+    @llm_operation
     def extract_emotions_from_profile(
         self, starting_text: str, profile: Dict[str, Any]
     ) -> List[str]:
         prompt = PROFILE_EMOTION_EXTRACTION_PROMPT.format(
-            starting_text=starting_text, profile_json=json.dumps(profile, indent=2)
+            starting_text=starting_text, profile_json=compact_json(profile)
         )
-        result = self.llm.generate_content(prompt)
+        result = self.analysis_llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def complete_essay_with_profile(
-        self, starting_text: str, persona_details: str, emotions: List[str]
+        self,
+        starting_text: str,
+        persona_details: str,
+        emotions: List[str],
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> str:
         prompt = ESSAY_COMPLETION_FROM_PROFILE_PROMPT.format(
             starting_text=starting_text,
             persona_details=persona_details,
             emotions=", ".join(emotions) if emotions else "None",
         )
-        return self.llm.generate_content(prompt)
+        return self._generate(prompt, on_chunk)
 
+    @llm_operation
     def generate_conversation_message(
         self,
         persona_name: str,
@@ -166,6 +538,7 @@ class ProcessorService:
         conversation_context: str,
         recent_messages: List[Dict[str, str]],
         other_personas_info: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> List[str]:
         formatted_messages = ""
         for msg in recent_messages:
@@ -175,7 +548,7 @@ class ProcessorService:
             persona_name=persona_name,
             persona_age=persona_age,
             persona_gender=persona_gender,
-            persona_profile=json.dumps(persona_profile, indent=2)
+            persona_profile=compact_json(persona_profile)
             if persona_profile
             else "None",
             conversation_context=conversation_context,
@@ -183,7 +556,9 @@ class ProcessorService:
             other_personas_info=other_personas_info,
         )
         print(f"Generated conversation message prompt: {prompt}")
-        raw_output = self.llm.generate_content(prompt)
+        # Streamed chunks are the raw JSON text; callers get the parsed
+        # messages from the return value.
+        raw_output = self._generate(prompt, on_chunk)
 
         # Parse the structured JSON response
         try:
@@ -204,16 +579,17 @@ class ProcessorService:
         # Fallback: return raw output as a single message
         return [raw_output.strip()]
 
+    @llm_operation
     def generate_thoughts_from_character_dialogue(
         self, dialogues: List[str], count: int = 5
     ) -> List[str]:
         prompt = THOUGHT_GENERATION_FROM_DIALOGUE_PROMPT.format(
-            dialogues_text="\n".join([f"- {d}" for d in dialogues]),
-            count=count
+            dialogues_text="\n".join([f"- {d}" for d in dialogues]), count=count
         )
         result = self.llm.generate_content(prompt)
         return self._parse_list_output(result)
 
+    @llm_operation
     def synthesize_persona_from_thoughts(self, thoughts: List[str]) -> Dict[str, Any]:
         prompt = PERSONA_SYNTHESIS_FROM_THOUGHTS_PROMPT.format(
             thoughts_list="\n".join([f"- {t}" for t in thoughts])
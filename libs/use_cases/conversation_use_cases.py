@@ -1,12 +1,17 @@
 from libs.db_service import ConversationService, PersonaService, ThoughtService
 from libs.processor_service import ProcessorService
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 class ConversationUseCases:
     def __init__(self):
         self.processor = ProcessorService()
 
-    def generate_conversation_message(self, conversation_id: int, persona_id: int) -> List[str]:
+    def generate_conversation_message(
+        self,
+        conversation_id: int,
+        persona_id: int,
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> List[str]:
         conversation = ConversationService.get_conversation(conversation_id)
         persona = PersonaService.get_persona(persona_id)
         
@@ -36,7 +41,8 @@ class ConversationUseCases:
             persona_profile=persona.profile,
             conversation_context=conversation.context or conversation.title,
             recent_messages=recent_messages_data,
-            other_personas_info=other_personas_info
+            other_personas_info=other_personas_info,
+            on_chunk=on_chunk
         )
         
         for content in message_contents:
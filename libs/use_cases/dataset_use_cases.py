@@ -1,7 +1,12 @@
 from typing import Optional
 
 from libs.dataset_service.movie_dataset_service import MovieDatasetService
-from libs.dtos.dataset_dto import MovieCharacterResponse, MovieSearchResponse
+from libs.dtos.dataset_dto import (
+    CorpusCacheStatsResponse,
+    MovieCharacterResponse,
+    MovieSearchFacets,
+    MovieSearchResponse,
+)
 
 
 class DatasetUseCases:
@@ -15,17 +20,24 @@ class DatasetUseCases:
         min_imdb_rating: Optional[float] = None,
         release_year: Optional[str] = None,
         character_name: Optional[str] = None,
+        include_facets: bool = False,
     ) -> MovieSearchResponse:
-        results = self.movie_service.search_characters(
+        filters = dict(
             title_query=title_query,
             genre=genre,
             min_imdb_rating=min_imdb_rating,
             release_year=release_year,
             character_name=character_name,
         )
+        results = self.movie_service.search_characters(**filters)
+
+        facets = None
+        if include_facets:
+            facets = MovieSearchFacets(**self.movie_service.get_facet_counts(**filters))
 
         return MovieSearchResponse(
-            results=[MovieCharacterResponse(**res) for res in results]
+            results=[MovieCharacterResponse(**res) for res in results],
+            facets=facets,
         )
 
     def get_random_movie_characters(self, limit: int = 50, seed: Optional[float] = None) -> MovieSearchResponse:
@@ -33,3 +45,10 @@ class DatasetUseCases:
         return MovieSearchResponse(
             results=[MovieCharacterResponse(**res) for res in results]
         )
+
+    def warm_cache(self) -> CorpusCacheStatsResponse:
+        self.movie_service.warm_cache()
+        return self.get_cache_stats()
+
+    def get_cache_stats(self) -> CorpusCacheStatsResponse:
+        return CorpusCacheStatsResponse(**self.movie_service.cache_stats())
@@ -1,4 +1,5 @@
 import random
+from typing import Callable, Optional
 
 import requests
 from bs4 import BeautifulSoup
@@ -27,7 +28,17 @@ class GenerationUseCases:
     def generate_thoughts_from_text(self, text_content: str) -> list[str]:
         return self.processor.generate_thoughts_from_text(text_content)
 
-    def generate_essay(self, persona_id: int, starting_text: str) -> str:
+    def generate_essay(
+        self,
+        persona_id: int,
+        starting_text: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """Generates an essay, streaming the final text to `on_chunk` if given.
+
+        The draft of a persona without a profile is JSON and is not streamed;
+        only the emotion rewrite is, or the draft as a whole when it is kept.
+        """
         persona = PersonaService.get_persona(persona_id)
         if not persona:
             return "Error: Persona not found"
@@ -44,6 +55,7 @@ class GenerationUseCases:
                 starting_text=starting_text,
                 persona_details=persona_details,
                 emotions=emotions,
+                on_chunk=on_chunk,
             )
         else:
             unique_attrs = PersonaService.get_persona_unique_attributes(persona_id)
@@ -69,7 +81,7 @@ class GenerationUseCases:
             draft_essay = draft_result.get("essay", "")
             generated_tags = draft_result.get("tags", [])
 
-            final_essay = draft_essay
+            final_essay = None
 
             if generated_tags:
                 closest_thought = ThoughtService.find_closest_thought_by_tags(
@@ -78,7 +90,14 @@ class GenerationUseCases:
                 if closest_thought:
                     emotions = [e.name for e in closest_thought.emotions]
                     if emotions:
-                        final_essay = self.processor.modify_essay(draft_essay, emotions)
+                        final_essay = self.processor.modify_essay(
+                            draft_essay, emotions, on_chunk=on_chunk
+                        )
+
+            if final_essay is None:
+                final_essay = draft_essay
+                if on_chunk is not None and draft_essay:
+                    on_chunk(draft_essay)
 
         return final_essay
 
@@ -90,19 +109,21 @@ class GenerationUseCases:
         total_dialogues_limit = 500
         total_thoughts_limit = 50
         n = len(character_ids)
-        
+        limit_dialogues = total_dialogues_limit // n
+
+        # 1. Extract dialogues for every character in one pass over the corpus
+        dialogues_by_character = movie_service.get_dialogues_for_characters(
+            character_ids, limits=limit_dialogues
+        )
+
         all_thoughts = []
         for i, character_id in enumerate(character_ids):
             # Calculate limits for this character
-            limit_dialogues = total_dialogues_limit // n
             limit_thoughts = total_thoughts_limit // n
             if i == n - 1: # Add remainder to last character
                 limit_thoughts += total_thoughts_limit % n
 
-            # 1. Extract dialogues for this character
-            dialogues_nested = movie_service.get_character_dialogues(
-                character_id, limit=limit_dialogues
-            )
+            dialogues_nested = dialogues_by_character[character_id]
 
             conversations = []
             for conversation in dialogues_nested:
@@ -159,17 +180,19 @@ class GenerationUseCases:
         total_dialogues_limit = 500
         total_thoughts_limit = 50
         n = len(character_ids)
-        
+        limit_dialogues = total_dialogues_limit // n
+
+        dialogues_by_character = movie_service.get_dialogues_for_characters(
+            character_ids, limits=limit_dialogues
+        )
+
         all_new_thoughts = []
         for i, character_id in enumerate(character_ids):
-            limit_dialogues = total_dialogues_limit // n
             limit_thoughts = total_thoughts_limit // n
             if i == n - 1:
                 limit_thoughts += total_thoughts_limit % n
 
-            dialogues_nested = movie_service.get_character_dialogues(
-                character_id, limit=limit_dialogues
-            )
+            dialogues_nested = dialogues_by_character[character_id]
 
             conversations = []
             for conversation in dialogues_nested:
@@ -1,9 +1,31 @@
-from libs.db_service import ThoughtService, PersonaService
-from libs.processor_service import ProcessorService
-from typing import List, Dict, Any, Optional
-from libs.db_service.dto import ThoughtDomain, PersonaDomain
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from libs.db_service import ThoughtService
+from libs.db_service.dto import ThoughtDomain
+from libs.processor_service import (
+    ANALYSIS_MODE_BATCH,
+    ANALYSIS_MODE_FUSED,
+    ProcessorService,
+    get_analysis_mode,
+    run_bounded,
+)
+from libs.processor_service.concurrency import DEFAULT_MAX_CONCURRENCY
+
 
 class ThoughtUseCases:
+    # (result key, async ProcessorService method) for every analysis dimension
+    ANALYSES = (
+        ("distortions", "aanalyze_cognitive_distortions"),
+        ("emotions", "aanalyze_sentiment"),
+        ("action_orientation", "aanalyze_action_orientation"),
+        ("thought_type", "aanalyze_thought_type"),
+        ("topics", "aanalyze_topics"),
+    )
+
+    # Batch tasks whose single-thought analysis also marks the thought completed
+    COMPLETING_TASKS = {"distortions", "emotions", "topics", "analysis"}
+
     def __init__(self):
         self.processor = ProcessorService()
 
@@ -48,5 +70,110 @@ class ThoughtUseCases:
         ThoughtService.update_status(thought_id, "completed")
         return topics
 
-    def create_thought(self, content: str, persona_id: int, is_generated: bool) -> ThoughtDomain:
-        return ThoughtService.create_thought(content=content, persona_id=persona_id, is_generated=is_generated)
+    def analyze_thought(self, thought_id: int) -> Optional[Dict[str, Any]]:
+        """All five analyses from one LLM call, saved in one transaction."""
+        thought = ThoughtService.get_thought(thought_id)
+        if not thought:
+            return None
+        analysis = self.processor.analyze_thought(thought.content)
+        ThoughtService.save_analysis(thought_id, analysis, is_generated=True)
+        return analysis
+
+    def analyze_thoughts(
+        self,
+        thought_ids: List[int],
+        concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        mode: Optional[str] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Runs every analysis for every thought, `concurrency` LLM calls at a time.
+
+        In fused mode each thought costs one combined call, otherwise one call
+        per dimension. `mode` is the one chosen when the job was enqueued and
+        defaults to this process's THOUGHT_ANALYSIS_MODE. Each thought's
+        results are saved in one transaction; a failed call only leaves its
+        own results unset.
+        """
+        mode = mode or get_analysis_mode()
+        if mode == ANALYSIS_MODE_BATCH:
+            return self.analyze_thoughts_batched(thought_ids)
+
+        contents = ThoughtService.get_thought_contents(thought_ids)
+        fused = mode == ANALYSIS_MODE_FUSED
+        factories = []
+        slots = []
+        for thought_id, content in contents.items():
+            if fused:
+                factories.append(partial(self.processor.aanalyze_thought, content))
+                slots.append((thought_id, None))
+                continue
+            for name, method in self.ANALYSES:
+                factories.append(partial(getattr(self.processor, method), content))
+                slots.append((thought_id, name))
+
+        results = run_bounded(factories, concurrency)
+
+        analyses: Dict[int, Dict[str, Any]] = {
+            thought_id: {} for thought_id in contents
+        }
+        for (thought_id, name), result in zip(slots, results):
+            if isinstance(result, Exception):
+                print(
+                    f"Error running {name or 'combined'} analysis "
+                    f"for thought {thought_id}: {result}"
+                )
+                continue
+            if name is None:
+                analyses[thought_id].update(result)
+            else:
+                analyses[thought_id][name] = result
+
+        for thought_id, analysis in analyses.items():
+            ThoughtService.save_analysis(thought_id, analysis, is_generated=True)
+        return analyses
+
+    def analyze_thoughts_batched(
+        self, thought_ids: List[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """All five analyses for many thoughts, packed several thoughts per LLM call."""
+        return self.analyze_batch("analysis", thought_ids)
+
+    def analyze_batch(self, task: str, thought_ids: List[int]) -> Dict[int, Any]:
+        """One analysis task (a key of BATCH_CLASSIFICATION_TASKS) for many thoughts.
+
+        Contents are read in one query, classified in as few LLM calls as the
+        token budget allows, and all results are saved in one transaction.
+        """
+        contents = ThoughtService.get_thought_contents(thought_ids)
+        if not contents:
+            return {}
+        results = self.processor.classify_batch(task, contents)
+        analyses = (
+            results
+            if task == "analysis"
+            else {i: {task: value} for i, value in results.items()}
+        )
+        status = "completed" if task in self.COMPLETING_TASKS else None
+        ThoughtService.save_analyses(analyses, is_generated=True, status=status)
+        return results
+
+    def create_thought(
+        self, content: str, persona_id: int, is_generated: bool
+    ) -> ThoughtDomain:
+        return ThoughtService.create_thought(
+            content=content, persona_id=persona_id, is_generated=is_generated
+        )
+
+    def bulk_create_thoughts(
+        self, contents: List[str], persona_id: Optional[int], is_generated: bool
+    ) -> List[int]:
+        """Creates one thought per content in one transaction and returns their ids."""
+        return ThoughtService.bulk_create_thoughts(
+            [
+                {
+                    "content": content,
+                    "persona_id": persona_id,
+                    "is_generated": is_generated,
+                }
+                for content in contents
+            ]
+        )
@@ -0,0 +1,85 @@
+"""Offline benchmark of thought analysis throughput per analysis mode.
+
+Runs the processor against the fake LLM provider, so no API key or network
+is needed. Latency and failures are simulated from the FAKE_LLM_* settings.
+"""
+
+import argparse
+import os
+import time
+from functools import partial
+
+# Set before the processor builds its client.
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from libs.llm_service import get_retry_metrics  # noqa: E402
+from libs.processor_service import ProcessorService, run_bounded  # noqa: E402
+
+ANALYSES = (
+    "aanalyze_cognitive_distortions",
+    "aanalyze_sentiment",
+    "aanalyze_action_orientation",
+    "aanalyze_thought_type",
+    "aanalyze_topics",
+)
+
+
+def run_mode(processor: ProcessorService, mode: str, thoughts: dict, concurrency: int):
+    if mode == "batch":
+        return processor.analyze_thoughts_batch(thoughts)
+    if mode == "fused":
+        factories = [partial(processor.aanalyze_thought, t) for t in thoughts.values()]
+    else:
+        factories = [
+            partial(getattr(processor, method), t)
+            for t in thoughts.values()
+            for method in ANALYSES
+        ]
+    return run_bounded(factories, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--thoughts", type=int, default=200, help="Number of synthetic thoughts"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="LLM calls in flight"
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["split", "fused", "batch"],
+        choices=["split", "fused", "batch"],
+    )
+    args = parser.parse_args()
+
+    processor = ProcessorService()
+    print(
+        f"Provider: {os.getenv('LLM_PROVIDER')}, "
+        f"latency: {os.getenv('FAKE_LLM_LATENCY_MS', '0')}ms "
+        f"({os.getenv('FAKE_LLM_LATENCY_DISTRIBUTION', 'fixed')}), "
+        f"failure rate: {os.getenv('FAKE_LLM_FAILURE_RATE', '0')}"
+    )
+    for mode in args.modes:
+        # Distinct thoughts per mode, so no mode is served from another's cache.
+        thoughts = {
+            i: f"Benchmark thought {mode} {i}: I keep worrying about work."
+            for i in range(args.thoughts)
+        }
+        before = sum(stats.get("attempts", 0) for stats in get_retry_metrics().values())
+        started = time.perf_counter()
+        run_mode(processor, mode, thoughts, args.concurrency)
+        elapsed = time.perf_counter() - started
+        calls = (
+            sum(stats.get("attempts", 0) for stats in get_retry_metrics().values())
+            - before
+        )
+        print(
+            f"{mode:>6}: {elapsed:7.2f}s, {args.thoughts / elapsed:8.1f} thoughts/s, "
+            f"{calls} LLM calls"
+        )
+
+
+if __name__ == "__main__":
+    main()
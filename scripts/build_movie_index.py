@@ -0,0 +1,30 @@
+"""Builds the SQLite index used by MovieDatasetService from a raw dialogue corpus.
+
+Usage: python scripts/build_movie_index.py [data_dir] [index_path]
+
+The corpus format is detected from the files in data_dir, or set with
+MOVIE_DATASET_FORMAT (cornell, jsonl or csv).
+"""
+
+import sys
+import time
+
+from libs.dataset_service.movie_dataset_service import MovieDatasetService
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "/dataset/cornell_dialogs"
+    index_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    service = MovieDatasetService(data_dir=data_dir, index_path=index_path)
+    started = time.perf_counter()
+    service.build_index()
+    elapsed = time.perf_counter() - started
+    print(
+        f"Built {service.corpus.name} dataset index at {service.index_path} "
+        f"in {elapsed:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
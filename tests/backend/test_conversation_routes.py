@@ -1,6 +1,9 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
 from fastapi.testclient import TestClient
+
 from backend.main import app
-from unittest.mock import patch, MagicMock
 from libs.db_service import ConversationDomain
 
 client = TestClient(app)
@@ -65,8 +68,77 @@ def test_add_persona_to_conversation(mock_add):
     response = client.post("/conversations/1/personas", json={"persona_id": 2})
     assert response.status_code == 200
 
+@patch("backend.routers.conversation_routes.GenerationStream")
 @patch("backend.routers.conversation_routes.ConversationService.end_conversation")
-def test_end_conversation(mock_end):
+def test_end_conversation(mock_end, mock_stream_cls):
     mock_end.return_value = True
     response = client.post("/conversations/1/end")
     assert response.status_code == 200
+
+@patch("backend.routers.conversation_routes.ConversationService.get_conversation")
+def test_stream_conversation_not_found(mock_get):
+    mock_get.return_value = None
+    response = client.get("/conversations/1/stream")
+    assert response.status_code == 404
+
+def _collect(events, limit=10):
+    async def run():
+        collected = []
+        async for event in events:
+            collected.append(event)
+            if len(collected) == limit:
+                break
+        return collected
+    return asyncio.run(run())
+
+def _connected_request():
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(return_value=False)
+    return request
+
+@patch("backend.routers.conversation_routes.AsyncGenerationStream")
+def test_conversation_events_start_at_latest_entry(mock_stream_cls):
+    from backend.routers.conversation_routes import _conversation_events
+
+    mock_stream = mock_stream_cls.return_value
+    mock_stream.latest_id = AsyncMock(return_value="5-0")
+    mock_stream.read = AsyncMock(side_effect=[
+        [("6-0", "chunk", {"text": "Hi", "persona_id": 2})],
+        [],
+    ])
+
+    events = _collect(_conversation_events(1, "$", _connected_request()), limit=2)
+    assert events == [
+        'id: 6-0\nevent: chunk\ndata: {"text": "Hi", "persona_id": 2}\n\n',
+        ": keepalive\n\n",
+    ]
+    assert [c.args[0] for c in mock_stream.read.call_args_list] == ["5-0", "6-0"]
+
+
+@patch("backend.routers.conversation_routes.AsyncGenerationStream")
+def test_conversation_events_close_on_end_idle_or_disconnect(mock_stream_cls):
+    from backend.routers import conversation_routes
+    from backend.routers.conversation_routes import _conversation_events
+
+    mock_stream = mock_stream_cls.return_value
+    mock_stream.read = AsyncMock(return_value=[("7-0", "end", {})])
+    assert _collect(_conversation_events(1, "0", _connected_request())) == [
+        "id: 7-0\nevent: end\ndata: {}\n\n"
+    ]
+
+    mock_stream.read = AsyncMock(return_value=[])
+    with patch.object(conversation_routes, "STREAM_IDLE_TIMEOUT_SECONDS", 0):
+        assert _collect(_conversation_events(1, "0", _connected_request())) == []
+
+    request = _connected_request()
+    request.is_disconnected = AsyncMock(return_value=True)
+    assert _collect(_conversation_events(1, "0", request)) == []
+    mock_stream.read.assert_called_once()
+
+
+@patch("backend.routers.conversation_routes.GenerationStream")
+@patch("backend.routers.conversation_routes.ConversationService.end_conversation")
+def test_end_conversation_closes_its_stream(mock_end, mock_stream_cls):
+    mock_end.return_value = True
+    assert client.post("/conversations/1/end").status_code == 200
+    mock_stream_cls.return_value.end.assert_called_once_with()
@@ -1,9 +1,13 @@
-from unittest.mock import patch, MagicMock
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import func
+
 from libs.db_service.conversation_service import ConversationService
+from libs.db_service.models import Conversation, Persona, Thought
 from libs.db_service.persona_service import PersonaService
 from libs.db_service.service import ThoughtService
-from libs.db_service.models import Conversation, Persona, Thought
-from datetime import datetime
 
 p = Persona(id=1, name="Test Persona", age=30, gender="male", source="manual")
 p.created_at = datetime.utcnow()
@@ -91,6 +95,7 @@ def test_create_thought(mock_session_local):
     assert mock_session.commit.called
 
 
+@patch.dict("libs.db_service.service._count_cache", clear=True)
 @patch("libs.db_service.service.SessionLocal")
 def test_list_thoughts(mock_session_local):
     mock_session = MagicMock()
@@ -101,3 +106,309 @@ def test_list_thoughts(mock_session_local):
     result = ThoughtService.list_thoughts()
     assert result["total"] == 1
     assert len(result["items"]) == 1
+
+
+def test_save_analysis_writes_everything_in_one_transaction():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from libs.db_service.models import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as session:
+        session.add(Thought(id=1, content="I always fail", status="pending"))
+        session.commit()
+
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        saved = ThoughtService.save_analysis(1, {
+            "distortions": ["Labeling", "labeling"],
+            "emotions": ["Sad"],
+            "action_orientation": "Ruminative",
+            "thought_type": "Automatic",
+            "topics": ["Work"],
+        })
+        assert saved is True
+        assert ThoughtService.save_analysis(2, {"emotions": ["Sad"]}) is False
+        thought = ThoughtService.get_thought(1)
+
+    assert thought.status == "completed"
+    assert thought.action_orientation == "Ruminative"
+    assert thought.thought_type == "Automatic"
+    assert [t.name for t in thought.tags] == ["labeling"]
+    assert [e.name for e in thought.emotions] == ["sad"]
+    assert [t.name for t in thought.topics] == ["work"]
+    assert all(t.is_generated for t in thought.tags)
+
+
+def _sqlite_session_factory():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from libs.db_service.models import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_label_writes_use_a_fixed_number_of_statements():
+    from sqlalchemy import event, select
+
+    from libs.db_service.models import Tag, ThoughtTag
+
+    engine, session_factory = _sqlite_session_factory()
+    with session_factory() as session:
+        session.add(Thought(id=1, content="I always fail", status="pending"))
+        session.add(Tag(name="existing"))
+        session.commit()
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        assert ThoughtService.add_tags(1, ["Existing", "new"]) is True
+        few = len(statements)
+        statements.clear()
+        many = [f"tag {i}" for i in range(50)] + ["NEW", "existing"]
+        assert ThoughtService.add_tags(1, many, is_generated=True) is True
+        assert len(statements) == few
+        assert ThoughtService.add_tags(99, ["a"]) is False
+
+        # Labels that all exist already are only looked up, never inserted
+        statements.clear()
+        assert ThoughtService.add_tags(1, ["new", "tag 3"]) is True
+        assert not any(
+            s.lstrip().upper().startswith("INSERT INTO TAG ") for s in statements
+        )
+
+    with session_factory() as session:
+        names = session.scalars(
+            select(Tag.name).join(ThoughtTag).where(ThoughtTag.thought_id == 1)
+        ).all()
+        assert sorted(names) == sorted(
+            ["existing", "new"] + [f"tag {i}" for i in range(50)]
+        )
+        assert session.scalar(select(func.count(Tag.id))) == 52
+
+
+def test_create_thought_links_emotions_in_bulk():
+    engine, session_factory = _sqlite_session_factory()
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        thought = ThoughtService.create_thought(
+            "Rainy day", emotions=["Sad", "sad", "Calm"]
+        )
+        assert ThoughtService.add_emotions(thought.id, ["calm", "Hopeful"]) is True
+        assert (
+            ThoughtService.add_topics(thought.id, ["Weather"], is_generated=True)
+            is True
+        )
+        thought = ThoughtService.get_thought(thought.id)
+
+    assert sorted(e.name for e in thought.emotions) == ["calm", "hopeful", "sad"]
+    assert [(t.name, t.is_generated) for t in thought.topics] == [("weather", True)]
+
+
+def test_label_upsert_uses_on_conflict_for_postgres():
+    from sqlalchemy.dialects import postgresql
+
+    from libs.db_service.models import Tag
+
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    ThoughtService._insert_ignoring_conflicts(session, Tag, [{"name": "a"}], ["name"])
+
+    stmt, rows = session.execute.call_args[0]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (name) DO NOTHING" in sql
+    assert rows == [{"name": "a"}]
+
+
+def test_bulk_create_thoughts_keeps_returning_order_on_postgres():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    session.scalars.return_value = iter([12, 10, 11])
+    session_factory = MagicMock()
+    session_factory.return_value.__enter__.return_value = session
+
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        ids = ThoughtService.bulk_create_thoughts([{"content": c} for c in "abc"])
+
+    stmt, rows = session.scalars.call_args[0]
+    assert stmt._sort_by_parameter_order
+    assert [row["content"] for row in rows] == ["a", "b", "c"]
+    # Ids map to the input rows as returned, not re-sorted
+    assert ids == [12, 10, 11]
+
+
+def test_bulk_create_thoughts_inserts_in_one_statement():
+    from sqlalchemy import event
+
+    engine, session_factory = _sqlite_session_factory()
+    with session_factory() as session:
+        session.add(Persona(id=1, name="P", age=30, gender="F", source="manual"))
+        session.commit()
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    thoughts = [
+        {"content": f"thought {i}", "persona_id": 1, "is_generated": True}
+        for i in range(50)
+    ]
+    thoughts[0]["emotions"] = ["Sad", "Calm"]
+    thoughts[1]["persona_id"] = 99
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        ids = ThoughtService.bulk_create_thoughts(thoughts)
+        assert ThoughtService.bulk_create_thoughts([]) == []
+        first, second = (
+            ThoughtService.get_thought(ids[0]),
+            ThoughtService.get_thought(ids[1]),
+        )
+
+    assert len(ids) == 50 and len(set(ids)) == 50
+    assert (
+        sum(s.lstrip().upper().startswith("INSERT INTO THOUGHT ") for s in statements)
+        == 1
+    )
+    assert first.content == "thought 0" and first.is_generated and first.persona.id == 1
+    assert sorted(e.name for e in first.emotions) == ["calm", "sad"]
+    # Unknown personas are dropped, like create_thought does.
+    assert second.content == "thought 1" and second.persona is None
+
+
+def test_save_analyses_uses_one_transaction_for_many_thoughts():
+    from sqlalchemy import event
+
+    engine, session_factory = _sqlite_session_factory()
+    with session_factory() as session:
+        for i in range(1, 31):
+            session.add(Thought(id=i, content=f"thought {i}", status="pending"))
+        session.commit()
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        contents = ThoughtService.get_thought_contents([2, 1, 99])
+        assert len(statements) == 1
+        assert ThoughtService.get_thought_contents([]) == {}
+
+        statements.clear()
+        analyses = {
+            i: {"emotions": ["Sad", f"mood {i % 3}"], "thought_type": "Automatic"}
+            for i in range(1, 31)
+        }
+        analyses[99] = {"emotions": ["Sad"]}
+        assert ThoughtService.save_analyses(analyses) == 30
+        saved = len(statements)
+        assert (
+            ThoughtService.save_analyses(
+                {1: {"action_orientation": "Ruminative"}}, status=None
+            )
+            == 1
+        )
+        first = ThoughtService.get_thought(1)
+
+    assert contents == {1: "thought 1", 2: "thought 2"}
+    # Load, label upsert and lookup, link lookup and insert, one thought update
+    assert saved <= 7
+    assert sorted(e.name for e in first.emotions) == ["mood 1", "sad"]
+    assert first.status == "completed"
+    assert (first.thought_type, first.action_orientation) == ("Automatic", "Ruminative")
+
+
+@patch.dict("libs.db_service.service._count_cache", clear=True)
+def test_list_thoughts_pages_with_a_keyset_cursor():
+    from datetime import timedelta
+
+    from sqlalchemy import event
+
+    engine, session_factory = _sqlite_session_factory()
+    start = datetime(2026, 1, 1)
+    with session_factory() as session:
+        session.add(Persona(id=1, name="P", age=30, gender="F", source="manual"))
+        for i in range(1, 26):
+            # Pairs of thoughts share a timestamp, so ids break the ties
+            session.add(
+                Thought(
+                    id=i,
+                    content=f"thought {i}",
+                    persona_id=1 if i % 2 else None,
+                    created_at=start + timedelta(minutes=i // 2),
+                )
+            )
+        session.commit()
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        seen = []
+        cursor = None
+        while True:
+            result = ThoughtService.list_thoughts(limit=10, cursor=cursor)
+            seen.extend(t.id for t in result["items"])
+            assert result["total"] == 25
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+        counts = sum("count(" in s.lower() for s in statements)
+
+        first = ThoughtService.list_thoughts(limit=3)
+        by_persona = ThoughtService.list_thoughts(
+            persona_id=1, limit=3, cursor=first["next_cursor"], include_total=False
+        )
+
+        with pytest.raises(ValueError):
+            ThoughtService.list_thoughts(cursor="not-a-cursor")
+
+    assert seen == list(range(25, 0, -1))
+    # The total is counted once and then served from the cache
+    assert counts == 1
+    assert [t.id for t in first["items"]] == [25, 24, 23]
+    assert [t.id for t in by_persona["items"]] == [21, 19, 17]
+    assert by_persona["total"] is None
+
+
+@patch.dict("libs.db_service.service._count_cache", clear=True)
+def test_list_thoughts_cursor_pages_over_server_default_timestamps():
+    engine, session_factory = _sqlite_session_factory()
+    with session_factory() as session:
+        # created_at comes from the database, as "YYYY-MM-DD HH:MM:SS" on SQLite
+        session.add_all([Thought(content=f"thought {i}") for i in range(7)])
+        session.commit()
+
+    with patch("libs.db_service.service.SessionLocal", session_factory):
+        pages = []
+        cursor = None
+        for _ in range(5):
+            result = ThoughtService.list_thoughts(
+                limit=3, cursor=cursor, include_total=False
+            )
+            pages.append([t.id for t in result["items"]])
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_count_cache_drops_expired_and_oldest_entries():
+    from libs.db_service import service
+
+    session = MagicMock()
+    session.scalar.return_value = 3
+    with patch.dict(service._count_cache, clear=True), \
+            patch.object(service, "MAX_COUNT_CACHE_ENTRIES", 2), \
+            patch.object(service, "SessionLocal") as mock_session_local:
+        mock_session_local.return_value.__enter__.return_value = session
+        service._count_cache[("old", None, None)] = (0.0, 1)
+        for tag in ("a", "b", "c"):
+            assert ThoughtService.count_thoughts(tag=tag) == 3
+        assert list(service._count_cache) == [("b", None, None), ("c", None, None)]
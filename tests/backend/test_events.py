@@ -1,7 +1,20 @@
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis import Redis
+from redis.client import Pipeline
+
+from libs.events import jobs as job_module
 from libs.events.bus import DomainEventBus
-from libs.events.handlers import handle_conversation_ended, register_handlers
 from libs.events.conversation_events import ConversationEndedEvent
+from libs.events.handlers import handle_conversation_ended, register_handlers
+from libs.events.jobs import (
+    analysis_jobs,
+    enqueue_analysis,
+    enqueue_bulk_analysis,
+    get_queue,
+)
+
 
 def test_event_bus():
     # Clear subscribers for testing
@@ -30,3 +43,159 @@ def test_handle_conversation_ended(mock_q):
 def test_register_handlers(mock_bus):
     register_handlers()
     mock_bus.subscribe.assert_called_once_with("ConversationEndedEvent", handle_conversation_ended)
+
+def test_generation_stream_publishes_and_reads_events():
+    from libs.events.streams import GenerationStream, format_sse
+
+    mock_redis = MagicMock()
+    stream = GenerationStream("stream:essay:job", mock_redis)
+    stream.publish("Hello", persona_id=1)
+    pipe = mock_redis.pipeline.return_value
+    pipe.xadd.assert_called_once()
+    assert pipe.xadd.call_args[0][1] == {
+        "event": "chunk",
+        "data": '{"text": "Hello", "persona_id": 1}',
+    }
+    pipe.expire.assert_called_once()
+
+    mock_redis.xread.return_value = [
+        (
+            b"stream:essay:job",
+            [(b"1-0", {b"event": b"done", b"data": b'{"result": "Hello"}'})],
+        )
+    ]
+    assert list(stream.read("0")) == [("1-0", "done", {"result": "Hello"})]
+    assert (
+        format_sse("1-0", "done", {"result": "Hello"})
+        == 'id: 1-0\nevent: done\ndata: {"result": "Hello"}\n\n'
+    )
+
+
+def test_async_generation_stream_reads_events():
+    from libs.events.streams import AsyncGenerationStream
+
+    mock_redis = MagicMock()
+    mock_redis.xread = AsyncMock(
+        return_value=[
+            (b"stream:conversation:1", [(b"2-0", {b"event": b"end", b"data": b"{}"})])
+        ]
+    )
+    mock_redis.xrevrange = AsyncMock(return_value=[(b"2-0", {})])
+    stream = AsyncGenerationStream("stream:conversation:1", mock_redis)
+
+    assert asyncio.run(stream.read("0", block_ms=10)) == [("2-0", "end", {})]
+    mock_redis.xread.assert_awaited_once_with({"stream:conversation:1": "0"}, block=10)
+    assert asyncio.run(stream.latest_id()) == "2-0"
+
+
+def test_generation_stream_publish_errors_do_not_raise():
+    from libs.events.streams import GenerationStream
+
+    mock_redis = MagicMock()
+    mock_redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+    GenerationStream("stream:essay:job", mock_redis).publish("Hello")
+
+
+class _CountingRedis:
+    """Patches a real Redis client so nothing leaves the process: pipelines
+    record how many commands each round-trip carries."""
+
+    def __init__(self):
+        self.pipelines = []
+        self.commands = []
+        counter = self
+
+        def execute(pipe, raise_on_error=True):
+            counter.pipelines.append(len(pipe.command_stack))
+            pipe.reset()
+            return []
+
+        def execute_command(client, *args, **kwargs):
+            counter.commands.append(args[0])
+            return {"redis_version": "7.2.0"}
+
+        self.patches = [
+            patch.object(Pipeline, "execute", execute),
+            patch.object(Redis, "execute_command", execute_command),
+        ]
+        self.connection = Redis()
+
+    def __enter__(self):
+        for p in self.patches:
+            p.start()
+        return self
+
+    def __exit__(self, *exc):
+        for p in self.patches:
+            p.stop()
+
+
+def test_enqueue_analysis_fans_out_in_one_round_trip():
+    with _CountingRedis() as redis:
+        jobs = enqueue_analysis(list(range(1, 51)), redis.connection, mode="split")
+
+    assert len(jobs) == 250
+    # One pipeline for every job, plus rq's one-off server version lookup
+    assert len(redis.pipelines) == 1
+    assert redis.commands == ["INFO"]
+    assert [(job.origin, job.func_name, job.args) for job in jobs[:2]] == [
+        ("distortions", "workers.tasks.analyze_cognitive_distortions", (1,)),
+        ("sentiment", "workers.tasks.analyze_sentiment", (1,)),
+    ]
+    assert jobs[-1].origin == "topics" and jobs[-1].args == (50,)
+
+
+def test_enqueue_jobs_sends_large_fan_outs_in_chunks():
+    with (
+        _CountingRedis() as redis,
+        patch.object(job_module, "MAX_JOBS_PER_PIPELINE", 100),
+    ):
+        jobs = enqueue_analysis(list(range(1, 51)), redis.connection, mode="split")
+
+    assert len(jobs) == 250
+    assert len(redis.pipelines) == 3
+
+
+def test_analysis_jobs_per_mode():
+    assert analysis_jobs([], mode="split") == []
+    assert len(analysis_jobs([1, 2], mode="split")) == 10
+    assert analysis_jobs([1, 2], mode="fused") == [
+        ("analysis", "workers.tasks.analyze_thought", (1,)),
+        ("analysis", "workers.tasks.analyze_thought", (2,)),
+    ]
+    assert analysis_jobs([1, 2], mode="batch") == [
+        ("analysis", "workers.tasks.analyze_thoughts_batched", ([1, 2],)),
+    ]
+
+
+def test_enqueue_bulk_analysis_sends_one_job():
+    with _CountingRedis() as redis:
+        jobs = enqueue_bulk_analysis([1, 2, 3], redis.connection, mode="split")
+
+    assert [(job.origin, job.func_name, job.args) for job in jobs] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1, 2, 3], "split")),
+    ]
+    assert len(redis.pipelines) == 1
+
+
+@patch("libs.events.jobs.enqueue_jobs")
+def test_enqueue_bulk_analysis_per_mode(mock_enqueue_jobs):
+    connection = Redis()
+    assert enqueue_bulk_analysis([], connection, mode="fused") == []
+    mock_enqueue_jobs.assert_not_called()
+
+    enqueue_bulk_analysis([1, 2], connection, mode="fused")
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1, 2], "fused")),
+    ]
+    enqueue_bulk_analysis([1, 2], connection, mode="batch")
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts_batched", ([1, 2],)),
+    ]
+
+
+def test_get_queue_reuses_queues():
+    connection = Redis()
+    assert get_queue("topics", connection) is get_queue("topics", connection)
+    assert get_queue("topics", connection) is not get_queue("sentiment", connection)
+    assert get_queue("topics", connection) is not get_queue("topics", Redis())
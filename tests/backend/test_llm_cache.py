@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+from libs.llm_service.base import BaseLLM
+from libs.llm_service.cache import (
+    CachedLLM,
+    LRUResponseCache,
+    SQLiteResponseCache,
+    cache_key,
+    with_response_cache,
+)
+
+
+class CountingLLM(BaseLLM):
+    model_name = "test-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt: str) -> str:
+        self.calls += 1
+        return f"answer to {prompt}"
+
+
+def test_cache_key_depends_on_model_and_prompt():
+    assert cache_key("a", "prompt") == cache_key("a", "prompt")
+    assert cache_key("a", "prompt") != cache_key("b", "prompt")
+    assert cache_key("a", "prompt") != cache_key("a", "other")
+
+
+def test_cached_llm_serves_repeated_prompts_from_cache():
+    llm = CountingLLM()
+    cached = CachedLLM(llm, LRUResponseCache())
+
+    assert cached.generate_content("p1") == "answer to p1"
+    assert cached.generate_content("p1") == "answer to p1"
+    assert cached.generate_content("p2") == "answer to p2"
+
+    assert llm.calls == 2
+    assert cached.stats() == {"hits": 1, "misses": 2}
+
+
+def test_cached_llm_stores_only_validated_responses():
+    llm = CountingLLM()
+    cached = CachedLLM(
+        llm, LRUResponseCache(), validate=lambda response: response.endswith("good")
+    )
+
+    cached.generate_content("bad")
+    cached.generate_content("bad")
+    cached.generate_content("good")
+    cached.generate_content("good")
+
+    # The rejected answer is asked again; the accepted one is served from cache
+    assert llm.calls == 3
+
+
+def test_lru_cache_evicts_least_recently_used():
+    backend = LRUResponseCache(max_entries=2)
+    backend.set("a", "1", None)
+    backend.set("b", "2", None)
+    backend.get("a")
+    backend.set("c", "3", None)
+
+    assert backend.get("a") == "1"
+    assert backend.get("b") is None
+    assert backend.get("c") == "3"
+
+
+def test_lru_cache_expires_entries():
+    backend = LRUResponseCache()
+    backend.set("a", "1", 60)
+    with patch("libs.llm_service.cache.time.time", return_value=time.time() + 61):
+        assert backend.get("a") is None
+
+
+def test_sqlite_cache_persists_and_evicts():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "cache.sqlite3")
+        backend = SQLiteResponseCache(path, max_entries=2)
+        backend.set("a", "1", None)
+        backend.set("b", "2", 60)
+        backend.set("c", "3", None)
+
+        reopened = SQLiteResponseCache(path, max_entries=2)
+        assert reopened.get("a") is None
+        assert reopened.get("b") == "2"
+        assert reopened.get("c") == "3"
+        with patch("libs.llm_service.cache.time.time", return_value=time.time() + 61):
+            assert reopened.get("b") is None
+
+
+def test_cache_errors_fall_through_to_llm():
+    llm = CountingLLM()
+    backend = MagicMock(spec=LRUResponseCache)
+    backend.get.side_effect = ConnectionError("down")
+    backend.set.side_effect = ConnectionError("down")
+
+    cached = CachedLLM(llm, backend)
+    assert cached.generate_content("p") == "answer to p"
+    assert llm.calls == 1
+
+
+def test_response_cache_is_disabled_by_default():
+    llm = CountingLLM()
+    with patch.dict(os.environ, {}, clear=True):
+        assert with_response_cache(llm) is llm
+
+    cached = with_response_cache(llm, backend="memory")
+    assert isinstance(cached, CachedLLM)
+    assert cached.llm is llm
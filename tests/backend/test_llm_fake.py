@@ -0,0 +1,134 @@
+import asyncio
+import os
+import statistics
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from libs.llm_service.factory import LLMFactory, LLMProvider
+from libs.llm_service.fake import FakeLLM, FakeLLMError
+from libs.llm_service.resilience import ResilientLLM, is_retryable
+from libs.processor_service.service import ProcessorService
+
+THOUGHTS = {
+    1: "I always mess up presentations at work.",
+    2: "Tomorrow I will call my sister and plan the trip.",
+    3: "Nobody at the party even noticed I was there.",
+}
+
+
+@pytest.fixture
+def service():
+    with patch(
+        "libs.processor_service.service.LLMFactory.get_llm", return_value=FakeLLM()
+    ):
+        yield ProcessorService()
+
+
+def test_classification_prompts_get_valid_answers(service):
+    thought = THOUGHTS[1]
+    assert all(
+        isinstance(d, str) for d in service.analyze_cognitive_distortions(thought)
+    )
+    assert service.analyze_sentiment(thought)
+    assert 1 <= len(service.analyze_topics(thought)) <= 3
+    assert (
+        service.analyze_action_orientation(thought)
+        in ProcessorService.ACTION_ORIENTATIONS
+    )
+    assert service.analyze_thought_type(thought) in ProcessorService.THOUGHT_TYPES
+
+
+def test_fused_and_batch_analysis_agree_with_split_answers(service):
+    for thought in THOUGHTS.values():
+        analysis = service.analyze_thought(thought)
+        assert analysis["emotions"] == service.analyze_sentiment(thought)
+        assert analysis["thought_type"] == service.analyze_thought_type(thought)
+
+    with patch.object(
+        service, "analyze_thought", side_effect=AssertionError("fallback used")
+    ):
+        batch = service.analyze_thoughts_batch(THOUGHTS)
+    assert batch == {
+        key: service.analyze_thought(thought) for key, thought in THOUGHTS.items()
+    }
+
+
+def test_generation_prompts_get_valid_answers(service):
+    draft = service.generate_essay_draft_and_tags(
+        "It started", "Name: A", "Automatic", "Ruminative"
+    )
+    assert draft["essay"] and 3 <= len(draft["tags"]) <= 5
+
+    assert service.complete_essay_with_profile("It started", "Name: A", ["Happy"])
+    assert service.modify_essay("An essay.", ["Sad"]) != "An essay."
+    assert service.extract_emotions_from_profile("It started", {"topics": []})
+
+    messages = service.generate_conversation_message(
+        "A", 30, "F", {}, "Context", [], "None"
+    )
+    assert messages and not messages[0].startswith("{")
+
+    assert len(service.generate_thoughts_from_character_dialogue(["Hi."], count=4)) == 4
+    assert service.generate_thoughts_from_text("A blog post.")
+
+    persona = service.synthesize_persona_from_thoughts(["A thought."])
+    assert persona["name"] and isinstance(persona["age"], int)
+
+
+@patch("libs.db_service.persona_service.LLMFactory")
+def test_persona_profile_prompt_gets_valid_answer(mock_factory):
+    from libs.db_service.persona_service import PersonaService
+
+    mock_factory.get_llm.return_value = FakeLLM()
+    profile = PersonaService._generate_profile_from_thoughts(["A thought."])
+    assert profile["topics"] and "emotions" in profile["topics"][0]
+
+
+def test_responses_are_deterministic():
+    prompt = "Complete the following essay based on the starting text provided."
+    assert FakeLLM(seed=1).generate_content(prompt) == FakeLLM(seed=2).generate_content(
+        prompt
+    )
+    assert "".join(FakeLLM().stream_content(prompt)) == FakeLLM().respond(prompt)
+
+
+def test_latency_distributions_keep_the_mean():
+    for distribution in ("fixed", "uniform", "exponential", "lognormal"):
+        llm = FakeLLM(latency_ms=100, latency_distribution=distribution, seed=7)
+        mean = statistics.mean(llm._latency() for _ in range(4000))
+        assert mean == pytest.approx(0.1, rel=0.1), distribution
+
+    with pytest.raises(ValueError):
+        FakeLLM(latency_distribution="bimodal")
+
+
+def test_async_call_sleeps_for_latency():
+    llm = FakeLLM(latency_ms=250)
+    with patch("libs.llm_service.fake.asyncio.sleep", new_callable=AsyncMock) as sleep:
+        asyncio.run(llm.agenerate_content("hello"))
+    sleep.assert_called_once_with(0.25)
+
+
+def test_failure_rate_raises_transient_errors():
+    llm = FakeLLM(failure_rate=0.3, seed=3)
+    failures = 0
+    for _ in range(1000):
+        try:
+            llm.generate_content("hello")
+        except FakeLLMError as e:
+            assert is_retryable(e)
+            failures += 1
+    assert 250 < failures < 350
+
+
+def test_factory_selects_fake_provider_from_env():
+    LLMFactory.reset_clients()
+    try:
+        with patch.dict(os.environ, {"LLM_PROVIDER": "fake", "LLM_MAX_RETRIES": "2"}):
+            llm = LLMFactory.get_llm()
+        assert isinstance(llm, ResilientLLM)
+        assert isinstance(llm.llm.llm, FakeLLM)
+        assert LLMFactory.get_llm(LLMProvider.FAKE) is llm
+    finally:
+        LLMFactory.reset_clients()
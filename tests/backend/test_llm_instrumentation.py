@@ -0,0 +1,141 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from libs.llm_service.base import BaseLLM
+from libs.llm_service.instrumentation import (
+    InstrumentedLLM,
+    get_usage_stats,
+    llm_operation,
+    llm_operation_scope,
+    report_usage,
+    usage_stats,
+)
+
+
+class ReportingLLM(BaseLLM):
+    """Reports provider token counts like GeminiLLM does."""
+
+    model_name = "test-model"
+
+    def generate_content(self, prompt: str) -> str:
+        report_usage(prompt_tokens=120, output_tokens=30)
+        return "answer"
+
+
+class EchoLLM(BaseLLM):
+    model_name = "echo-model"
+
+    def generate_content(self, prompt: str) -> str:
+        if prompt == "fail":
+            raise ConnectionError("down")
+        return prompt
+
+
+class Service:
+    def __init__(self, llm):
+        self.llm = llm
+
+    @llm_operation
+    def classify(self, text):
+        return self.llm.generate_content(text)
+
+    @llm_operation
+    async def aclassify(self, text):
+        return await self.llm.agenerate_content(text)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    usage_stats.reset()
+    yield
+    usage_stats.reset()
+
+
+def test_records_reported_usage_per_operation(capsys):
+    llm = InstrumentedLLM(ReportingLLM())
+    assert Service(llm).classify("prompt") == "answer"
+
+    stats = get_usage_stats()["test-model:classify"]
+    assert stats["calls"] == 1
+    assert stats["prompt_tokens"] == 120
+    assert stats["output_tokens"] == 30
+
+    log = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert log["event"] == "llm_call"
+    assert log["operation"] == "classify"
+    assert log["model"] == "test-model"
+    assert log["tokens_estimated"] is False
+
+
+def test_estimates_tokens_and_records_errors():
+    llm = InstrumentedLLM(EchoLLM())
+    with llm_operation_scope("batch"):
+        llm.generate_content("x" * 40)
+        with pytest.raises(ConnectionError):
+            llm.generate_content("fail")
+
+    stats = get_usage_stats()["echo-model:batch"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 1
+    assert stats["prompt_tokens"] == 11 + 2
+    assert stats["output_tokens"] == 11
+
+
+def test_async_calls_keep_their_operation():
+    llm = InstrumentedLLM(EchoLLM())
+    asyncio.run(Service(llm).aclassify("hello"))
+
+    assert get_usage_stats()["echo-model:aclassify"]["calls"] == 1
+
+
+def test_stream_records_one_call_after_the_last_chunk():
+    llm = InstrumentedLLM(EchoLLM())
+    with llm_operation_scope("essay"):
+        assert list(llm.stream_content("streamed text")) == ["streamed text"]
+
+    assert get_usage_stats()["echo-model:essay"]["calls"] == 1
+
+
+def test_usage_log_can_be_disabled(capsys):
+    with patch.dict("os.environ", {"LLM_USAGE_LOG": "false"}):
+        llm = InstrumentedLLM(EchoLLM())
+    llm.generate_content("quiet")
+    assert capsys.readouterr().out == ""
+
+
+@patch("libs.llm_service.gemini.genai.Client")
+def test_gemini_reports_usage_metadata(mock_client_class):
+    from libs.llm_service.gemini import GeminiLLM
+
+    response = MagicMock(text="Generated")
+    response.usage_metadata.prompt_token_count = 42
+    response.usage_metadata.candidates_token_count = 7
+    mock_client_class.return_value.models.generate_content.return_value = response
+
+    llm = InstrumentedLLM(GeminiLLM(api_key="test_key"))
+    llm.generate_content("prompt")
+
+    stats = get_usage_stats()["gemini-2.0-flash:unknown"]
+    assert stats["prompt_tokens"] == 42
+    assert stats["output_tokens"] == 7
+
+
+def test_exports_prometheus_metrics():
+    prometheus_client = pytest.importorskip("prometheus_client")
+
+    llm = InstrumentedLLM(EchoLLM())
+    with llm_operation_scope("metrics_test"):
+        llm.generate_content("x" * 40)
+
+    labels = {"model": "echo-model", "operation": "metrics_test"}
+    registry = prometheus_client.REGISTRY
+    assert (
+        registry.get_sample_value(
+            "llm_requests_total", {**labels, "outcome": "success"}
+        )
+        == 1
+    )
+    assert registry.get_sample_value("llm_prompt_tokens_total", labels) == 11
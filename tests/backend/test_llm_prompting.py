@@ -0,0 +1,184 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from libs.llm_service.cache import CachedLLM, LRUResponseCache
+from libs.llm_service.gemini import ContextCache, GeminiLLM
+from libs.llm_service.prompting import Prompt, PromptTemplate, compact_json
+from libs.llm_service.rate_limit import (
+    LocalTokenBucket,
+    Priority,
+    RateLimitedLLM,
+    RateLimiter,
+)
+from libs.processor_service import prompts
+
+
+def test_compact_json_has_no_padding():
+    value = {
+        "topics": [{"name": "Work", "emotions": ["Anxious", "Sad"]}],
+        "note": "café",
+    }
+    assert (
+        compact_json(value)
+        == '{"topics":[{"name":"Work","emotions":["Anxious","Sad"]}],"note":"café"}'
+    )
+
+
+def test_template_renders_like_str_format():
+    raw = """
+        Instructions with {{"literal": "braces"}}.
+
+        Thought: "{thought_content}" ({count:>3})
+    """
+    template = PromptTemplate(raw)
+    prompt = template.format(thought_content="I failed", count=7)
+
+    assert (
+        prompt
+        == 'Instructions with {"literal": "braces"}.\n\nThought: "I failed" (  7)\n'
+    )
+    assert (
+        prompt.static_prefix == 'Instructions with {"literal": "braces"}.\n\nThought: "'
+    )
+    assert prompt.dynamic_part == 'I failed" (  7)\n'
+    assert template.fields == {"thought_content", "count"}
+    with pytest.raises(KeyError):
+        template.format(thought_content="missing count")
+
+
+def test_template_rejects_positional_placeholders():
+    with pytest.raises(ValueError):
+        PromptTemplate("Thought: {}")
+
+
+def test_partial_moves_bound_values_into_the_static_prefix():
+    template = PromptTemplate("{instructions}\nOutput: {{{example}}}\nData: {data}\n")
+    bound = template.partial(instructions="Classify.", example='"A"')
+
+    assert bound.static_prefix == 'Classify.\nOutput: {"A"}\nData: '
+    assert bound.fields == {"data"}
+    assert bound.format(data="[1]") == template.format(
+        instructions="Classify.", example='"A"', data="[1]"
+    )
+    assert PromptTemplate(bound.template).format(data="[1]") == bound.format(data="[1]")
+
+
+def test_templates_keep_their_instructions_in_the_static_prefix():
+    assert "Known distortions" in prompts.COGNITIVE_DISTORTION_PROMPT.static_prefix
+    assert (
+        "Age-Based Communication Style"
+        in prompts.CONVERSATION_MESSAGE_GENERATION_PROMPT.static_prefix
+    )
+    for task, template in prompts.BATCH_CLASSIFICATION_PROMPTS.items():
+        instructions, output_example = prompts.BATCH_CLASSIFICATION_TASKS[task]
+        assert template.fields == {"thoughts_json"}
+        assert (
+            instructions in template.static_prefix
+            and output_example in template.static_prefix
+        )
+
+
+def test_wrappers_pass_the_prompt_object_through():
+    inner = MagicMock()
+    inner.model_name = "test-model"
+    inner.generate_content.return_value = "ok"
+    limiter = RateLimiter("test-model", LocalTokenBucket(), rpm=10, tpm=1_000_000)
+    llm = CachedLLM(
+        RateLimitedLLM(inner, limiter, Priority.BACKGROUND), LRUResponseCache()
+    )
+
+    prompt = PromptTemplate("Static part. {value}").format(value="dynamic")
+    llm.generate_content(prompt)
+
+    sent = inner.generate_content.call_args[0][0]
+    assert isinstance(sent, Prompt) and sent.static_prefix == "Static part. "
+
+
+@pytest.fixture
+def gemini_client():
+    with patch("libs.llm_service.gemini.genai.Client") as client_cls:
+        client = client_cls.return_value
+        client.models.generate_content.return_value = MagicMock(
+            text="answer", usage_metadata=None
+        )
+        client.caches.create.return_value = MagicMock()
+        client.caches.create.return_value.name = "cachedContents/abc"
+        yield client
+
+
+def _gemini(**env):
+    with patch.dict(os.environ, {"GEMINI_API_KEY": "key", **env}):
+        return GeminiLLM()
+
+
+def test_gemini_sends_cached_prefix_once(gemini_client):
+    llm = _gemini(GEMINI_CONTEXT_CACHE="true", GEMINI_CONTEXT_CACHE_MIN_TOKENS="10")
+    template = PromptTemplate("Long fixed instructions. " * 10 + "Thought: {thought}")
+
+    for thought in ("one", "two"):
+        assert llm.generate_content(template.format(thought=thought)) == "answer"
+
+    gemini_client.caches.create.assert_called_once()
+    config = gemini_client.caches.create.call_args.kwargs["config"]
+    assert config.system_instruction == template.static_prefix
+    call = gemini_client.models.generate_content.call_args.kwargs
+    assert call["contents"] == "two\n"
+    assert call["config"].cached_content == "cachedContents/abc"
+
+
+def test_gemini_sends_short_prefixes_and_plain_strings_inline(gemini_client):
+    llm = _gemini(GEMINI_CONTEXT_CACHE="true", GEMINI_CONTEXT_CACHE_MIN_TOKENS="4096")
+    llm.generate_content(PromptTemplate("Short. {thought}").format(thought="one"))
+    llm.generate_content("a plain string prompt")
+
+    gemini_client.caches.create.assert_not_called()
+    assert gemini_client.models.generate_content.call_args.kwargs == {
+        "model": "gemini-2.0-flash",
+        "contents": "a plain string prompt",
+    }
+
+
+def test_gemini_context_cache_is_off_by_default(gemini_client):
+    with patch.dict(os.environ, {"GEMINI_CONTEXT_CACHE": ""}):
+        llm = _gemini()
+    assert llm.context_cache is None
+
+
+def test_gemini_async_call_uses_cached_prefix(gemini_client):
+    gemini_client.aio.models.generate_content = AsyncMock(
+        return_value=MagicMock(text="answer", usage_metadata=None)
+    )
+    llm = _gemini(GEMINI_CONTEXT_CACHE="true", GEMINI_CONTEXT_CACHE_MIN_TOKENS="10")
+    prompt = PromptTemplate("Long fixed instructions. " * 10 + "{thought}").format(
+        thought="one"
+    )
+
+    assert asyncio.run(llm.agenerate_content(prompt)) == "answer"
+    call = gemini_client.aio.models.generate_content.call_args.kwargs
+    assert (
+        call["contents"] == "one\n"
+        and call["config"].cached_content == "cachedContents/abc"
+    )
+
+
+def test_context_cache_falls_back_inline_after_a_failed_upload():
+    client = MagicMock()
+    client.caches.create.side_effect = RuntimeError("minimum token count not met")
+    cache = ContextCache(client, "gemini-2.0-flash", min_tokens=1, ttl_seconds=3600)
+
+    assert cache.name_for("fixed instructions") is None
+    assert cache.name_for("fixed instructions") is None
+    client.caches.create.assert_called_once()
+
+
+def test_context_cache_renews_expiring_entries():
+    client = MagicMock()
+    cache = ContextCache(client, "gemini-2.0-flash", min_tokens=1, ttl_seconds=30)
+
+    cache.name_for("fixed instructions")
+    cache.name_for("fixed instructions")
+    # A TTL shorter than the renewal margin renews on every call.
+    assert client.caches.create.call_count == 2
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from libs.llm_service.base import BaseLLM
+from libs.llm_service.rate_limit import (
+    LocalTokenBucket,
+    Priority,
+    RateLimitedLLM,
+    RateLimiter,
+    RateLimitTimeout,
+    RedisTokenBucket,
+    model_limits,
+    with_rate_limit,
+)
+
+
+class EchoLLM(BaseLLM):
+    model_name = "test-model"
+
+    def generate_content(self, prompt: str) -> str:
+        return prompt
+
+
+def test_local_bucket_takes_until_empty_then_reports_wait():
+    bucket = LocalTokenBucket()
+    spec = [(2.0, 1.0, 1.0)]
+
+    assert bucket.try_acquire(["k"], spec, 0.0) == 0
+    assert bucket.try_acquire(["k"], spec, 0.0) == 0
+    wait = bucket.try_acquire(["k"], spec, 0.0)
+    assert 0 < wait <= 1.0
+
+
+def test_local_bucket_takes_from_all_buckets_or_none():
+    bucket = LocalTokenBucket()
+    specs = [(10.0, 1.0, 1.0), (5.0, 1.0, 5.0)]
+
+    assert bucket.try_acquire(["requests", "tokens"], specs, 0.0) == 0
+    assert bucket.try_acquire(["requests", "tokens"], specs, 0.0) > 0
+    # The request bucket was not charged for the refused call
+    assert bucket.try_acquire(["requests"], [(10.0, 1.0, 9.0)], 0.0) == 0
+
+
+def test_background_leaves_reserve_for_interactive():
+    limiter = RateLimiter("m", LocalTokenBucket(), rpm=10, tpm=1_000_000)
+
+    for _ in range(8):
+        assert limiter._try(1, Priority.BACKGROUND) == 0
+    # 20% of the request bucket is held back from background work
+    assert limiter._try(1, Priority.BACKGROUND) > 0
+    assert limiter._try(1, Priority.INTERACTIVE) == 0
+    assert limiter._try(1, Priority.INTERACTIVE) == 0
+
+
+@patch("libs.llm_service.rate_limit.time.sleep")
+def test_limiter_queues_instead_of_failing(mock_sleep):
+    backend = MagicMock()
+    backend.try_acquire.side_effect = [0.5, 0.25, 0]
+    limiter = RateLimiter("m", backend)
+
+    limiter.acquire(10)
+
+    assert backend.try_acquire.call_count == 3
+    assert mock_sleep.call_count == 2
+    assert mock_sleep.call_args_list[0][0][0] >= 0.5
+
+
+def test_limiter_gives_up_after_max_wait():
+    backend = MagicMock()
+    backend.try_acquire.return_value = 30.0
+    limiter = RateLimiter("m", backend, max_wait=5)
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(10)
+
+
+def test_rate_limited_llm_acquires_before_each_call():
+    limiter = MagicMock()
+    llm = RateLimitedLLM(EchoLLM(), limiter, Priority.INTERACTIVE)
+
+    assert llm.generate_content("x" * 40) == "x" * 40
+    limiter.acquire.assert_called_once_with(11, Priority.INTERACTIVE)
+
+
+def test_rate_limited_llm_async():
+    backend = LocalTokenBucket()
+    llm = RateLimitedLLM(EchoLLM(), RateLimiter("m", backend))
+
+    assert asyncio.run(llm.agenerate_content("hello")) == "hello"
+
+
+def test_rate_limited_llm_stream_acquires_once():
+    limiter = MagicMock()
+    llm = RateLimitedLLM(EchoLLM(), limiter, Priority.INTERACTIVE)
+
+    assert list(llm.stream_content("x" * 40)) == ["x" * 40]
+    limiter.acquire.assert_called_once_with(11, Priority.INTERACTIVE)
+
+
+def test_redis_bucket_falls_back_to_local_on_errors():
+    redis_conn = MagicMock()
+    script = MagicMock(side_effect=ConnectionError("down"))
+    redis_conn.register_script.return_value = script
+    bucket = RedisTokenBucket(redis_conn=redis_conn)
+
+    assert bucket.try_acquire(["k"], [(1.0, 1.0, 1.0)], 0.0) == 0
+    assert bucket.try_acquire(["k"], [(1.0, 1.0, 1.0)], 0.0) > 0
+    assert script.call_count == 2
+
+
+def test_redis_bucket_passes_specs_to_script():
+    redis_conn = MagicMock()
+    script = MagicMock(return_value=b"0.25")
+    redis_conn.register_script.return_value = script
+    bucket = RedisTokenBucket(redis_conn=redis_conn, prefix="p")
+
+    assert (
+        bucket.try_acquire(["a", "b"], [(60.0, 1.0, 1.0), (100.0, 2.0, 7.0)], 0.2)
+        == 0.25
+    )
+    script.assert_called_once_with(
+        keys=["p:a", "p:b"], args=[0.2, 60.0, 1.0, 1.0, 100.0, 2.0, 7.0]
+    )
+
+
+def test_model_limits_and_default_disabled():
+    env = {"LLM_RPM": "30", "LLM_RATE_LIMITS": '{"fast": {"rpm": 100, "tpm": 5000}}'}
+    with patch.dict(os.environ, env, clear=True):
+        assert model_limits("fast") == (100, 5000)
+        assert model_limits("other") == (30, 1_000_000)
+
+        llm = EchoLLM()
+        assert with_rate_limit(llm) is llm
+        assert isinstance(with_rate_limit(llm, backend="memory"), RateLimitedLLM)
@@ -0,0 +1,235 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from libs.llm_service.base import BaseLLM
+from libs.llm_service.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientLLM,
+    is_retryable,
+    retry_after,
+    with_retries,
+)
+
+
+class APIError(Exception):
+    def __init__(self, code, details=None, headers=None):
+        super().__init__(f"{code} error")
+        self.code = code
+        self.details = details
+        self.response = MagicMock(headers=headers or {})
+
+
+class FlakyLLM(BaseLLM):
+    model_name = "test-model"
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt: str) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def agenerate_content(self, prompt: str) -> str:
+        return self.generate_content(prompt)
+
+
+@pytest.fixture
+def no_sleep():
+    with patch("libs.llm_service.resilience.time.sleep") as sleep:
+        yield sleep
+
+
+def test_is_retryable_classifies_errors():
+    assert is_retryable(APIError(429))
+    assert is_retryable(APIError(503))
+    assert is_retryable(ConnectionError())
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(APIError(400))
+    assert not is_retryable(APIError(403))
+    assert not is_retryable(ValueError("bad json"))
+
+
+def test_retry_after_reads_header_and_gemini_retry_info():
+    assert retry_after(APIError(429, headers={"retry-after": "7"})) == 7.0
+    details = {
+        "error": {
+            "code": 429,
+            "details": [
+                {
+                    "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                    "retryDelay": "12s",
+                }
+            ],
+        }
+    }
+    assert retry_after(APIError(429, details=details)) == 12.0
+    assert retry_after(APIError(503)) is None
+
+
+def test_retries_transient_errors_until_success(no_sleep):
+    llm = FlakyLLM([APIError(503), ConnectionError()])
+    resilient = ResilientLLM(llm, max_retries=3)
+
+    assert resilient.generate_content("p") == "ok"
+    assert llm.calls == 3
+    assert no_sleep.call_count == 2
+    stats = resilient.metrics.stats()
+    assert stats["attempts"] == 3
+    assert stats["retries"] == 2
+    assert stats["retries_503"] == 1
+    assert stats["succeeded"] == 1
+
+
+def test_does_not_retry_permanent_errors(no_sleep):
+    llm = FlakyLLM([APIError(400)])
+    resilient = ResilientLLM(llm, max_retries=3)
+
+    with pytest.raises(APIError):
+        resilient.generate_content("p")
+    assert llm.calls == 1
+    no_sleep.assert_not_called()
+    assert resilient.metrics.stats()["failed"] == 1
+
+
+def test_gives_up_after_max_retries(no_sleep):
+    llm = FlakyLLM([APIError(500)] * 5)
+    resilient = ResilientLLM(llm, max_retries=2)
+
+    with pytest.raises(APIError):
+        resilient.generate_content("p")
+    assert llm.calls == 3
+
+
+def test_backoff_never_shorter_than_retry_after(no_sleep):
+    llm = FlakyLLM([APIError(429, headers={"retry-after": "20"})])
+    resilient = ResilientLLM(llm, max_retries=1, base_delay=1.0, max_delay=2.0)
+
+    resilient.generate_content("p")
+    assert no_sleep.call_args[0][0] == 20.0
+
+
+def test_backoff_is_capped_exponential_with_jitter(no_sleep):
+    llm = FlakyLLM([APIError(503)] * 4)
+    resilient = ResilientLLM(llm, max_retries=4, base_delay=1.0, max_delay=3.0)
+
+    with patch(
+        "libs.llm_service.resilience.random.uniform", side_effect=lambda a, b: b
+    ):
+        resilient.generate_content("p")
+    assert [c[0][0] for c in no_sleep.call_args_list] == [1.0, 2.0, 3.0, 3.0]
+
+
+def test_circuit_opens_after_threshold_and_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    with patch("libs.llm_service.resilience.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.before_call() == 10.0
+
+    with patch("libs.llm_service.resilience.time.monotonic", return_value=111.0):
+        # One trial call goes through; others wait for its outcome.
+        assert breaker.before_call() == 0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.before_call() > 0
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics.stats()["circuit_opened"] == 2
+
+
+def test_open_circuit_waits_then_calls(no_sleep):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    llm = FlakyLLM([])
+    resilient = ResilientLLM(llm, breaker=breaker)
+
+    clock = iter([0.0, 0.0, 0.0, 10.0, 10.0, 10.0])
+    with patch(
+        "libs.llm_service.resilience.time.monotonic", side_effect=lambda: next(clock)
+    ):
+        breaker.opened_at = 0.0
+        assert resilient.generate_content("p") == "ok"
+    no_sleep.assert_called_once()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_raises_when_wait_exceeds_limit(no_sleep):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=600)
+    breaker.record_failure()
+    llm = FlakyLLM([])
+    resilient = ResilientLLM(llm, breaker=breaker, max_circuit_wait=60)
+
+    with pytest.raises(CircuitOpenError):
+        resilient.generate_content("p")
+    assert llm.calls == 0
+
+
+def test_async_retries_transient_errors():
+    llm = FlakyLLM([APIError(502)])
+    resilient = ResilientLLM(llm, max_retries=2)
+
+    with patch(
+        "libs.llm_service.resilience.asyncio.sleep", new_callable=AsyncMock
+    ) as sleep:
+        assert asyncio.run(resilient.agenerate_content("p")) == "ok"
+    assert llm.calls == 2
+    sleep.assert_called_once()
+
+
+def test_with_retries_configured_from_env():
+    llm = FlakyLLM([])
+    with patch.dict(os.environ, {"LLM_MAX_RETRIES": "0"}):
+        assert with_retries(llm) is llm
+
+    with patch.dict(os.environ, {"LLM_MAX_RETRIES": "5"}):
+        wrapped = with_retries(llm)
+    assert isinstance(wrapped, ResilientLLM)
+    assert wrapped.max_retries == 5
+    assert wrapped.model_name == "test-model"
+    # Every client of a model shares one breaker.
+    assert with_retries(llm).breaker is wrapped.breaker
+
+
+class FlakyStreamLLM(FlakyLLM):
+    def __init__(self, errors, fail_after_first=False):
+        super().__init__(errors)
+        self.fail_after_first = fail_after_first
+
+    def stream_content(self, prompt: str):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        yield "a"
+        if self.fail_after_first:
+            raise APIError(503)
+        yield "b"
+
+
+def test_stream_retries_until_first_chunk(no_sleep):
+    llm = FlakyStreamLLM([APIError(503)])
+    resilient = ResilientLLM(llm, max_retries=2)
+
+    assert list(resilient.stream_content("p")) == ["a", "b"]
+    assert llm.calls == 2
+
+
+def test_stream_does_not_retry_after_output_started(no_sleep):
+    llm = FlakyStreamLLM([], fail_after_first=True)
+    resilient = ResilientLLM(llm, max_retries=2)
+
+    chunks = resilient.stream_content("p")
+    assert next(chunks) == "a"
+    with pytest.raises(APIError):
+        next(chunks)
+    assert llm.calls == 1
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Iterator, List
+from unittest.mock import patch
+
+import pytest
+
+from libs.llm_service.base import BaseLLM
+from libs.llm_service.instrumentation import _operation, llm_operation_scope
+from libs.llm_service.routing import (
+    LatencyTracker,
+    RoutedLLM,
+    TaskType,
+    task_models,
+    with_routing,
+)
+
+
+class TransientError(Exception):
+    code = 503
+
+
+class BadRequestError(Exception):
+    code = 400
+
+
+class ScriptedLLM(BaseLLM):
+    """Answers call n after delays[n] seconds (the last delay repeats)."""
+
+    def __init__(self, name: str, delays: List[float], error: Exception = None):
+        self.model_name = name
+        self.delays = delays
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.operations = []
+        self._lock = threading.Lock()
+
+    def _next_delay(self) -> float:
+        with self._lock:
+            delay = self.delays[min(self.calls, len(self.delays) - 1)]
+            self.calls += 1
+            self.operations.append(_operation.get())
+            return delay
+
+    def generate_content(self, prompt: str) -> str:
+        time.sleep(self._next_delay())
+        if self.error:
+            raise self.error
+        return f"{self.model_name}:{self.calls}"
+
+    async def agenerate_content(self, prompt: str) -> str:
+        try:
+            await asyncio.sleep(self._next_delay())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.model_name}:{self.calls}"
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        time.sleep(self._next_delay())
+        yield f"{self.model_name}:first"
+        yield ":rest"
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    llm = ScriptedLLM("hedge-primary", [0.5, 0.01])
+    routed = RoutedLLM([llm], hedge_after=0.05, hedge_budget=1.0, tier_timeout=None)
+
+    started = time.monotonic()
+    assert routed.generate_content("p") == "hedge-primary:2"
+    assert time.monotonic() - started < 0.4
+    assert llm.calls == 2
+    assert (
+        routed.metrics.stats()["hedges"] >= 1
+        and routed.metrics.stats()["hedge_wins"] >= 1
+    )
+
+
+def test_single_hedged_tier_is_hedged():
+    llm = ScriptedLLM("hedge-single", [0.5, 0.01])
+    env = {
+        "LLM_HEDGE_TASKS": "generation",
+        "LLM_HEDGE_AFTER_SECONDS": "0.05",
+        "LLM_HEDGE_BUDGET": "1.0",
+    }
+    with patch.dict(os.environ, env):
+        routed = with_routing([llm], TaskType.GENERATION)
+
+    started = time.monotonic()
+    assert routed.generate_content("p") == "hedge-single:2"
+    assert time.monotonic() - started < 0.4
+    assert llm.calls == 2
+
+
+def test_hedge_budget_limits_duplicates():
+    llm = ScriptedLLM("hedge-budget", [0.1])
+    routed = RoutedLLM([llm], hedge_after=0.01, hedge_budget=0.0, tier_timeout=None)
+
+    for _ in range(3):
+        routed.generate_content("p")
+    # The budget always allows one hedge, then none at a 0% ratio.
+    assert llm.calls == 4
+
+
+def test_hedge_delay_follows_observed_percentile():
+    tracker = LatencyTracker()
+    assert tracker.percentile(0.95) is None
+    for i in range(100):
+        tracker.record(i / 100)
+    assert tracker.percentile(0.95) == pytest.approx(0.95)
+
+    routed = RoutedLLM([ScriptedLLM("hedge-delay", [0])], hedge_min=0.5)
+    # No hedge until the tier has enough latency samples
+    assert routed._hedge_delay(0) is None
+    routed.latencies[0] = tracker
+    assert routed._hedge_delay(0) == pytest.approx(0.95)
+    assert (
+        RoutedLLM([ScriptedLLM("hedge-delay", [0])], hedge=False)._hedge_delay(0)
+        is None
+    )
+
+
+def test_timeout_falls_back_to_next_tier():
+    primary = ScriptedLLM("timeout-primary", [1.0])
+    fallback = ScriptedLLM("timeout-fallback", [0])
+    routed = RoutedLLM([primary, fallback], hedge=False, tier_timeout=0.05)
+
+    started = time.monotonic()
+    assert routed.generate_content("p") == "timeout-fallback:1"
+    assert time.monotonic() - started < 0.5
+    assert routed.metrics.stats() == {"timeouts": 1, "fallbacks": 1}
+
+
+def test_transient_errors_fall_back_and_client_errors_do_not():
+    fallback = ScriptedLLM("error-fallback", [0])
+    routed = RoutedLLM(
+        [ScriptedLLM("transient", [0], TransientError()), fallback], hedge=False
+    )
+    assert routed.generate_content("p") == "error-fallback:1"
+
+    routed = RoutedLLM(
+        [ScriptedLLM("bad-request", [0], BadRequestError()), fallback], hedge=False
+    )
+    with pytest.raises(BadRequestError):
+        routed.generate_content("p")
+    # The last tier's errors are raised as they are.
+    with pytest.raises(TransientError):
+        RoutedLLM(
+            [ScriptedLLM("last", [0], TransientError())], hedge=False
+        ).generate_content("p")
+
+
+def test_async_hedge_cancels_the_losing_call():
+    llm = ScriptedLLM("async-hedge", [1.0, 0.01])
+    routed = RoutedLLM([llm], hedge_after=0.05, hedge_budget=1.0, tier_timeout=None)
+
+    assert asyncio.run(routed.agenerate_content("p")) == "async-hedge:2"
+    assert llm.cancelled == 1
+
+
+def test_async_timeout_falls_back():
+    primary = ScriptedLLM("async-primary", [1.0])
+    routed = RoutedLLM(
+        [primary, ScriptedLLM("async-fallback", [0])], hedge=False, tier_timeout=0.05
+    )
+
+    assert asyncio.run(routed.agenerate_content("p")) == "async-fallback:1"
+    assert primary.cancelled == 1
+
+
+def test_stream_is_hedged_on_first_chunk():
+    llm = ScriptedLLM("stream-hedge", [0.5, 0.01])
+    routed = RoutedLLM([llm], hedge_after=0.05, hedge_budget=1.0, tier_timeout=None)
+
+    assert "".join(routed.stream_content("p")) == "stream-hedge:first:rest"
+    assert llm.calls == 2
+
+
+def test_losing_stream_is_closed():
+    closed = []
+
+    class ClosingLLM(ScriptedLLM):
+        def stream_content(self, prompt: str) -> Iterator[str]:
+            call = self.calls + 1
+            try:
+                yield from super().stream_content(prompt)
+            finally:
+                closed.append(call)
+
+    llm = ClosingLLM("stream-close", [0.3, 0.01])
+    routed = RoutedLLM([llm], hedge_after=0.05, hedge_budget=1.0, tier_timeout=None)
+
+    chunks = routed.stream_content("p")
+    assert next(chunks) == "stream-close:first"
+    # The slow first call answers after the hedge won and is closed unread
+    deadline = time.monotonic() + 2
+    while closed != [1] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert closed == [1]
+    chunks.close()
+    assert closed == [1, 2]
+
+
+def test_operation_is_kept_in_pool_threads():
+    llm = ScriptedLLM("operation", [0])
+    with llm_operation_scope("generate_essay"):
+        RoutedLLM([llm], hedge=False).generate_content("p")
+    assert llm.operations == ["generate_essay"]
+
+
+def test_task_models_and_with_routing_read_env():
+    env = {
+        "LLM_MODEL_ROUTES": '{"generation": "gemini-2.5-flash"}',
+        "LLM_FALLBACK_MODELS": json.dumps(
+            {"generation": ["gemini-2.5-flash", "gemini-2.0-flash-lite"]}
+        ),
+        "LLM_HEDGE_TASKS": "generation",
+    }
+    with patch.dict(os.environ, env):
+        assert task_models(TaskType.GENERATION) == [
+            "gemini-2.5-flash",
+            "gemini-2.0-flash-lite",
+        ]
+        assert task_models(TaskType.CLASSIFICATION) == [None]
+
+        single = ScriptedLLM("single", [0])
+        assert with_routing([single], TaskType.CLASSIFICATION) is single
+        hedged = with_routing([single], TaskType.GENERATION)
+        assert isinstance(hedged, RoutedLLM) and hedged.hedge
+        assert hedged.tiers == [single]
+        routed = with_routing(
+            [single, ScriptedLLM("fallback", [0])], TaskType.GENERATION
+        )
+        assert (
+            isinstance(routed, RoutedLLM)
+            and routed.hedge
+            and routed.hedge_after is None
+        )
+
+    # Hedging is opt-in
+    with patch.dict(os.environ, {}, clear=True):
+        routed = with_routing(
+            [ScriptedLLM("a", [0]), ScriptedLLM("b", [0])], TaskType.GENERATION
+        )
+        assert not routed.hedge
+
+    with patch.dict(os.environ, {"LLM_MODEL_ROUTES": "not json"}):
+        assert task_models(TaskType.GENERATION) == [None]
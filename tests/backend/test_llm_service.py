@@ -38,3 +38,117 @@ def test_gemini_llm_generate_content(mock_client_class):
     
     assert result == "Generated text"
     mock_client.models.generate_content.assert_called_once_with(model="gemini-2.0-flash", contents="prompt")
+
+@patch("libs.llm_service.gemini.genai.Client")
+def test_gemini_llm_agenerate_content(mock_client_class):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.text = "Generated text"
+    mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+    mock_client_class.return_value = mock_client
+
+    llm = GeminiLLM(api_key="test_key")
+    result = asyncio.run(llm.agenerate_content("prompt"))
+
+    assert result == "Generated text"
+    mock_client.aio.models.generate_content.assert_awaited_once_with(
+        model="gemini-2.0-flash", contents="prompt"
+    )
+
+
+def test_base_llm_agenerate_content_defaults_to_sync():
+    import asyncio
+
+    assert asyncio.run(DummyLLM().agenerate_content("test")) == "Dummy response"
+
+
+@patch("libs.llm_service.gemini.genai.Client")
+def test_factory_reuses_client_per_process(mock_client_class):
+    from libs.llm_service.factory import LLMFactory
+
+    LLMFactory.reset_clients()
+    try:
+        first = LLMFactory.get_llm(api_key="test_key")
+        assert LLMFactory.get_llm(api_key="test_key") is first
+        assert LLMFactory.get_llm(api_key="other_key") is not first
+        assert mock_client_class.call_count == 2
+    finally:
+        LLMFactory.reset_clients()
+
+
+@patch("libs.llm_service.gemini.genai.Client")
+def test_factory_builds_new_clients_after_fork(mock_client_class):
+    from libs.llm_service.factory import LLMFactory
+
+    LLMFactory.reset_clients()
+    try:
+        first = LLMFactory.get_llm(api_key="test_key")
+        # A forked child sees a different pid and must not reuse the parent's client.
+        with patch("libs.llm_service.factory.os.getpid", return_value=-1):
+            assert LLMFactory.get_llm(api_key="test_key") is not first
+    finally:
+        LLMFactory.reset_clients()
+
+
+def test_factory_meters_every_retry_attempt():
+    from libs.llm_service.factory import LLMFactory, LLMProvider
+    from libs.llm_service.rate_limit import Priority, RateLimitedLLM
+    from libs.llm_service.resilience import ResilientLLM
+
+    env = {"LLM_RATE_LIMIT_BACKEND": "memory", "LLM_RETRY_BASE_SECONDS": "0"}
+    LLMFactory.reset_clients()
+    try:
+        with patch.dict("os.environ", env):
+            llm = LLMFactory.get_llm(LLMProvider.FAKE, priority=Priority.INTERACTIVE)
+            background = LLMFactory.get_llm(LLMProvider.FAKE)
+        assert isinstance(llm, ResilientLLM) and isinstance(llm.llm, RateLimitedLLM)
+        assert llm.llm.priority == Priority.INTERACTIVE
+        # Both priorities share one provider client
+        assert background is not llm and background.llm.llm is llm.llm.llm
+
+        limiter = llm.llm.limiter
+        with (
+            patch.object(limiter, "acquire", wraps=limiter.acquire) as acquire,
+            patch.object(
+                llm.llm.llm,
+                "generate_content",
+                side_effect=[ConnectionError("reset"), "ok"],
+            ),
+        ):
+            assert llm.generate_content("prompt") == "ok"
+        assert acquire.call_count == 2
+    finally:
+        LLMFactory.reset_clients()
+
+
+@patch("libs.db_service.persona_service.LLMFactory")
+def test_persona_profile_uses_shared_llm(mock_factory):
+    from libs.db_service.persona_service import PersonaService
+
+    mock_factory.get_llm.return_value.generate_content.return_value = '{"topics": []}'
+    assert PersonaService._generate_profile_from_thoughts(["a thought"]) == {
+        "topics": []
+    }
+    mock_factory.get_llm.assert_called_once_with()
+
+
+def test_base_llm_stream_content_defaults_to_single_chunk():
+    assert list(DummyLLM().stream_content("test")) == ["Dummy response"]
+
+
+@patch("libs.llm_service.gemini.genai.Client")
+def test_gemini_llm_stream_content(mock_client_class):
+    mock_client = MagicMock()
+    mock_client.models.generate_content_stream.return_value = iter(
+        [MagicMock(text="Gen"), MagicMock(text=None), MagicMock(text="erated")]
+    )
+    mock_client_class.return_value = mock_client
+
+    llm = GeminiLLM(api_key="test_key")
+    assert list(llm.stream_content("prompt")) == ["Gen", "erated"]
+    mock_client.models.generate_content_stream.assert_called_once_with(
+        model="gemini-2.0-flash", contents="prompt"
+    )
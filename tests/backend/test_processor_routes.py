@@ -1,6 +1,6 @@
 from fastapi.testclient import TestClient
 from backend.main import app
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 client = TestClient(app)
 
@@ -44,3 +44,40 @@ def test_get_essay_status(mock_queue):
         "result": "Essay text result",
         "error": None
     }
+
+@patch("backend.routers.processor_routes.AsyncGenerationStream")
+@patch("backend.routers.processor_routes.Queue")
+def test_stream_essay_replays_events_until_done(mock_queue, mock_stream_cls):
+    mock_job = MagicMock()
+    mock_job.id = "test_job_id"
+    mock_queue.return_value.fetch_job.return_value = mock_job
+    mock_stream_cls.return_value.read = AsyncMock(return_value=[
+        ("1-0", "chunk", {"text": "Once "}),
+        ("2-0", "chunk", {"text": "upon"}),
+        ("3-0", "done", {"result": "Once upon"}),
+    ])
+
+    response = client.get("/essay/stream/test_job_id", headers={"Last-Event-ID": "0-5"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert 'id: 1-0\nevent: chunk\ndata: {"text": "Once "}' in response.text
+    assert 'event: done\ndata: {"result": "Once upon"}' in response.text
+    mock_stream_cls.return_value.read.assert_called_once_with("0-5", block_ms=5000)
+
+@patch("backend.routers.processor_routes.AsyncGenerationStream")
+@patch("backend.routers.processor_routes.Queue")
+def test_stream_essay_falls_back_to_finished_job_result(mock_queue, mock_stream_cls):
+    mock_job = MagicMock()
+    mock_job.get_status.return_value = "finished"
+    mock_job.result = "Full essay"
+    mock_queue.return_value.fetch_job.return_value = mock_job
+    mock_stream_cls.return_value.read = AsyncMock(return_value=[])
+
+    response = client.get("/essay/stream/test_job_id")
+    assert 'event: done\ndata: {"result": "Full essay"}' in response.text
+
+@patch("backend.routers.processor_routes.Queue")
+def test_stream_essay_job_not_found(mock_queue):
+    mock_queue.return_value.fetch_job.return_value = None
+    response = client.get("/essay/stream/missing")
+    assert response.status_code == 404
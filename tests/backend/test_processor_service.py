@@ -1,13 +1,41 @@
-import pytest
-from unittest.mock import patch, MagicMock
+import json
+from unittest.mock import MagicMock, patch
+
+from libs.llm_service import Priority
 from libs.processor_service.service import ProcessorService
 
+
 @patch("libs.processor_service.service.LLMFactory.get_llm")
 def test_processor_service_init(mock_get_llm):
     mock_llm = MagicMock()
     mock_get_llm.return_value = mock_llm
     service = ProcessorService()
+    # A single tier per task is used as it is, without routing or hedging.
     assert service.llm == mock_llm
+    assert service.analysis_llm == mock_llm
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_processor_service_routes_models_per_task(mock_get_llm):
+    import os
+
+    routes = {
+        "LLM_MODEL_ROUTES": json.dumps(
+            {
+                "classification": "gemini-2.0-flash-lite",
+                "generation": "gemini-2.5-flash",
+            }
+        ),
+        "LLM_FALLBACK_MODELS": '{"generation": ["gemini-2.0-flash"]}',
+    }
+    with patch.dict(os.environ, routes):
+        service = ProcessorService()
+
+    assert [c.kwargs for c in mock_get_llm.call_args_list] == [
+        {"priority": Priority.INTERACTIVE, "model_name": "gemini-2.5-flash"},
+        {"priority": Priority.INTERACTIVE, "model_name": "gemini-2.0-flash"},
+        {"priority": Priority.BACKGROUND, "model_name": "gemini-2.0-flash-lite"},
+    ]
+    assert len(service.llm.tiers) == 2
 
 def test_parse_list_output():
     service = ProcessorService()
@@ -59,3 +87,241 @@ def test_generate_conversation_message(mock_get_llm):
     
     assert result == ["Hello"]
     mock_llm.generate_content.assert_called_once()
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_async_analysis_methods(mock_get_llm):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    mock_llm = MagicMock()
+    mock_llm.agenerate_content = AsyncMock(
+        side_effect=['["Distortion1"]', '"Ruminative thinking"', "Deliberate"]
+    )
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    assert asyncio.run(service.aanalyze_cognitive_distortions("thought")) == [
+        "Distortion1"
+    ]
+    assert asyncio.run(service.aanalyze_action_orientation("thought")) == "Ruminative"
+    assert asyncio.run(service.aanalyze_thought_type("thought")) == "Deliberate"
+    mock_llm.generate_content.assert_not_called()
+
+
+def test_gather_bounded_limits_concurrency_and_keeps_order():
+    import asyncio
+
+    from libs.processor_service.concurrency import gather_bounded
+
+    in_flight = 0
+    peak = 0
+
+    async def call(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if i == 3:
+            raise RuntimeError("boom")
+        return i
+
+    factories = [lambda i=i: call(i) for i in range(10)]
+    results = asyncio.run(gather_bounded(factories, limit=4))
+
+    assert peak == 4
+    assert results[:3] == [0, 1, 2]
+    assert isinstance(results[3], RuntimeError)
+    assert results[4:] == [4, 5, 6, 7, 8, 9]
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_analyze_thought_single_call(mock_get_llm):
+    mock_llm = MagicMock()
+    mock_llm.generate_content.return_value = (
+        '```json\n{"distortions": ["Labeling"], "emotions": ["Sad"], '
+        '"action_orientation": "Ruminative", "thought_type": "Automatic", '
+        '"topics": ["Work", "Family", "Health", "Money"]}\n```'
+    )
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    result = service.analyze_thought("I always fail")
+
+    assert result == {
+        "distortions": ["Labeling"],
+        "emotions": ["Sad"],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": ["Work", "Family", "Health"],
+    }
+    mock_llm.generate_content.assert_called_once()
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_analyze_thought_falls_back_for_invalid_fields(mock_get_llm):
+    mock_llm = MagicMock()
+    mock_llm.generate_content.side_effect = [
+        '{"distortions": [], "emotions": "Sad", "action_orientation": "Maybe", '
+        '"thought_type": "Deliberate", "topics": ["Work"]}',
+        '["Sad"]',
+        "Action-oriented",
+    ]
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    result = service.analyze_thought("I will fix it")
+
+    assert result["emotions"] == ["Sad"]
+    assert result["action_orientation"] == "Action-oriented"
+    assert result["thought_type"] == "Deliberate"
+    assert mock_llm.generate_content.call_count == 3
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_aanalyze_thought_falls_back_concurrently(mock_get_llm):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    mock_llm = MagicMock()
+    mock_llm.agenerate_content = AsyncMock(
+        side_effect=["not json", '["x"]', '["y"]', "Ruminative", "Automatic", '["z"]']
+    )
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    result = asyncio.run(service.aanalyze_thought("thought"))
+
+    assert result == {
+        "distortions": ["x"],
+        "emotions": ["y"],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": ["z"],
+    }
+    assert mock_llm.agenerate_content.await_count == 6
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_sentiment_batch_uses_keyed_response_and_falls_back(mock_get_llm):
+    import json
+
+    mock_llm = MagicMock()
+    mock_llm.generate_content.side_effect = [
+        json.dumps({"1": ["Sad"], "2": "Happy", "4": ["Angry"]}),
+        '["Happy"]',
+        '["Neutral"]',
+    ]
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    result = service.analyze_sentiment_batch({1: "I lost", 2: "I won", 3: "It rained"})
+
+    assert result == {1: ["Sad"], 2: ["Happy"], 3: ["Neutral"]}
+    batch_prompt = mock_llm.generate_content.call_args_list[0][0][0]
+    assert '{"id":"1","thought":"I lost"}' in batch_prompt
+    # One batch call plus one single-thought call for each malformed or missing entry
+    assert mock_llm.generate_content.call_count == 3
+
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_thoughts_batch_fills_invalid_fields(mock_get_llm):
+    import json
+
+    full = {"distortions": [], "emotions": ["Sad"], "action_orientation": "Ruminative",
+            "thought_type": "Automatic", "topics": ["Work"]}
+    partial = dict(full, thought_type="Sometimes")
+    mock_llm = MagicMock()
+    mock_llm.generate_content.side_effect = [
+        json.dumps({"a": full, "b": partial}),
+        "Deliberate",
+    ]
+    mock_get_llm.return_value = mock_llm
+    service = ProcessorService()
+
+    result = service.analyze_thoughts_batch({"a": "first", "b": "second"})
+
+    assert result["a"] == full
+    assert result["b"] == dict(full, thought_type="Deliberate")
+    assert mock_llm.generate_content.call_count == 2
+
+
+@patch("libs.processor_service.service.MAX_BATCH_SIZE", 100)
+@patch("libs.processor_service.service.BATCH_TOKEN_BUDGET", 600)
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_batches_follow_token_budget(mock_get_llm):
+    service = ProcessorService()
+    items = [(str(i), "word " * 100) for i in range(6)]
+
+    batches = service._plan_batches("emotions", items)
+
+    assert len(batches) > 1
+    assert [item for batch in batches for item in batch] == items
+    assert all(len(batch) >= 1 for batch in batches)
+    # A single oversized thought still gets a batch of its own
+    assert service._plan_batches("emotions", [("x", "word " * 5000)]) == [
+        [("x", "word " * 5000)]
+    ]
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_essay_completion_streams_chunks(mock_get_llm):
+    mock_llm = MagicMock()
+    mock_llm.stream_content.return_value = iter(["Once ", "upon ", "a time"])
+    mock_get_llm.return_value = mock_llm
+
+    service = ProcessorService()
+    chunks = []
+    result = service.complete_essay_with_profile(
+        "start", "details", ["joy"], on_chunk=chunks.append
+    )
+
+    assert result == "Once upon a time"
+    assert chunks == ["Once ", "upon ", "a time"]
+    mock_llm.generate_content.assert_not_called()
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_conversation_message_streams_raw_output_and_parses_it(mock_get_llm):
+    mock_llm = MagicMock()
+    mock_llm.stream_content.return_value = iter(
+        ['{"messages": [{"content": ', '"Hi"}]}']
+    )
+    mock_get_llm.return_value = mock_llm
+
+    service = ProcessorService()
+    chunks = []
+    result = service.generate_conversation_message(
+        "Name", 30, "male", {}, "Context", [], "None", on_chunk=chunks.append
+    )
+
+    assert result == ["Hi"]
+    assert len(chunks) == 2
+
+@patch("libs.processor_service.service.LLMFactory.get_llm")
+def test_only_valid_classifications_are_cacheable(mock_get_llm):
+    service = ProcessorService()
+    complete = json.dumps(
+        {
+            "distortions": [],
+            "emotions": ["calm"],
+            "action_orientation": "Ruminative",
+            "thought_type": "Automatic",
+            "topics": ["work"],
+        }
+    )
+
+    assert service._is_valid_classification('```json\n["Catastrophizing"]\n```')
+    assert service._is_valid_classification('"Deliberate"')
+    assert service._is_valid_classification(complete)
+    assert service._is_valid_classification('{"1": ["sad"], "2": []}')
+    assert service._is_valid_classification('{"7": ' + complete + '}')
+
+    assert not service._is_valid_classification("I cannot classify this.")
+    assert not service._is_valid_classification('["sad", 3]')
+    assert not service._is_valid_classification(
+        '{"emotions": ["calm"], "thought_type": "Sometimes"}'
+    )
+    assert not service._is_valid_classification(
+        '{"1": ["sad"], "2": {"emotions": ["calm"]}}'
+    )
+    assert not service._is_valid_classification('{"distortions": [')
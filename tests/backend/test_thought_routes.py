@@ -19,24 +19,74 @@ class MockThought:
 
 mock_thought = MockThought()
 
-@patch("backend.routers.thought_routes.Queue")
+@patch("libs.events.jobs.enqueue_jobs")
 @patch("backend.routers.thought_routes.ThoughtService.create_thought")
-def test_create_thought(mock_create, mock_queue):
+def test_create_thought(mock_create, mock_enqueue_jobs):
     mock_create.return_value = mock_thought
-    mock_q_instance = MagicMock()
-    mock_queue.return_value = mock_q_instance
     
     response = client.post("/thoughts/", json={"persona_id": 1, "content": "Test thought"})
     assert response.status_code == 200
     assert response.json()["id"] == 1
-    assert mock_q_instance.enqueue.called
+    # The jobs of every dimension are sent in one pipelined call
+    mock_enqueue_jobs.assert_called_once()
+    assert len(mock_enqueue_jobs.call_args[0][0]) == 5
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "fused"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("backend.routers.thought_routes.ThoughtService.create_thought")
+def test_create_thought_fused_analysis(mock_create, mock_enqueue_jobs):
+    mock_create.return_value = mock_thought
+
+    response = client.post(
+        "/thoughts/", json={"persona_id": 1, "content": "Test thought"}
+    )
+    assert response.status_code == 200
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thought", (1,))
+    ]
+
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "batch"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("backend.routers.thought_routes.ThoughtService.create_thought")
+def test_create_thought_batch_mode_runs_fused(mock_create, mock_enqueue_jobs):
+    mock_create.return_value = mock_thought
+
+    response = client.post(
+        "/thoughts/", json={"persona_id": 1, "content": "Test thought"}
+    )
+    assert response.status_code == 200
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thought", (1,))
+    ]
+
 
 @patch("backend.routers.thought_routes.ThoughtService.list_thoughts")
 def test_list_thoughts(mock_list):
-    mock_list.return_value = {"total": 1, "items": [mock_thought]}
+    mock_list.return_value = {"total": 1, "items": [mock_thought], "next_cursor": None}
     response = client.get("/thoughts/?persona_id=1")
     assert response.status_code == 200
     assert len(response.json()["items"]) == 1
+    assert response.json()["next_cursor"] is None
+
+
+@patch("backend.routers.thought_routes.ThoughtService.list_thoughts")
+def test_list_thoughts_with_cursor(mock_list):
+    mock_list.return_value = {
+        "total": None,
+        "items": [mock_thought],
+        "next_cursor": "abc",
+    }
+    response = client.get("/thoughts/?cursor=xyz&include_total=false&limit=20")
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "abc"
+    assert mock_list.call_args.kwargs["cursor"] == "xyz"
+    assert mock_list.call_args.kwargs["include_total"] is False
+
+    mock_list.side_effect = ValueError("Invalid cursor: xyz")
+    assert client.get("/thoughts/?cursor=xyz").status_code == 400
+    assert client.get("/thoughts/?limit=100000").status_code == 422
+
 
 @patch("backend.routers.thought_routes.ThoughtService.update_thought")
 def test_update_thought(mock_update):
@@ -44,12 +94,14 @@ def test_update_thought(mock_update):
     response = client.put("/thoughts/1", json={"status": "completed"})
     assert response.status_code == 200
 
+
 @patch("backend.routers.thought_routes.ThoughtService.delete_thought")
 def test_delete_thought(mock_delete):
     mock_delete.return_value = True
     response = client.delete("/thoughts/1")
     assert response.status_code == 200
 
+
 @patch("backend.routers.thought_routes.ThoughtService.get_thought")
 def test_get_thought(mock_get):
     mock_get.return_value = mock_thought
@@ -57,8 +109,79 @@ def test_get_thought(mock_get):
     assert response.status_code == 200
     assert response.json()["id"] == 1
 
+
 @patch("backend.routers.thought_routes.ThoughtService.link_thoughts")
 def test_link_thought(mock_link):
     mock_link.return_value = True
     response = client.post("/thoughts/1/links", json={"target_id": 2})
     assert response.status_code == 200
+
+
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("backend.routers.thought_routes.ThoughtService.bulk_create_thoughts")
+def test_bulk_create_thoughts(mock_bulk, mock_enqueue_jobs):
+    mock_bulk.return_value = [1, 2]
+
+    response = client.post(
+        "/thoughts/bulk",
+        json={
+            "thoughts": [
+                {"content": "First", "persona_id": 1},
+                {"content": "Second", "emotions": ["Sad"]},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"ids": [1, 2], "count": 2}
+    created = mock_bulk.call_args[0][0]
+    assert [t["content"] for t in created] == ["First", "Second"]
+    assert created[1]["emotions"] == ["Sad"]
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1, 2], "split"))
+    ]
+
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "fused"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("backend.routers.thought_routes.ThoughtService.bulk_create_thoughts")
+def test_bulk_create_thoughts_passes_fused_mode_to_worker(mock_bulk, mock_enqueue_jobs):
+    mock_bulk.return_value = [1, 2]
+    response = client.post(
+        "/thoughts/bulk", json={"thoughts": [{"content": "A"}, {"content": "B"}]}
+    )
+    assert response.status_code == 200
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1, 2], "fused"))
+    ]
+
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "batch"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("backend.routers.thought_routes.ThoughtService.bulk_create_thoughts")
+def test_bulk_create_thoughts_batch_mode(mock_bulk, mock_enqueue_jobs):
+    mock_bulk.return_value = [3]
+    response = client.post("/thoughts/bulk", json={"thoughts": [{"content": "Only"}]})
+    assert response.status_code == 200
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts_batched", ([3],))
+    ]
+
+
+def test_bulk_create_thoughts_rejects_empty_request():
+    response = client.post("/thoughts/bulk", json={"thoughts": []})
+    assert response.status_code == 422
+
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "microbatch"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("libs.events.jobs.push_pending")
+@patch("backend.routers.thought_routes.ThoughtService.bulk_create_thoughts")
+def test_bulk_create_thoughts_microbatch_mode(mock_bulk, mock_push, mock_enqueue_jobs):
+    mock_bulk.return_value = [4, 5]
+    response = client.post(
+        "/thoughts/bulk", json={"thoughts": [{"content": "A"}, {"content": "B"}]}
+    )
+    assert response.status_code == 200
+    assert mock_push.call_args[0][0] == [4, 5]
+    mock_enqueue_jobs.assert_not_called()
@@ -84,6 +84,167 @@ def test_analyze_cognitive_distortions(mock_processor, mock_thought_service):
     mock_thought_service.add_tags.assert_called_once()
     mock_thought_service.update_status.assert_called_once()
 
+@patch("libs.use_cases.thought_use_cases.ThoughtService")
+@patch("libs.use_cases.thought_use_cases.ProcessorService")
+def test_analyze_thoughts_runs_all_dimensions(mock_processor, mock_thought_service):
+    from unittest.mock import AsyncMock
+
+    # Thought 3 no longer exists, so it is missing from the contents
+    mock_thought_service.get_thought_contents.return_value = {
+        1: "Thought 1",
+        2: "Thought 2",
+    }
+
+    mock_proc_instance = MagicMock()
+    mock_proc_instance.aanalyze_cognitive_distortions = AsyncMock(
+        return_value=["distortion1"]
+    )
+    mock_proc_instance.aanalyze_sentiment = AsyncMock(return_value=["Sad"])
+    mock_proc_instance.aanalyze_action_orientation = AsyncMock(
+        return_value="Ruminative"
+    )
+    mock_proc_instance.aanalyze_thought_type = AsyncMock(return_value="Automatic")
+    mock_proc_instance.aanalyze_topics = AsyncMock(
+        side_effect=[["Work"], RuntimeError("boom")]
+    )
+    mock_processor.return_value = mock_proc_instance
+
+    uc = ThoughtUseCases()
+    result = uc.analyze_thoughts([1, 2, 3], concurrency=4)
+
+    assert result[1] == {
+        "distortions": ["distortion1"],
+        "emotions": ["Sad"],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": ["Work"],
+    }
+    # A failed call leaves only its own dimension unset
+    assert "topics" not in result[2]
+    assert 3 not in result
+    mock_thought_service.get_thought_contents.assert_called_once_with([1, 2, 3])
+    mock_thought_service.get_thought.assert_not_called()
+    mock_thought_service.save_analysis.assert_any_call(1, result[1], is_generated=True)
+    assert mock_thought_service.save_analysis.call_count == 2
+
+
+# The worker's own mode is split; the mode passed with the job wins
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "split"})
+@patch("libs.use_cases.thought_use_cases.ThoughtService")
+@patch("libs.use_cases.thought_use_cases.ProcessorService")
+def test_analyze_thoughts_fused_mode(mock_processor, mock_thought_service):
+    from unittest.mock import AsyncMock
+
+    mock_thought_service.get_thought_contents.return_value = {1: "Test content"}
+
+    analysis = {
+        "distortions": [],
+        "emotions": ["Sad"],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": ["Work"],
+    }
+    mock_proc_instance = MagicMock()
+    mock_proc_instance.aanalyze_thought = AsyncMock(return_value=analysis)
+    mock_processor.return_value = mock_proc_instance
+
+    uc = ThoughtUseCases()
+    result = uc.analyze_thoughts([1], mode="fused")
+
+    assert result == {1: analysis}
+    mock_proc_instance.aanalyze_thought.assert_awaited_once_with("Test content")
+    mock_proc_instance.aanalyze_sentiment.assert_not_called()
+    mock_thought_service.save_analysis.assert_called_once_with(
+        1, analysis, is_generated=True
+    )
+
+
+@patch("libs.use_cases.thought_use_cases.ThoughtService")
+@patch("libs.use_cases.thought_use_cases.ProcessorService")
+def test_analyze_thoughts_batched(mock_processor, mock_thought_service):
+    mock_thought_service.get_thought_contents.return_value = {
+        1: "Thought 1",
+        2: "Thought 2",
+    }
+    analysis = {
+        "distortions": [],
+        "emotions": ["Sad"],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": [],
+    }
+    mock_proc_instance = MagicMock()
+    mock_proc_instance.classify_batch.return_value = {1: analysis, 2: analysis}
+    mock_processor.return_value = mock_proc_instance
+
+    uc = ThoughtUseCases()
+    result = uc.analyze_thoughts_batched([1, 2])
+
+    assert result == {1: analysis, 2: analysis}
+    mock_thought_service.get_thought_contents.assert_called_once_with([1, 2])
+    mock_proc_instance.classify_batch.assert_called_once_with(
+        "analysis", {1: "Thought 1", 2: "Thought 2"}
+    )
+    # Every result is written in a single transaction
+    mock_thought_service.save_analyses.assert_called_once_with(
+        {1: analysis, 2: analysis}, is_generated=True, status="completed"
+    )
+    mock_thought_service.get_thought.assert_not_called()
+
+
+@patch("libs.use_cases.thought_use_cases.ThoughtService")
+@patch("libs.use_cases.thought_use_cases.ProcessorService")
+def test_analyze_batch_saves_one_dimension(mock_processor, mock_thought_service):
+    mock_thought_service.get_thought_contents.return_value = {4: "Plan it", 5: "Why me"}
+    mock_proc_instance = MagicMock()
+    mock_proc_instance.classify_batch.return_value = {
+        4: "Action-oriented",
+        5: "Ruminative",
+    }
+    mock_processor.return_value = mock_proc_instance
+
+    result = ThoughtUseCases().analyze_batch("action_orientation", [4, 5, 6])
+
+    assert result == {4: "Action-oriented", 5: "Ruminative"}
+    # Like the single-thought analysis, action orientation leaves the status alone
+    mock_thought_service.save_analyses.assert_called_once_with(
+        {
+            4: {"action_orientation": "Action-oriented"},
+            5: {"action_orientation": "Ruminative"},
+        },
+        is_generated=True,
+        status=None,
+    )
+
+    mock_thought_service.get_thought_contents.return_value = {}
+    assert ThoughtUseCases().analyze_batch("emotions", [7]) == {}
+
+
+@patch("libs.use_cases.thought_use_cases.ThoughtService")
+@patch("libs.use_cases.thought_use_cases.ProcessorService")
+def test_analyze_thought(mock_processor, mock_thought_service):
+    mock_thought = MagicMock()
+    mock_thought.content = "Test content"
+    mock_thought_service.get_thought.return_value = mock_thought
+
+    analysis = {
+        "distortions": ["Labeling"],
+        "emotions": [],
+        "action_orientation": "Ruminative",
+        "thought_type": "Automatic",
+        "topics": [],
+    }
+    mock_proc_instance = MagicMock()
+    mock_proc_instance.analyze_thought.return_value = analysis
+    mock_processor.return_value = mock_proc_instance
+
+    uc = ThoughtUseCases()
+    assert uc.analyze_thought(1) == analysis
+    mock_thought_service.get_thought.assert_called_once_with(1)
+    mock_thought_service.save_analysis.assert_called_once_with(
+        1, analysis, is_generated=True
+    )
+
 @patch("libs.dataset_service.movie_dataset_service.MovieDatasetService")
 @patch("libs.use_cases.generation_use_cases.ProcessorService")
 @patch("libs.use_cases.thought_use_cases.ThoughtUseCases")
@@ -93,7 +254,9 @@ def test_generate_persona_from_movie_characters(
 ):
     # Mock movie service
     mock_movie_service = MagicMock()
-    mock_movie_service.get_character_dialogues.return_value = [["Hello", "World"]]
+    mock_movie_service.get_dialogues_for_characters.return_value = {
+        "char1": [["Hello", "World"]]
+    }
     mock_movie_service.get_character_by_id.return_value = {
         "character_name": "CharName",
         "movie_title": "MovieTitle",
@@ -133,7 +296,9 @@ def test_generate_persona_from_movie_characters(
     assert len(result["thoughts"]) == 1
     assert result["thoughts"][0] == "Thought 1"
     
-    mock_movie_service.get_character_dialogues.assert_called_once_with("char1", limit=500)
+    mock_movie_service.get_dialogues_for_characters.assert_called_once_with(
+        ["char1"], limits=500
+    )
     mock_movie_service.get_character_by_id.assert_called_once_with("char1")
     mock_processor.generate_thoughts_from_character_dialogue.assert_called_once_with([["Hello World"]][0], count=50)
     mock_processor.synthesize_persona_from_thoughts.assert_called_once_with(["Thought 1"])
@@ -152,7 +317,9 @@ def test_generate_persona_from_movie_characters(
 def test_enrich_persona_from_movie_characters(mock_persona_service, mock_processor_class, mock_movie_service_class):
     # Mock movie service
     mock_movie_service = MagicMock()
-    mock_movie_service.get_character_dialogues.return_value = [["New", "trait"]]
+    mock_movie_service.get_dialogues_for_characters.return_value = {
+        "char2": [["New", "trait"]]
+    }
     mock_movie_service_class.return_value = mock_movie_service
     
     # Mock processor
@@ -171,5 +338,7 @@ def test_enrich_persona_from_movie_characters(mock_persona_service, mock_process
     
     assert result["persona_id"] == 1
     assert result["thoughts"] == ["New Thought"]
-    mock_movie_service.get_character_dialogues.assert_called_once_with("char2", limit=500)
+    mock_movie_service.get_dialogues_for_characters.assert_called_once_with(
+        ["char2"], limits=500
+    )
     mock_processor.generate_thoughts_from_character_dialogue.assert_called_once_with(["New trait"], count=50)
@@ -2,8 +2,11 @@ from unittest.mock import patch, MagicMock
 from workers.tasks import (
     analyze_cognitive_distortions,
     analyze_sentiment,
+    analyze_thought,
+    analyze_thoughts,
     parse_blog_and_generate_thoughts,
     generate_essay,
+    generate_conversation_message,
     generate_conversation_sequence,
     process_conversation_thoughts
 )
@@ -21,24 +24,78 @@ def test_analyze_sentiment_task(mock_thought_uc):
     analyze_sentiment(1)
     mock_thought_uc.analyze_sentiment.assert_called_once_with(1)
 
-@patch("workers.tasks.Queue")
+@patch("workers.tasks.thought_uc")
+def test_analyze_thoughts_task(mock_thought_uc):
+    mock_thought_uc.analyze_thoughts.return_value = {1: {}, 2: {}}
+    analyze_thoughts([1, 2], "fused")
+    mock_thought_uc.analyze_thoughts.assert_called_once_with([1, 2], mode="fused")
+
+@patch("libs.events.jobs.enqueue_jobs")
 @patch("workers.tasks.thought_uc")
 @patch("workers.tasks.generation_uc")
-def test_parse_blog_and_generate_thoughts_task(mock_generation_uc, mock_thought_uc, mock_queue):
+def test_parse_blog_and_generate_thoughts_task(
+    mock_generation_uc, mock_thought_uc, mock_enqueue_jobs
+):
     mock_generation_uc.parse_blog.return_value = "Content"
     mock_generation_uc.generate_thoughts_from_text.return_value = ["thought1"]
-    
-    mock_thought = MagicMock()
-    mock_thought.id = 1
-    mock_thought_uc.create_thought.return_value = mock_thought
-    
-    mock_q_instance = MagicMock()
-    mock_queue.return_value = mock_q_instance
+    mock_thought_uc.bulk_create_thoughts.return_value = [1]
     
     parse_blog_and_generate_thoughts("http://test.com", 1)
     mock_generation_uc.parse_blog.assert_called_once_with("http://test.com")
-    mock_thought_uc.create_thought.assert_called_once()
-    assert mock_queue.call_count == 5
+    mock_thought_uc.bulk_create_thoughts.assert_called_once_with(
+        ["thought1"], persona_id=1, is_generated=True
+    )
+    mock_thought_uc.create_thought.assert_not_called()
+    # The imported thoughts are analyzed together by one concurrent job
+    mock_enqueue_jobs.assert_called_once()
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1], "split"))
+    ]
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "fused"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("workers.tasks.thought_uc")
+@patch("workers.tasks.generation_uc")
+def test_parse_blog_enqueues_one_fused_job(
+    mock_generation_uc, mock_thought_uc, mock_enqueue_jobs
+):
+    mock_generation_uc.generate_thoughts_from_text.return_value = [
+        "thought1",
+        "thought2",
+    ]
+    mock_thought_uc.bulk_create_thoughts.return_value = [1, 2]
+
+    parse_blog_and_generate_thoughts("http://test.com", 1)
+
+    mock_enqueue_jobs.assert_called_once()
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts", ([1, 2], "fused"))
+    ]
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "batch"})
+@patch("libs.events.jobs.enqueue_jobs")
+@patch("workers.tasks.thought_uc")
+@patch("workers.tasks.generation_uc")
+def test_parse_blog_enqueues_one_batched_job(
+    mock_generation_uc, mock_thought_uc, mock_enqueue_jobs
+):
+    mock_generation_uc.generate_thoughts_from_text.return_value = [
+        "thought1",
+        "thought2",
+    ]
+    mock_thought_uc.bulk_create_thoughts.return_value = [1, 2]
+
+    parse_blog_and_generate_thoughts("http://test.com", 1)
+
+    assert mock_enqueue_jobs.call_args[0][0] == [
+        ("analysis", "workers.tasks.analyze_thoughts_batched", ([1, 2],)),
+    ]
+
+@patch("workers.tasks.thought_uc")
+def test_analyze_thought_task(mock_thought_uc):
+    mock_thought_uc.analyze_thought.return_value = {"emotions": ["Sad"]}
+    analyze_thought(1)
+    mock_thought_uc.analyze_thought.assert_called_once_with(1)
 
 @patch("workers.tasks.generation_uc")
 def test_generate_essay_task(mock_generation_uc):
@@ -48,8 +105,44 @@ def test_generate_essay_task(mock_generation_uc):
     assert result == "Final essay content"
     mock_generation_uc.generate_essay.assert_called_once_with(1, "start")
 
+@patch("workers.tasks.GenerationStream")
+@patch("workers.tasks.get_current_job")
+@patch("workers.tasks.generation_uc")
+def test_generate_essay_task_streams_to_job_stream(
+    mock_generation_uc, mock_get_job, mock_stream_cls
+):
+    mock_get_job.return_value = MagicMock(id="job-1")
+    mock_generation_uc.generate_essay.return_value = "Final essay content"
+    stream = mock_stream_cls.return_value
+
+    assert generate_essay(1, "start") == "Final essay content"
+    assert mock_stream_cls.call_args[0][0] == "stream:essay:job-1"
+    mock_generation_uc.generate_essay.assert_called_once_with(
+        1, "start", on_chunk=stream.publish
+    )
+    stream.finish.assert_called_once_with("Final essay content")
+
+@patch("workers.tasks.GenerationStream")
+@patch("workers.tasks.conversation_uc")
+def test_generate_conversation_message_task_publishes_done(
+    mock_conversation_uc, mock_stream_cls
+):
+    mock_conversation_uc.generate_conversation_message.return_value = ["message1"]
+    stream = mock_stream_cls.return_value
+
+    generate_conversation_message(1, 2)
+
+    assert mock_stream_cls.call_args[0][0] == "stream:conversation:1"
+    on_chunk = mock_conversation_uc.generate_conversation_message.call_args.kwargs[
+        "on_chunk"
+    ]
+    on_chunk("Hi")
+    stream.publish.assert_called_once_with("Hi", persona_id=2)
+    stream.finish.assert_called_once_with(["message1"], persona_id=2)
+
+@patch("workers.tasks.GenerationStream")
 @patch("workers.tasks.conversation_uc")
-def test_generate_conversation_sequence_task(mock_conversation_uc):
+def test_generate_conversation_sequence_task(mock_conversation_uc, mock_stream_cls):
     mock_conversation_uc.generate_conversation_message.return_value = ["message1"]
     
     generate_conversation_sequence(1, [1, 2])
@@ -72,3 +165,196 @@ def test_run_worker(mock_init_db, mock_queue, mock_worker_cls):
     
     mock_init_db.assert_called_once()
     mock_worker_instance.work.assert_called_once()
+
+@patch("libs.db_service.PersonaService")
+@patch("workers.tasks.enqueue_bulk_analysis")
+@patch("workers.tasks.thought_uc")
+@patch("workers.tasks.generation_uc")
+def test_generate_persona_creates_thoughts_in_bulk(
+    mock_generation_uc, mock_thought_uc, mock_enqueue, mock_persona_service
+):
+    from workers.tasks import generate_persona_from_movie_characters
+
+    mock_generation_uc.generate_persona_from_movie_characters.return_value = {
+        "persona_id": 7, "thoughts": ["a", "b", "c"]
+    }
+    mock_thought_uc.bulk_create_thoughts.return_value = [10, 11, 12]
+
+    generate_persona_from_movie_characters(["c1"])
+
+    mock_thought_uc.bulk_create_thoughts.assert_called_once_with(
+        ["a", "b", "c"], persona_id=7, is_generated=True
+    )
+    mock_enqueue.assert_called_once()
+    assert mock_enqueue.call_args[0][0] == [10, 11, 12]
+    mock_persona_service.regenerate_persona.assert_called_once_with(7)
+
+
+class FakeListRedis:
+    """The list commands the micro-batching worker uses, kept in memory."""
+
+    def __init__(self, lists=None):
+        self.lists = {key: list(values) for key, values in (lists or {}).items()}
+        self.blocked = []
+
+    def lmove(self, source, destination, src="LEFT", dest="RIGHT"):
+        values = self.lists.get(source)
+        if not values:
+            return None
+        value = values.pop(0 if src == "LEFT" else -1)
+        target = self.lists.setdefault(destination, [])
+        target.insert(0 if dest == "LEFT" else len(target), value)
+        return str(value).encode()
+
+    def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        value = self.lmove(source, destination, src, dest)
+        if value is None:
+            self.blocked.append(timeout)
+        return value
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands of a FakeListRedis and runs them on execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((getattr(self.redis, name), args))
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args) for command, args in commands]
+
+
+def test_collect_batch_takes_a_backlog_at_once():
+    from workers.micro_batch import collect_batch
+
+    redis = FakeListRedis(
+        {
+            "analysis:pending:topics": list(range(1, 121)),
+            "analysis:pending:sentiment": [7],
+        }
+    )
+
+    assert collect_batch(
+        redis, ["topics", "sentiment"], "w1", max_size=50, window=10
+    ) == ("topics", list(range(1, 51)))
+    assert collect_batch(
+        redis, ["sentiment", "topics"], "w1", max_size=50, window=10
+    ) == ("sentiment", [7])
+    assert len(redis.lists["analysis:pending:topics"]) == 70
+    # Taken ids wait in the consumer's processing lists until they are saved
+    assert redis.lists["analysis:processing:topics:w1"] == list(range(1, 51))
+    assert redis.lists["analysis:processing:sentiment:w1"] == [7]
+
+
+def test_collect_batch_waits_at_most_the_window():
+    from workers.micro_batch import collect_batch
+
+    redis = FakeListRedis({"analysis:pending:topics": [1, 2]})
+    assert collect_batch(redis, ["topics"], "w1", max_size=50, window=0.25) == (
+        "topics",
+        [1, 2],
+    )
+    # A partial batch waits for more ids only for the rest of its window
+    assert len(redis.blocked) == 1 and 0 < redis.blocked[0] <= 0.25
+    assert collect_batch(redis, ["topics"], "w1", block=3) is None
+    assert redis.blocked[-1] == 3
+
+
+@patch("workers.tasks.thought_uc")
+def test_process_batch_classifies_the_group_once(mock_thought_uc):
+    from workers.micro_batch import collect_batch, process_batch
+
+    redis = FakeListRedis({"analysis:pending:sentiment": [1, 2, 1]})
+    mock_thought_uc.analyze_batch.return_value = {1: ["sad"], 2: ["calm"]}
+    batch = collect_batch(redis, ["sentiment"], "w1", window=0)
+    assert process_batch(*batch, redis, "w1") == {1: ["sad"], 2: ["calm"]}
+    mock_thought_uc.analyze_batch.assert_called_once_with("emotions", [1, 2])
+    assert "analysis:processing:sentiment:w1" not in redis.lists
+
+
+@patch("workers.tasks.thought_uc")
+def test_process_batch_moves_failed_ids_to_the_dead_letter_list(mock_thought_uc):
+    from workers.micro_batch import collect_batch, process_batch
+
+    redis = FakeListRedis({"analysis:pending:topics": [3, 4]})
+    mock_thought_uc.analyze_batch.side_effect = RuntimeError("quota")
+    batch = collect_batch(redis, ["topics"], "w1", window=0)
+    assert process_batch(*batch, redis, "w1") == {}
+    assert redis.lists["analysis:failed:topics"] == [3, 4]
+    assert "analysis:processing:topics:w1" not in redis.lists
+
+
+def test_requeue_in_flight_returns_unsaved_ids_to_the_front():
+    from workers.micro_batch import requeue_in_flight
+
+    redis = FakeListRedis({
+        "analysis:processing:topics:w1": [1, 2],
+        "analysis:pending:topics": [3],
+    })
+    assert requeue_in_flight(redis, ["topics", "sentiment"], "w1") == 2
+    assert redis.lists["analysis:pending:topics"] == [1, 2, 3]
+    assert redis.lists["analysis:processing:topics:w1"] == []
+
+
+def test_push_pending_queues_ids_for_every_dimension():
+    from libs.events.jobs import enqueue_analysis
+
+    connection = MagicMock()
+    pipe = connection.pipeline.return_value.__enter__.return_value
+    assert enqueue_analysis([1, 2], connection, mode="microbatch") == []
+
+    pushed = [c.args for c in pipe.rpush.call_args_list]
+    assert pushed == [
+        ("analysis:pending:distortions", 1, 2),
+        ("analysis:pending:sentiment", 1, 2),
+        ("analysis:pending:action_orientation", 1, 2),
+        ("analysis:pending:thought_type", 1, 2),
+        ("analysis:pending:topics", 1, 2),
+    ]
+    pipe.execute.assert_called_once()
+
+
+@patch.dict("os.environ", {"THOUGHT_ANALYSIS_MODE": "microbatch"})
+@patch("workers.worker.Process")
+@patch("workers.worker.run_micro_batch_worker")
+@patch("workers.worker.Worker")
+@patch("workers.worker.Queue")
+@patch("workers.worker.init_database")
+def test_run_worker_drains_analysis_queues_in_microbatch_mode(
+    mock_init_db, mock_queue, mock_worker_cls, mock_drain, mock_process
+):
+    with patch("workers.worker.listen", ["sentiment", "topics"]):
+        run_worker()
+    mock_drain.assert_called_once()
+    assert mock_drain.call_args[0][0] == ["sentiment", "topics"]
+    mock_worker_cls.assert_not_called()
+    mock_process.assert_not_called()
+
+    # Mixed queues drain the analysis lists in a sibling process, the rest go to RQ
+    with patch("workers.worker.listen", ["sentiment", "generation", "topics", "essay"]):
+        run_worker()
+    mock_process.assert_called_once()
+    assert mock_process.call_args.kwargs["target"] is mock_drain
+    assert mock_process.call_args.kwargs["args"][0] == ["sentiment", "topics"]
+    mock_process.return_value.start.assert_called_once()
+    assert [c[0][0] for c in mock_queue.call_args_list] == ["generation", "essay"]
+    mock_worker_cls.return_value.work.assert_called_once()
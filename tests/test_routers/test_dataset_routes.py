@@ -49,7 +49,12 @@ def test_search_characters(mock_search):
     assert data["results"][0]["character_name"] == "BIANCA"
 
     mock_search.assert_called_once_with(
-        title_query="things", genre="comedy", min_imdb_rating=None, release_year=None, character_name=None
+        title_query="things",
+        genre="comedy",
+        min_imdb_rating=None,
+        release_year=None,
+        character_name=None,
+        include_facets=False,
     )
 
 
@@ -79,3 +84,44 @@ def test_get_random_characters(mock_random):
     assert data["results"][0]["character_name"] == "RANDOM DUDE"
 
     mock_random.assert_called_once_with(limit=10, seed=123.45)
+
+
+@patch("backend.routers.dataset_routes.dataset_use_cases.get_cache_stats")
+def test_get_cache_stats(mock_stats):
+    from libs.dtos.dataset_dto import CorpusCacheStatsResponse
+
+    mock_stats.return_value = CorpusCacheStatsResponse(
+        enabled=True,
+        loaded=True,
+        movies=617,
+        characters=9035,
+        genres=24,
+        load_time_ms=42.5,
+        memory_bytes=3_500_000,
+    )
+
+    response = client.get("/dataset/cache/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["loaded"] is True
+    assert data["load_time_ms"] == 42.5
+    assert data["memory_bytes"] == 3_500_000
+
+
+@patch("backend.routers.dataset_routes.dataset_use_cases.search_movie_characters")
+def test_search_characters_with_facets(mock_search):
+    from libs.dtos.dataset_dto import MovieSearchFacets, MovieSearchResponse
+
+    mock_search.return_value = MovieSearchResponse(
+        results=[],
+        facets=MovieSearchFacets(
+            genres={"comedy": 12, "drama": 3}, decades={"1990s": 15}
+        ),
+    )
+
+    response = client.get("/dataset/characters?year=1999&facets=true")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["facets"]["genres"] == {"comedy": 12, "drama": 3}
+    assert data["facets"]["decades"] == {"1990s": 15}
+    assert mock_search.call_args.kwargs["include_facets"] is True
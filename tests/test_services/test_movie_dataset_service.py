@@ -6,12 +6,16 @@ def test_search_characters_filtering():
     with tempfile.TemporaryDirectory() as temp_dir:
         # Create mock dataset files
         titles_content = (
-            "m0 +++$+++ 10 things i hate about you +++$+++ 1999 +++$+++ 6.90 +++$+++ 100 +++$+++ ['comedy']\n"
-            "m1 +++$+++ the matrix +++$+++ 1999 +++$+++ 8.70 +++$+++ 100 +++$+++ ['action', 'sci-fi']\n"
+            "m0 +++$+++ 10 things i hate about you +++$+++ 1999 +++$+++ 6.90 "
+            "+++$+++ 100 +++$+++ ['comedy']\n"
+            "m1 +++$+++ the matrix +++$+++ 1999 +++$+++ 8.70 +++$+++ 100 "
+            "+++$+++ ['action', 'sci-fi']\n"
         )
         chars_content = (
-            "u0 +++$+++ BIANCA +++$+++ m0 +++$+++ 10 things i hate about you +++$+++ f +++$+++ 1\n"
-            "u1 +++$+++ CAMERON +++$+++ m0 +++$+++ 10 things i hate about you +++$+++ m +++$+++ 2\n"
+            "u0 +++$+++ BIANCA +++$+++ m0 +++$+++ 10 things i hate about you +++$+++ f "
+            "+++$+++ 1\n"
+            "u1 +++$+++ CAMERON +++$+++ m0 +++$+++ 10 things i hate about you "
+            "+++$+++ m +++$+++ 2\n"
             "u2 +++$+++ NEO +++$+++ m1 +++$+++ the matrix +++$+++ m +++$+++ 1\n"
             "u3 +++$+++ MORPHEUS +++$+++ m1 +++$+++ the matrix +++$+++ m +++$+++ 2\n"
         )
@@ -47,3 +51,493 @@ def test_search_characters_filtering():
         results = service.search_characters(character_name="neo")
         assert len(results) == 1
         assert results[0]["character_name"] == "NEO"
+
+
+def _write_corpus(temp_dir):
+    files = {
+        "movie_titles_metadata.txt": (
+            "m0 +++$+++ 10 things i hate about you +++$+++ 1999 +++$+++ 6.90 "
+            "+++$+++ 100 +++$+++ ['comedy', 'romance']\n"
+            "m1 +++$+++ the matrix +++$+++ 1999 +++$+++ 8.70 +++$+++ 100 "
+            "+++$+++ ['action', 'sci-fi']\n"
+        ),
+        "movie_characters_metadata.txt": (
+            "u0 +++$+++ BIANCA +++$+++ m0 +++$+++ 10 things i hate about you +++$+++ f "
+            "+++$+++ 1\n"
+            "u1 +++$+++ CAMERON +++$+++ m0 +++$+++ 10 things i hate about you "
+            "+++$+++ m +++$+++ 2\n"
+            "u2 +++$+++ NEO +++$+++ m1 +++$+++ the matrix +++$+++ m +++$+++ 1\n"
+            "u3 +++$+++ MORPHEUS +++$+++ m1 +++$+++ the matrix +++$+++ m +++$+++ 2\n"
+        ),
+        "movie_conversations.txt": (
+            "u0 +++$+++ u1 +++$+++ m0 +++$+++ ['L1', 'L2']\n"
+            "u2 +++$+++ u3 +++$+++ m1 +++$+++ ['L3', 'L4', 'L5']\n"
+            "u1 +++$+++ u0 +++$+++ m0 +++$+++ ['L6']\n"
+        ),
+        "movie_lines.txt": (
+            "L1 +++$+++ u0 +++$+++ m0 +++$+++ BIANCA +++$+++ Can we make this quick?\n"
+            "L2 +++$+++ u1 +++$+++ m0 +++$+++ CAMERON "
+            "+++$+++ Well, I thought we'd start with pronunciation.\n"
+            "L3 +++$+++ u2 +++$+++ m1 +++$+++ NEO +++$+++ I know kung fu.\n"
+            "L4 +++$+++ u3 +++$+++ m1 +++$+++ MORPHEUS +++$+++ Show me.\n"
+            "L6 +++$+++ u1 +++$+++ m0 +++$+++ CAMERON +++$+++ Forget it.\n"
+        ),
+    }
+    for name, content in files.items():
+        with open(os.path.join(temp_dir, name), "w", encoding="iso-8859-1") as f:
+            f.write(content)
+
+
+def test_index_is_built_once_and_reused():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        assert (
+            service.search_characters(title_query="MATRIX")[0]["character_name"]
+            == "NEO"
+        )
+        assert os.path.exists(service.index_path)
+        mtime = os.stat(service.index_path).st_mtime_ns
+
+        # A fresh service reuses the existing index instead of rebuilding it
+        other = MovieDatasetService(data_dir=temp_dir)
+        assert len(other.search_characters(genre="ROMANCE")) == 2
+        assert os.stat(service.index_path).st_mtime_ns == mtime
+
+
+def test_index_is_rebuilt_when_corpus_changes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        assert len(MovieDatasetService(data_dir=temp_dir).search_characters()) == 4
+
+        with open(os.path.join(temp_dir, "movie_characters_metadata.txt"), "a") as f:
+            f.write(
+                "u4 +++$+++ TRINITY +++$+++ m1 +++$+++ the matrix +++$+++ f +++$+++ 3\n"
+            )
+
+        results = MovieDatasetService(data_dir=temp_dir).search_characters()
+        assert [r["character_name"] for r in results][-1] == "TRINITY"
+
+
+def test_get_character_by_id():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        character = service.get_character_by_id("u2")
+        assert character["character_name"] == "NEO"
+        assert character["movie_title"] == "the matrix"
+        assert character["movie_imdb_rating"] == "8.70"
+        assert character["movie_genres"] == ["action", "sci-fi"]
+        assert service.get_character_by_id("u99") is None
+
+
+def test_get_character_dialogues():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        assert service.get_character_dialogues("u0") == [
+            [
+                "Can we make this quick?",
+                "Well, I thought we'd start with pronunciation.",
+            ],
+            ["Forget it."],
+        ]
+        # Missing lines are skipped
+        assert service.get_character_dialogues("u3") == [
+            ["I know kung fu.", "Show me."]
+        ]
+        assert service.get_character_dialogues("u0", limit=1) == [
+            [
+                "Can we make this quick?",
+                "Well, I thought we'd start with pronunciation.",
+            ]
+        ]
+        assert service.get_character_dialogues("u99") == []
+
+
+def test_get_random_characters_is_seeded():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        first = service.get_random_characters(limit=2, seed=42)
+        assert len(first) == 2
+        assert first == service.get_random_characters(limit=2, seed=42)
+        assert len(service.get_random_characters(limit=10, seed=1)) == 4
+
+
+def test_missing_dataset_returns_empty():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = MovieDatasetService(data_dir=temp_dir)
+        assert service.search_characters() == []
+        assert service.get_character_by_id("u0") is None
+        assert service.get_character_dialogues("u0") == []
+        assert service.get_random_characters() == []
+
+
+def test_get_character_dialogues_reads_lines_by_offset():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        # Windows line endings and non-ASCII text must not shift the offsets
+        with open(
+            os.path.join(temp_dir, "movie_lines.txt"),
+            "w",
+            encoding="iso-8859-1",
+            newline="",
+        ) as f:
+            f.write("L3 +++$+++ u2 +++$+++ m1 +++$+++ NEO +++$+++   Déjà vu.  \r\n")
+            f.write(
+                "L4 +++$+++ u3 +++$+++ m1 +++$+++ MORPHEUS "
+                "+++$+++ A glitch in the Matrix.\r\n"
+            )
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        assert service.get_character_dialogues("u2") == [
+            ["Déjà vu.", "A glitch in the Matrix."]
+        ]
+
+
+def test_get_character_dialogues_with_mapped_lines():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir, mmap_lines=True)
+        indexed = MovieDatasetService(data_dir=temp_dir, mmap_lines=False)
+
+        for character_id in ["u0", "u1", "u2", "u3", "u99"]:
+            assert service.get_character_dialogues(
+                character_id
+            ) == indexed.get_character_dialogues(character_id)
+        assert service.get_character_dialogues("u3") == [
+            ["I know kung fu.", "Show me."]
+        ]
+
+
+def _touch_index(index_path):
+    stat = os.stat(index_path)
+    os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    return index_path, stat.st_mtime_ns + 1
+
+
+def test_rebuilt_index_replaces_its_mapped_line_store():
+    from libs.dataset_service import mapped_lines
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        index = MovieDatasetService(data_dir=temp_dir)._get_index()
+        old = mapped_lines.get_mapped_line_store(index)
+
+        key = _touch_index(index.index_path)
+        new = mapped_lines.get_mapped_line_store(index)
+
+        assert new is not old
+        assert old._mmap.closed
+        assert [k for k in mapped_lines._stores if k[0] == index.index_path] == [key]
+        assert new.get("L3") == "I know kung fu."
+
+
+def test_line_text_containing_the_separator_is_kept_whole():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        with open(
+            os.path.join(temp_dir, "movie_lines.txt"),
+            "w",
+            encoding="iso-8859-1",
+            newline="",
+        ) as f:
+            f.write("L3 +++$+++ u2 +++$+++ m1 +++$+++ NEO +++$+++ Déjà +++$+++ vu.\r\n")
+            f.write("L4 +++$+++ u3 +++$+++ m1 +++$+++ MORPHEUS +++$+++ Show me.\n")
+            f.write("L5 +++$+++ u2 +++$+++ m1 +++$+++ NEO\n")
+
+        expected = [["Déjà +++$+++ vu.", "Show me."]]
+        for mmap_lines in (False, True):
+            service = MovieDatasetService(data_dir=temp_dir, mmap_lines=mmap_lines)
+            assert service.get_character_dialogues("u2") == expected
+
+
+def test_corpus_cache_matches_index():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        cached = MovieDatasetService(data_dir=temp_dir, use_cache=True)
+        indexed = MovieDatasetService(data_dir=temp_dir, use_cache=False)
+
+        assert cached.cache_stats() == {"enabled": True, "loaded": False}
+        cache = cached.warm_cache()
+        assert cache is not None
+
+        stats = cached.cache_stats()
+        assert stats["loaded"] is True
+        assert stats["movies"] == 2
+        assert stats["characters"] == 4
+        assert stats["genres"] == 4
+        assert stats["memory_bytes"] > 0
+
+        for query in [
+            {},
+            {"genre": "Sci-Fi"},
+            {"title_query": "THINGS"},
+            {"min_imdb_rating": 8.0},
+            {"character_name": "o", "limit": 1},
+        ]:
+            assert cached.search_characters(**query) == indexed.search_characters(
+                **query
+            )
+        assert cached.get_random_characters(
+            limit=3, seed=7
+        ) == indexed.get_random_characters(limit=3, seed=7)
+
+
+def test_rebuilt_index_replaces_its_corpus_cache():
+    from libs.dataset_service import corpus_cache
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        index = MovieDatasetService(data_dir=temp_dir)._get_index()
+        old = corpus_cache.get_corpus_cache(index)
+
+        key = _touch_index(index.index_path)
+        new = corpus_cache.get_corpus_cache(index)
+
+        assert new is not old
+        assert [k for k in corpus_cache._caches if k[0] == index.index_path] == [key]
+
+
+def test_warm_cache_is_noop_when_disabled():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir, use_cache=False)
+
+        assert service.warm_cache() is None
+        assert service.cache_stats() == {"enabled": False, "loaded": False}
+
+
+def test_facet_counts_from_cache_and_index_agree():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        with open(os.path.join(temp_dir, "movie_titles_metadata.txt"), "a") as f:
+            f.write(
+                "m2 +++$+++ casablanca +++$+++ 1942/I +++$+++ N/A +++$+++ 100 "
+                "+++$+++ ['drama', 'romance']\n"
+            )
+        with open(os.path.join(temp_dir, "movie_characters_metadata.txt"), "a") as f:
+            f.write(
+                "u4 +++$+++ RICK +++$+++ m2 +++$+++ casablanca +++$+++ m +++$+++ 1\n"
+            )
+        cached = MovieDatasetService(data_dir=temp_dir, use_cache=True)
+        indexed = MovieDatasetService(data_dir=temp_dir, use_cache=False)
+
+        facets = cached.get_facet_counts()
+        assert facets == {
+            "genres": {"action": 2, "comedy": 2, "drama": 1, "romance": 3, "sci-fi": 2},
+            "decades": {"1940s": 1, "1990s": 4},
+        }
+        assert indexed.get_facet_counts() == facets
+
+        # Unrated movies never satisfy a rating filter
+        assert cached.get_facet_counts(min_imdb_rating=0)["decades"] == {"1990s": 4}
+        assert cached.get_facet_counts(
+            genre="romance", character_name="a"
+        ) == indexed.get_facet_counts(genre="romance", character_name="a")
+        assert cached.search_characters(
+            title_query="blanc"
+        ) == indexed.search_characters(title_query="blanc")
+
+
+def test_random_characters_keep_full_list_seed_semantics():
+    import random
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        indexed = MovieDatasetService(data_dir=temp_dir, use_cache=False)
+        cached = MovieDatasetService(data_dir=temp_dir, use_cache=True)
+        everyone = indexed.search_characters(limit=100)
+
+        for seed in [0, 1.5, 1700000000.123]:
+            expected = random.Random(seed).sample(everyone, 3)
+            assert indexed.get_random_characters(limit=3, seed=seed) == expected
+            assert cached.get_random_characters(limit=3, seed=seed) == expected
+
+
+def test_get_dialogues_for_characters():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        for mmap_lines in (False, True):
+            service = MovieDatasetService(data_dir=temp_dir, mmap_lines=mmap_lines)
+
+            result = service.get_dialogues_for_characters(
+                ["u0", "u3", "u99"], limits=[1, 5, 5]
+            )
+            assert result == {
+                "u0": [
+                    [
+                        "Can we make this quick?",
+                        "Well, I thought we'd start with pronunciation.",
+                    ]
+                ],
+                "u3": [["I know kung fu.", "Show me."]],
+                "u99": [],
+            }
+            # A single limit applies to every character
+            result = service.get_dialogues_for_characters(["u0", "u1"], limits=10)
+            assert result["u0"] == service.get_character_dialogues("u0", limit=10)
+            assert result["u1"] == service.get_character_dialogues("u1", limit=10)
+
+
+def test_get_dialogues_for_characters_dedupes_ids():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        # A repeated character is looked up once, with its largest limit
+        result = service.get_dialogues_for_characters(
+            ["u0", "u3", "u0"], limits=[1, 5, 2]
+        )
+        assert list(result) == ["u0", "u3"]
+        assert result["u0"] == service.get_character_dialogues("u0", limit=2)
+        assert len(result["u0"]) == 2
+
+
+def test_get_dialogues_for_characters_rejects_mismatched_limits():
+    import pytest
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_corpus(temp_dir)
+        service = MovieDatasetService(data_dir=temp_dir)
+
+        with pytest.raises(ValueError):
+            service.get_dialogues_for_characters(["u0", "u1"], limits=[5])
+
+
+_UTTERANCES = [
+    {
+        "conversation_id": "c1",
+        "speaker_id": "s1",
+        "speaker_name": "ALICE",
+        "movie_id": "p1",
+        "movie_title": "Night Shift",
+        "movie_year": "2004",
+        "movie_imdb_rating": "7.5",
+        "movie_genres": ["drama"],
+        "text": "Are you still here?",
+    },
+    {
+        "conversation_id": "c1",
+        "speaker_id": "s2",
+        "speaker_name": "BOB",
+        "movie_id": "p1",
+        "text": "Somebody has to lock up. Café's closed.",
+    },
+    {
+        "conversation_id": "c2",
+        "speaker_id": "s1",
+        "speaker_name": "ALICE",
+        "movie_id": "p1",
+        "text": "Goodnight.",
+    },
+    {
+        "conversation_id": "c2",
+        "speaker_id": "s3",
+        "speaker_name": "CAROL",
+        "movie_id": "p1",
+        "text": "Night.",
+    },
+    {
+        "conversation_id": "c2",
+        "speaker_id": "s2",
+        "speaker_name": "BOB",
+        "movie_id": "p1",
+        "text": "See you tomorrow.",
+    },
+]
+
+
+def _check_utterance_corpus(temp_dir, corpus_name):
+    for mmap_lines in (False, True):
+        service = MovieDatasetService(data_dir=temp_dir, mmap_lines=mmap_lines)
+        assert service.corpus.name == corpus_name
+
+        results = service.search_characters(genre="drama", min_imdb_rating=7.0)
+        assert [r["character_name"] for r in results] == ["ALICE", "BOB", "CAROL"]
+        assert results[0]["movie_title"] == "Night Shift"
+        assert results[0]["movie_year"] == "2004"
+
+        assert service.get_character_dialogues("s2") == [
+            ["Are you still here?", "Somebody has to lock up. Café's closed."],
+            ["Goodnight.", "Night.", "See you tomorrow."],
+        ]
+        # Every speaker of a multi-party conversation is indexed
+        assert service.get_character_dialogues("s3") == [
+            ["Goodnight.", "Night.", "See you tomorrow."]
+        ]
+        assert len(service.get_random_characters(limit=2, seed=1)) == 2
+
+
+def test_jsonl_corpus_uses_the_same_index():
+    import json
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(
+            os.path.join(temp_dir, "dialogues.jsonl"), "w", encoding="utf-8"
+        ) as f:
+            for row in _UTTERANCES:
+                f.write(json.dumps(row) + "\n")
+            f.write("not json\n")
+        _check_utterance_corpus(temp_dir, "jsonl")
+
+
+def test_csv_corpus_uses_the_same_index():
+    import csv
+
+    fields = [
+        "conversation_id",
+        "speaker_id",
+        "speaker_name",
+        "movie_id",
+        "movie_title",
+        "movie_year",
+        "movie_imdb_rating",
+        "movie_genres",
+        "text",
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(
+            os.path.join(temp_dir, "dialogues.csv"), "w", encoding="utf-8", newline=""
+        ) as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in _UTTERANCES:
+                row = dict(row)
+                if "movie_genres" in row:
+                    row["movie_genres"] = "|".join(row["movie_genres"])
+                writer.writerow(row)
+        _check_utterance_corpus(temp_dir, "csv")
+
+
+def test_corpus_read_in_place_must_provide_line_offsets():
+    import pytest
+
+    from libs.dataset_service.corpora import DialogueCorpus
+
+    class LinesInPlaceCorpus(DialogueCorpus):
+        source_files = ("lines.txt",)
+
+        def iter_movies(self):
+            return iter(())
+
+        def iter_characters(self):
+            return iter(())
+
+        def iter_conversations(self):
+            return iter(())
+
+        def iter_lines(self):
+            return iter(())
+
+        def lines_file(self):
+            return os.path.join(self.data_dir, "lines.txt"), "utf-8"
+
+    # Without iter_line_offsets the index build would have nothing to read
+    with pytest.raises(TypeError):
+        LinesInPlaceCorpus("data")
@@ -0,0 +1,145 @@
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis
+
+from libs.events.jobs import failed_key, pending_key, processing_key
+
+# Analysis task classified in batches for every queue that can be micro-batched
+MICROBATCH_TASKS = {
+    "distortions": "distortions",
+    "sentiment": "emotions",
+    "action_orientation": "action_orientation",
+    "thought_type": "thought_type",
+    "topics": "topics",
+}
+
+# A batch closes when it holds this many ids or its window has passed
+MICROBATCH_SIZE = int(os.getenv("ANALYSIS_MICROBATCH_SIZE", "50"))
+MICROBATCH_WINDOW_SECONDS = float(os.getenv("ANALYSIS_MICROBATCH_WINDOW_SECONDS", "1"))
+# How long an idle worker blocks on Redis before checking its queues again
+IDLE_TIMEOUT_SECONDS = 5
+# Names this worker's processing lists; keep it stable across restarts to recover them
+CONSUMER_NAME = os.getenv("ANALYSIS_WORKER_NAME") or socket.gethostname()
+
+
+def collect_batch(
+    connection: Redis,
+    queue_names: List[str],
+    consumer: str = CONSUMER_NAME,
+    max_size: int = MICROBATCH_SIZE,
+    window: float = MICROBATCH_WINDOW_SECONDS,
+    block: float = IDLE_TIMEOUT_SECONDS,
+) -> Optional[Tuple[str, List[int]]]:
+    """Moves up to `max_size` pending ids of a queue to the consumer's processing list.
+
+    Takes a first id from the first non-empty queue, blocking up to `block`
+    seconds on the first queue when all are empty, then keeps taking ids of
+    that queue until the batch is full or `window` seconds have passed. The
+    ids stay in the processing list until `process_batch` has saved them.
+    """
+    queue_name = None
+    first = None
+    for name in queue_names:
+        first = connection.lmove(
+            pending_key(name), processing_key(name, consumer), "LEFT", "RIGHT"
+        )
+        if first is not None:
+            queue_name = name
+            break
+    if first is None:
+        # BLMOVE waits on one list; the worker rotates queue_names so each queue
+        # gets the wait in turn.
+        queue_name = queue_names[0]
+        first = connection.blmove(
+            pending_key(queue_name),
+            processing_key(queue_name, consumer),
+            block,
+            "LEFT",
+            "RIGHT",
+        )
+        if first is None:
+            return None
+
+    source, destination = pending_key(queue_name), processing_key(queue_name, consumer)
+    ids = [int(first)]
+    deadline = time.monotonic() + window
+    while len(ids) < max_size:
+        with connection.pipeline(transaction=False) as pipe:
+            for _ in range(max_size - len(ids)):
+                pipe.lmove(source, destination, "LEFT", "RIGHT")
+            moved = [int(value) for value in pipe.execute() if value is not None]
+        if moved:
+            ids.extend(moved)
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        item = connection.blmove(source, destination, remaining, "LEFT", "RIGHT")
+        if item is None:
+            break
+        ids.append(int(item))
+    return queue_name, ids
+
+
+def process_batch(
+    queue_name: str,
+    thought_ids: List[int],
+    connection: Redis,
+    consumer: str = CONSUMER_NAME,
+) -> Dict[int, Any]:
+    """Analyzes a collected batch, then releases its ids from the processing list.
+
+    The ids are dropped only after their results are committed. When the
+    analysis fails they are moved to the queue's dead-letter list instead.
+    """
+    from workers.tasks import thought_uc
+
+    task = MICROBATCH_TASKS[queue_name]
+    thought_ids = list(dict.fromkeys(thought_ids))
+    print(f"Analyzing {task} for {len(thought_ids)} thoughts in one batch...")
+    try:
+        results = thought_uc.analyze_batch(task, thought_ids)
+    except Exception as e:
+        print(f"Error analyzing {task} for thoughts {thought_ids}: {e}")
+        with connection.pipeline() as pipe:
+            pipe.rpush(failed_key(queue_name), *thought_ids)
+            pipe.delete(processing_key(queue_name, consumer))
+            pipe.execute()
+        return {}
+    connection.delete(processing_key(queue_name, consumer))
+    print(f"Completed {task} for {len(results)} of {len(thought_ids)} thoughts.")
+    return results
+
+
+def requeue_in_flight(
+    connection: Redis, queue_names: List[str], consumer: str = CONSUMER_NAME
+) -> int:
+    """Requeues, at the front, ids an earlier run of `consumer` took but never saved."""
+    requeued = 0
+    for queue_name in queue_names:
+        source, destination = (
+            processing_key(queue_name, consumer),
+            pending_key(queue_name),
+        )
+        while connection.lmove(source, destination, "RIGHT", "LEFT") is not None:
+            requeued += 1
+    return requeued
+
+
+def run_micro_batch_worker(
+    queue_names: List[str], connection: Redis, consumer: str = CONSUMER_NAME
+) -> None:
+    """Drains the pending ids of `queue_names` in batches until stopped."""
+    queue_names = list(queue_names)
+    requeued = requeue_in_flight(connection, queue_names, consumer)
+    if requeued:
+        print(f"Requeued {requeued} thought ids left in progress by {consumer}.")
+    while True:
+        batch = collect_batch(connection, queue_names, consumer)
+        if batch:
+            process_batch(*batch, connection, consumer)
+        # Rotate so every queue gets its turn first and its turn at the blocking wait.
+        queue_names = queue_names[1:] + queue_names[:1]
@@ -1,8 +1,14 @@
 import os
 
 from redis import Redis
-from rq import Queue
-
+from rq import get_current_job
+
+from libs.events.jobs import enqueue_bulk_analysis
+from libs.events.streams import (
+    GenerationStream,
+    conversation_stream_key,
+    essay_stream_key,
+)
 from libs.use_cases import ConversationUseCases, GenerationUseCases, ThoughtUseCases
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -14,6 +20,16 @@ conversation_uc = ConversationUseCases()
 generation_uc = GenerationUseCases()
 
 
+def analyze_thought(thought_id):
+    print(f"Analyzing all dimensions of thought {thought_id} in one call...")
+    analysis = thought_uc.analyze_thought(thought_id)
+    if not analysis:
+        print(f"Thought {thought_id} not found.")
+        return
+    print(f"Identified analysis: {analysis}")
+    print(f"Saved analysis for thought {thought_id}")
+
+
 def analyze_cognitive_distortions(thought_id):
     print(f"Analyzing cognitive distortions for thought {thought_id}...")
     distortions = thought_uc.analyze_cognitive_distortions(thought_id)
@@ -64,6 +80,18 @@ def analyze_topics(thought_id):
     print(f"Added topics to thought {thought_id}")
 
 
+def analyze_thoughts(thought_ids: list, mode=None):
+    print(f"Analyzing {len(thought_ids)} thoughts concurrently...")
+    analyses = thought_uc.analyze_thoughts(thought_ids, mode=mode)
+    print(f"Completed analysis for {len(analyses)} of {len(thought_ids)} thoughts.")
+
+
+def analyze_thoughts_batched(thought_ids: list):
+    print(f"Analyzing {len(thought_ids)} thoughts in batched prompts...")
+    analyses = thought_uc.analyze_thoughts_batched(thought_ids)
+    print(f"Completed analysis for {len(analyses)} of {len(thought_ids)} thoughts.")
+
+
 def parse_blog_and_generate_thoughts(url, persona_id):
     print(f"STARTING: Parsing blog {url} for persona {persona_id}...")
 
@@ -71,28 +99,30 @@ def parse_blog_and_generate_thoughts(url, persona_id):
     thoughts = generation_uc.generate_thoughts_from_text(text_content)
     print(f"Generated {len(thoughts)} thoughts from blog.")
 
-    q_distortions = Queue("distortions", connection=redis_conn)
-    q_sentiment = Queue("sentiment", connection=redis_conn)
-    q_action = Queue("action_orientation", connection=redis_conn)
-    q_type = Queue("thought_type", connection=redis_conn)
-    q_topics = Queue("topics", connection=redis_conn)
-
-    for content in thoughts:
-        thought = thought_uc.create_thought(
-            content=content, is_generated=True, persona_id=persona_id
-        )
-        print(f"Created thought {thought.id}")
+    thought_ids = thought_uc.bulk_create_thoughts(
+        thoughts, persona_id=persona_id, is_generated=True
+    )
+    print(f"Created thoughts {thought_ids}")
 
-        q_distortions.enqueue("workers.tasks.analyze_cognitive_distortions", thought.id)
-        q_sentiment.enqueue("workers.tasks.analyze_sentiment", thought.id)
-        q_action.enqueue("workers.tasks.analyze_action_orientation", thought.id)
-        q_type.enqueue("workers.tasks.analyze_thought_type", thought.id)
-        q_topics.enqueue("workers.tasks.analyze_topics", thought.id)
+    enqueue_bulk_analysis(thought_ids, redis_conn)
 
 
 def generate_essay(persona_id, starting_text):
     print(f"Generating essay for persona {persona_id}...")
-    final_essay = generation_uc.generate_essay(persona_id, starting_text)
+    job = get_current_job()
+    if job is None:
+        final_essay = generation_uc.generate_essay(persona_id, starting_text)
+    else:
+        # Partial output goes to the job's stream for /essay/stream/{job_id}.
+        stream = GenerationStream(essay_stream_key(job.id), redis_conn)
+        try:
+            final_essay = generation_uc.generate_essay(
+                persona_id, starting_text, on_chunk=stream.publish
+            )
+        except Exception as e:
+            stream.fail(str(e))
+            raise
+        stream.finish(final_essay)
     print(f"Final essay length: {len(final_essay)}")
     return final_essay
 
@@ -101,9 +131,17 @@ def generate_conversation_message(conversation_id, persona_id):
     print(
         f"Generating conversation message for conversation {conversation_id}, persona {persona_id}..."
     )
-    message_contents = conversation_uc.generate_conversation_message(
-        conversation_id, persona_id
-    )
+    stream = GenerationStream(conversation_stream_key(conversation_id), redis_conn)
+    try:
+        message_contents = conversation_uc.generate_conversation_message(
+            conversation_id,
+            persona_id,
+            on_chunk=lambda text: stream.publish(text, persona_id=persona_id),
+        )
+    except Exception as e:
+        stream.fail(str(e), persona_id=persona_id)
+        raise
+    stream.finish(message_contents, persona_id=persona_id)
     if not message_contents:
         print("Conversation or Persona not found, or generation failed.")
         return
@@ -137,23 +175,12 @@ def generate_persona_from_movie_characters(character_ids: list):
     thoughts = result["thoughts"]
     print(f"Generated persona {persona_id} with {len(thoughts)} thoughts.")
 
-    q_distortions = Queue("distortions", connection=redis_conn)
-    q_sentiment = Queue("sentiment", connection=redis_conn)
-    q_action = Queue("action_orientation", connection=redis_conn)
-    q_type = Queue("thought_type", connection=redis_conn)
-    q_topics = Queue("topics", connection=redis_conn)
-
-    for content in thoughts:
-        thought = thought_uc.create_thought(
-            content=content, is_generated=True, persona_id=persona_id
-        )
-        print(f"Created thought {thought.id} for persona {persona_id}")
+    thought_ids = thought_uc.bulk_create_thoughts(
+        thoughts, persona_id=persona_id, is_generated=True
+    )
+    print(f"Created thoughts {thought_ids} for persona {persona_id}")
 
-        q_distortions.enqueue("workers.tasks.analyze_cognitive_distortions", thought.id)
-        q_sentiment.enqueue("workers.tasks.analyze_sentiment", thought.id)
-        q_action.enqueue("workers.tasks.analyze_action_orientation", thought.id)
-        q_type.enqueue("workers.tasks.analyze_thought_type", thought.id)
-        q_topics.enqueue("workers.tasks.analyze_topics", thought.id)
+    enqueue_bulk_analysis(thought_ids, redis_conn)
     
     # STORY-103: Regenerate profile after thoughts are saved
     from libs.db_service import PersonaService
@@ -168,23 +195,12 @@ def enrich_persona_from_movie_characters(persona_id: int, character_ids: list):
     thoughts = result["thoughts"]
     print(f"Generated {len(thoughts)} new thoughts for persona {persona_id}.")
 
-    q_distortions = Queue("distortions", connection=redis_conn)
-    q_sentiment = Queue("sentiment", connection=redis_conn)
-    q_action = Queue("action_orientation", connection=redis_conn)
-    q_type = Queue("thought_type", connection=redis_conn)
-    q_topics = Queue("topics", connection=redis_conn)
-
-    for content in thoughts:
-        thought = thought_uc.create_thought(
-            content=content, is_generated=True, persona_id=persona_id
-        )
-        print(f"Created thought {thought.id} for enrichment of persona {persona_id}")
+    thought_ids = thought_uc.bulk_create_thoughts(
+        thoughts, persona_id=persona_id, is_generated=True
+    )
+    print(f"Created thoughts {thought_ids} for enrichment of persona {persona_id}")
 
-        q_distortions.enqueue("workers.tasks.analyze_cognitive_distortions", thought.id)
-        q_sentiment.enqueue("workers.tasks.analyze_sentiment", thought.id)
-        q_action.enqueue("workers.tasks.analyze_action_orientation", thought.id)
-        q_type.enqueue("workers.tasks.analyze_thought_type", thought.id)
-        q_topics.enqueue("workers.tasks.analyze_topics", thought.id)
+    enqueue_bulk_analysis(thought_ids, redis_conn)
 
     # STORY-104: Regenerate profile after enrichment thoughts are saved
     from libs.db_service import PersonaService
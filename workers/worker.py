@@ -1,8 +1,12 @@
 import os
 import sys
+from multiprocessing import Process
 from redis import Redis
 from rq import Worker, Queue
 from libs.db_service import init_database
+from libs.llm_service.instrumentation import start_metrics_server
+from libs.processor_service import ANALYSIS_MODE_MICROBATCH, get_analysis_mode
+from workers.micro_batch import MICROBATCH_TASKS, run_micro_batch_worker
 
 # Connect to Redis
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -15,13 +19,36 @@ listen = os.getenv("QUEUES", "default").split(",")
 def run_worker():
     # Initialize DB connection for the worker process
     init_database()
+
+    if start_metrics_server():
+        print(f"Serving metrics on port {os.getenv('METRICS_PORT')}")
     
-    print(f"Worker listening on queues: {listen}")
-    
+    # In microbatch mode, analysis queues are drained in groups of ids, not RQ jobs
+    rq_queues = listen
+    if get_analysis_mode() == ANALYSIS_MODE_MICROBATCH:
+        batch_queues = [name for name in listen if name in MICROBATCH_TASKS]
+        rq_queues = [name for name in listen if name not in MICROBATCH_TASKS]
+        if batch_queues and not rq_queues:
+            print(f"Micro-batching worker draining queues: {batch_queues}")
+            run_micro_batch_worker(batch_queues, redis_conn)
+            return
+        if batch_queues:
+            # Mixed QUEUES (e.g. run.sh): a sibling process drains the analysis lists
+            print(f"Micro-batching worker draining queues: {batch_queues}")
+            drainer = Process(
+                target=run_micro_batch_worker,
+                args=(batch_queues, redis_conn),
+                daemon=True,
+            )
+            drainer.start()
+
+    print(f"Worker listening on queues: {rq_queues}")
+
     # Pass connection directly to Worker and Queue
-    queues = [Queue(name, connection=redis_conn) for name in listen]
+    queues = [Queue(name, connection=redis_conn) for name in rq_queues]
     worker = Worker(queues, connection=redis_conn)
     worker.work()
 
-if __name__ == '__main__':
+
+if __name__ == "__main__":
     run_worker()